@@ -4,19 +4,107 @@ Analisador Avançado de Fraudes e Investigação Financeira
 Detecta padrões suspeitos, lavagem de dinheiro e redes criminosas
 """
 
+import os
 import pandas as pd
 import networkx as nx
 import numpy as np
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import time
 from collections import defaultdict, Counter
 import matplotlib.pyplot as plt
 import seaborn as sns
 import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
+from cycle_search import (CycleGraph, CycleSearchResult, DEFAULT_STEP_BUDGET, iter_cycles, top_cycles,
+                          parallel_top_cycles)
+from graph_store import CSRGraph, aggregate_edges
+from communities import detect as detect_communities
+from layout import default_engine
+from rendering import webgl_network_figure
+from prepared_dataset import prepare_dataset
+from streaming import TransactionStream, NIGHT_HOURS, WEEKEND_DAYS
 import warnings
 warnings.filterwarnings('ignore')
 
+# Atributos do analisador de que cada detector do relatório depende
+DETECTOR_PARAMETERS = {
+    'structuring': ('structuring_threshold', 'structuring_tolerance'),
+    'circular': ('alert_threshold',),
+    'hubs': (),
+    'unusual': (),
+    'temporal': ()
+}
+
+# Processos da busca de ciclos no relatório paralelo: os demais detectores
+# rodam em threads ao mesmo tempo, então a busca fica com metade dos núcleos
+DEFAULT_CYCLE_WORKERS = max(1, min(4, (os.cpu_count() or 2) // 2))
+
+class FrameRef:
+    """
+    Referência compartilhada ao DataFrame de transações.
+    
+    Todas as arestas apontam para a mesma referência; ao anexar transações
+    basta trocar 'frame' uma vez em vez de atualizar cada aresta.
+    """
+    
+    __slots__ = ('frame',)
+    
+    def __init__(self, frame):
+        self.frame = frame
+
+class EdgeTransactions:
+    """
+    Visão preguiçosa das transações de uma aresta.
+    
+    Guarda apenas as posições das linhas no DataFrame de origem (via
+    FrameRef); cada item é montado sob demanda no formato
+    {'value', 'date', 'row_index'}.
+    """
+    
+    __slots__ = ('source', 'positions', 'value_col', 'date_col')
+    
+    def __init__(self, source, positions, value_col='valor', date_col=None):
+        self.source = source if isinstance(source, FrameRef) else FrameRef(source)
+        self.positions = positions
+        self.value_col = value_col
+        self.date_col = date_col
+    
+    @property
+    def data(self):
+        return self.source.frame
+    
+    def __len__(self):
+        return len(self.positions)
+    
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return EdgeTransactions(self.source, self.positions[item], self.value_col, self.date_col)
+        
+        position = self.positions[item]
+        value = self.data[self.value_col].iat[position]
+        return {
+            'value': float(value) if pd.notna(value) else 0,
+            'date': self.data[self.date_col].iat[position] if self.date_col else None,
+            'row_index': self.data.index[position]
+        }
+    
+    def __iter__(self):
+        for i in range(len(self.positions)):
+            yield self[i]
+    
+    def extend(self, positions):
+        """Anexa novas posições (transações acrescentadas ao mesmo DataFrame)."""
+        self.positions = np.concatenate([self.positions, positions])
+    
+    def to_frame(self):
+        """Retorna as linhas da aresta como DataFrame."""
+        return self.data.iloc[self.positions]
+    
+    def __repr__(self):
+        return f"EdgeTransactions({len(self)} transações)"
+
 class AdvancedFraudAnalyzer:
     """
     Analisador avançado para detecção de fraudes e investigação financeira.
@@ -32,32 +120,84 @@ class AdvancedFraudAnalyzer:
     
     def __init__(self):
         self.data = None
+        self.store = None  # CSRGraph quando a rede usa o backend 'csr'
         self.graph = nx.DiGraph()
         self.suspicious_patterns = {}
         self.risk_scores = {}
         self.investigation_results = {}
         self.alert_threshold = 10000  # Limiar para alertas
         self.structuring_threshold = 10000  # Limiar para estruturação
+        self.structuring_tolerance = 0.1  # Coeficiente de variação máximo na estruturação
+        self.report_context = None  # Estruturas compartilhadas entre detectores
+        self.render_stats = {}  # Nível de detalhe e payload da última figura 'webgl'
+        self.network_columns = None  # Colunas usadas em build_transaction_network
+        self.frame_ref = None
+        self.node_ids = {}  # Entidade -> posição nos acumuladores
+        self.node_accumulators = {}  # Métrica -> array por nó
+        self.stream = None  # TransactionStream no modo de ingestão em blocos (self.data fica None)
         
-    def load_data(self, data_source, file_type='csv'):
-        """Carrega dados de transações financeiras."""
+    @property
+    def graph(self):
+        """
+        Grafo networkx da rede.
+        
+        Com o backend 'csr' o grafo é exportado do CSRGraph apenas na primeira
+        vez que é acessado (visualização ou algoritmos não portados).
+        """
+        if self._graph is None and self.store is not None:
+            self._graph = self._export_graph()
+        return self._graph
+    
+    @graph.setter
+    def graph(self, graph):
+        self._graph = graph
+        self.store = None
+    
+    def _graph_size(self):
+        """(entidades, conexões) sem forçar a exportação do backend 'csr'."""
+        if self.store is not None:
+            return self.store.number_of_nodes(), self.store.number_of_edges()
+        return self._graph.number_of_nodes(), self._graph.number_of_edges()
+    
+    def _graph_token(self):
+        """Identifica a estrutura de grafo atual (usada para invalidar o contexto)."""
+        return id(self.store) if self.store is not None else id(self._graph)
+    
+    def _row_count(self):
+        """Número de transações carregadas (em memória ou ingeridas em blocos)."""
+        if self.stream is not None:
+            return self.stream.rows
+        return len(self.data)
+    
+    def _total_value(self):
+        """Soma dos valores de todas as transações."""
+        if self.stream is not None:
+            return self.stream.total_value
+        return self.data['valor'].sum()
+    
+    def load_data(self, data_source, file_type='csv', prepared_dir=None):
+        """
+        Carrega dados de transações financeiras.
+        
+        Args:
+            data_source: Caminho do arquivo (ou DataFrame, no tipo 'csv')
+            file_type: 'csv' ou 'excel'
+            prepared_dir: Diretório de conjuntos preparados; se informado, o
+                arquivo é lido e limpo uma única vez e as próximas cargas do
+                mesmo conteúdo usam a cópia preparada em memory-map
+        """
         try:
-            if file_type == 'csv':
-                if isinstance(data_source, str):
-                    self.data = pd.read_csv(data_source)
-                else:
-                    self.data = data_source
-            elif file_type == 'excel':
-                self.data = pd.read_excel(data_source)
-            
-            # Padronizar nomes das colunas
-            self.data.columns = [col.strip().lower().replace(' ', '_') for col in self.data.columns]
-            
-            # Converter valores monetários
-            self._clean_financial_data()
-            
-            # Converter datas
-            self._parse_dates()
+            read = pd.read_csv if file_type == 'csv' else pd.read_excel
+            if prepared_dir is not None and not isinstance(data_source, pd.DataFrame):
+                self.data, cached = prepare_dataset(data_source, read, self._prepare_frame,
+                                                    variant=f"advanced:{file_type}",
+                                                    prepared_dir=prepared_dir)
+                if cached:
+                    print("⚡ Conjunto preparado reaproveitado")
+            elif isinstance(data_source, pd.DataFrame):
+                self.data = self._prepare_frame(data_source)
+            else:
+                self.data = self._prepare_frame(read(data_source))
             
             print(f"✅ Dados carregados: {len(self.data)} transações")
             print(f"📊 Colunas disponíveis: {list(self.data.columns)}")
@@ -68,92 +208,261 @@ class AdvancedFraudAnalyzer:
             print(f"❌ Erro ao carregar dados: {e}")
             return False
     
-    def _clean_financial_data(self):
-        """Limpa e padroniza dados financeiros."""
+    def load_data_streaming(self, file_path, source_col='nome', target_col='empresa',
+                            value_col='valor', date_col='data', chunksize=100000,
+                            backend='csr', read_options=None, progress=None):
+        """
+        Carrega um CSV em blocos, sem manter as linhas em memória.
+        
+        Cada bloco passa pela mesma limpeza de load_data e alimenta os
+        agregados de streaming.TransactionStream; a rede é construída a
+        partir das arestas agregadas. Depois disso self.data é None e os
+        detectores do relatório usam os agregados (relendo o arquivo em
+        blocos quando precisam listar transações).
+        
+        Args:
+            file_path: Caminho do CSV
+            source_col, target_col, value_col, date_col: Colunas (após a
+                padronização dos nomes) usadas na rede
+            chunksize: Linhas por bloco
+            backend: 'csr' ou 'networkx' (ver build_transaction_network)
+            read_options: Argumentos extras de pd.read_csv (sep, encoding...)
+            progress: Função (linhas lidas) chamada a cada bloco
+        """
+        try:
+            # Estruturação agrupa pela coluna 'nome' bruta, como na carga em memória
+            stream = TransactionStream(file_path, source_col, target_col, value_col, date_col,
+                                       clean=self._prepare_frame, chunksize=chunksize,
+                                       read_options=read_options, person_col='nome')
+            stream.ingest(progress)
+        except Exception as e:
+            print(f"❌ Erro ao carregar dados: {e}")
+            return False
+        
+        self.data = None
+        self.stream = stream
+        print(f"✅ Dados carregados em blocos: {stream.rows} transações")
+        print(f"📊 Colunas disponíveis: {stream.columns}")
+        return self.build_transaction_network(source_col, target_col, value_col, date_col, backend)
+    
+    def _prepare_frame(self, data):
+        """Padroniza os nomes das colunas, converte valores monetários e datas."""
+        data.columns = [col.strip().lower().replace(' ', '_') for col in data.columns]
+        data = self._clean_financial_data(data)
+        return self._parse_dates(data)
+    
+    def _clean_financial_data(self, data=None):
+        """Limpa e padroniza dados financeiros (de self.data ou do DataFrame informado)."""
+        target = self.data if data is None else data
+        
         # Identificar coluna de valor
-        value_cols = [col for col in self.data.columns if any(x in col for x in ['valor', 'value', 'amount', 'quantia'])]
+        value_cols = [col for col in target.columns if any(x in col for x in ['valor', 'value', 'amount', 'quantia'])]
         
         for col in value_cols:
-            if self.data[col].dtype == 'object':
+            if target[col].dtype == 'object':
                 # Remover símbolos de moeda e formatar
-                self.data[col] = self.data[col].astype(str).str.replace(r'[R$\s]', '', regex=True)
-                self.data[col] = self.data[col].str.replace(',', '.')
-                self.data[col] = pd.to_numeric(self.data[col], errors='coerce')
+                target[col] = target[col].astype(str).str.replace(r'[R$\s]', '', regex=True)
+                target[col] = target[col].str.replace(',', '.')
+                target[col] = pd.to_numeric(target[col], errors='coerce')
         
         # Remover valores nulos
-        self.data = self.data.dropna(subset=value_cols)
+        target = target.dropna(subset=value_cols)
+        if data is None:
+            self.data = target
+        return target
     
-    def _parse_dates(self):
-        """Converte colunas de data."""
-        date_cols = [col for col in self.data.columns if any(x in col for x in ['data', 'date', 'quando'])]
+    def _parse_dates(self, data=None):
+        """Converte colunas de data (de self.data ou do DataFrame informado)."""
+        target = self.data if data is None else data
+        date_cols = [col for col in target.columns if any(x in col for x in ['data', 'date', 'quando'])]
         
         for col in date_cols:
-            self.data[col] = pd.to_datetime(self.data[col], errors='coerce')
+            target[col] = pd.to_datetime(target[col], errors='coerce')
+        return target
     
     def build_transaction_network(self, source_col='nome', target_col='empresa', 
-                                value_col='valor', date_col='data'):
-        """Constrói rede de transações."""
+                                value_col='valor', date_col='data', backend='networkx',
+                                edges=None):
+        """
+        Constrói rede de transações.
+        
+        As arestas são agregadas de forma colunar (um único groupby por par
+        origem/destino) e inseridas em lote. O atributo 'transactions' de cada
+        aresta é uma EdgeTransactions, visão preguiçosa sobre as linhas do
+        DataFrame original.
+        
+        Args:
+            backend: 'networkx' (grafo em dicionários) ou 'csr' (arrays
+                compactos em self.store; self.graph é exportado sob demanda)
+            edges: Agregação de _aggregate_edges já calculada para estes dados
+                e colunas (ex.: guardada em cache); não é alterada
+        """
+        if self.data is None and self.stream is not None:
+            return self._build_stream_network(source_col, target_col, value_col, date_col, backend)
         if self.data is None:
             print("❌ Nenhum dado carregado")
             return False
+        self.stream = None
         
-        # Criar grafo direcionado
-        self.graph = nx.DiGraph()
+        if edges is None:
+            edges = self._aggregate_edges(self.data, source_col, target_col, value_col)
+        if date_col not in self.data.columns:
+            date_col = None
+        
+        self.network_columns = (source_col, target_col, value_col, date_col)
+        self.frame_ref = FrameRef(self.data)
         
-        # Adicionar transações como arestas
-        for _, row in self.data.iterrows():
-            source = str(row[source_col]).strip()
-            target = str(row[target_col]).strip()
-            value = float(row[value_col]) if pd.notna(row[value_col]) else 0
-            date = row[date_col] if date_col in self.data.columns else None
+        if backend == 'csr':
+            self.graph = None
+            self.store = CSRGraph(edges['nodes'], edges['source'], edges['target'],
+                                  edges['total_value'], edges['count'])
+            self.edge_rows = (edges['order'], edges['start'])
+        else:
+            # Criar grafo direcionado (nós na ordem de primeira aparição)
+            self.graph = nx.DiGraph()
+            self.graph.add_nodes_from(edges['nodes'])
             
-            # Adicionar ou atualizar aresta
-            if self.graph.has_edge(source, target):
-                # Somar valores e adicionar datas
-                self.graph[source][target]['total_value'] += value
-                self.graph[source][target]['transaction_count'] += 1
-                self.graph[source][target]['transactions'].append({
-                    'value': value,
-                    'date': date,
-                    'row_index': row.name
+            nodes = edges['nodes']
+            order = edges['order']
+            self.graph.add_edges_from(
+                (nodes[s], nodes[t], {
+                    'total_value': float(total),
+                    'transaction_count': int(count),
+                    'transactions': EdgeTransactions(self.frame_ref, order[start:start + count],
+                                                     value_col, date_col)
                 })
-            else:
-                self.graph.add_edge(source, target, 
-                                  total_value=value,
-                                  transaction_count=1,
-                                  transactions=[{
-                                      'value': value,
-                                      'date': date,
-                                      'row_index': row.name
-                                  }])
+                for s, t, total, count, start in zip(edges['source'], edges['target'],
+                                                     edges['total_value'], edges['count'],
+                                                     edges['start'])
+            )
         
         # Calcular métricas dos nós
-        self._calculate_node_metrics()
+        self._calculate_node_metrics(edges)
         
-        print(f"🕸️ Rede construída: {self.graph.number_of_nodes()} entidades, {self.graph.number_of_edges()} conexões")
+        n_nodes, n_edges = self._graph_size()
+        print(f"🕸️ Rede construída: {n_nodes} entidades, {n_edges} conexões")
         return True
     
-    def _calculate_node_metrics(self):
-        """Calcula métricas avançadas dos nós."""
-        for node in self.graph.nodes():
-            # Fluxos de entrada e saída
-            in_flow = sum([self.graph[source][node]['total_value'] 
-                          for source in self.graph.predecessors(node)])
-            out_flow = sum([self.graph[node][target]['total_value'] 
-                           for target in self.graph.successors(node)])
+    def _build_stream_network(self, source_col, target_col, value_col, date_col, backend):
+        """Rede a partir das arestas agregadas na ingestão em blocos (sem linhas por aresta)."""
+        stream = self.stream
+        if (source_col, target_col, value_col) != (stream.source_col, stream.target_col, stream.value_col):
+            print("❌ Colunas diferentes das usadas na ingestão em blocos; carregue o arquivo novamente")
+            return False
+        
+        edges = stream.edges()
+        self.network_columns = (source_col, target_col, value_col,
+                                date_col if stream.has_dates else None)
+        self.frame_ref = None
+        self.edge_rows = None
+        
+        if backend == 'csr':
+            self.graph = None
+            self.store = CSRGraph(edges['nodes'], edges['source'], edges['target'],
+                                  edges['total_value'], edges['count'])
+        else:
+            nodes = edges['nodes']
+            self.graph = nx.DiGraph()
+            self.graph.add_nodes_from(nodes)
+            self.graph.add_edges_from(
+                (nodes[s], nodes[t], {'total_value': float(total), 'transaction_count': int(count)})
+                for s, t, total, count in zip(edges['source'], edges['target'],
+                                              edges['total_value'], edges['count'])
+            )
+        
+        self._calculate_node_metrics(edges)
+        
+        n_nodes, n_edges = self._graph_size()
+        print(f"🕸️ Rede construída: {n_nodes} entidades, {n_edges} conexões")
+        return True
+    
+    def _export_graph(self):
+        """Exporta o CSRGraph para networkx com os mesmos atributos do backend networkx."""
+        _, _, value_col, date_col = self.network_columns
+        if self.edge_rows is None:
+            # Ingestão em blocos: sem linhas por aresta
+            graph = self.store.to_networkx(value_attr='total_value', count_attr='transaction_count')
+            self._write_node_metrics(self.store.nodes, np.arange(self.store.number_of_nodes()), graph)
+            return graph
+        order, starts = self.edge_rows
+        counts = self.store.edge_counts
+        
+        graph = self.store.to_networkx(
+            value_attr='total_value', count_attr='transaction_count',
+            edge_attrs=lambda e: {
+                'transactions': EdgeTransactions(self.frame_ref, order[starts[e]:starts[e] + counts[e]],
+                                                 value_col, date_col)
+            }
+        )
+        self._write_node_metrics(self.store.nodes, np.arange(self.store.number_of_nodes()), graph)
+        return graph
+    
+    @staticmethod
+    def _aggregate_edges(data, source_col, target_col, value_col):
+        """Agrega as transações por par (origem, destino); ver graph_store.aggregate_edges."""
+        sources = data[source_col].astype(str).str.strip().to_numpy()
+        targets = data[target_col].astype(str).str.strip().to_numpy()
+        values = pd.to_numeric(data[value_col], errors='coerce').fillna(0).to_numpy(dtype=float)
+        return aggregate_edges(sources, targets, values)
+    
+    def _calculate_node_metrics(self, edges=None):
+        """
+        Calcula métricas avançadas dos nós.
+        
+        As métricas ficam em acumuladores NumPy indexados por nó
+        (self.node_accumulators), preenchidos com bincount sobre as arestas;
+        append_transactions atualiza apenas os nós afetados. 'edges' é a
+        agregação de _aggregate_edges, quando já disponível.
+        """
+        if edges is not None:
+            nodes = edges['nodes']
+            self.node_ids = {node: i for i, node in enumerate(nodes)}
+            src, dst = edges['source'], edges['target']
+            values, counts = edges['total_value'], edges['count']
+        elif self.store is not None:
+            nodes = self.store.nodes
+            self.node_ids = self.store.node_index
+            src, dst = self.store.edge_source, self.store.edge_target
+            values, counts = self.store.edge_values, self.store.edge_counts
+        else:
+            nodes = list(self.graph.nodes())
+            self.node_ids = {node: i for i, node in enumerate(nodes)}
             
+            edges = list(self.graph.edges(data=True))
+            src = np.array([self.node_ids[u] for u, _, _ in edges], dtype=np.int64)
+            dst = np.array([self.node_ids[v] for _, v, _ in edges], dtype=np.int64)
+            values = np.array([data['total_value'] for _, _, data in edges], dtype=float)
+            counts = np.array([data['transaction_count'] for _, _, data in edges], dtype=np.int64)
+        
+        n = len(nodes)
+        self.node_accumulators = {
+            # Fluxos de entrada e saída
+            'in_flow': np.bincount(dst, weights=values, minlength=n).astype(float),
+            'out_flow': np.bincount(src, weights=values, minlength=n).astype(float),
             # Contadores de transações
-            in_transactions = sum([self.graph[source][node]['transaction_count'] 
-                                  for source in self.graph.predecessors(node)])
-            out_transactions = sum([self.graph[node][target]['transaction_count'] 
-                                   for target in self.graph.successors(node)])
-            
+            'in_transactions': np.bincount(dst, weights=counts, minlength=n).astype(np.int64),
+            'out_transactions': np.bincount(src, weights=counts, minlength=n).astype(np.int64),
             # Métricas de centralidade
-            in_degree = self.graph.in_degree(node)
-            out_degree = self.graph.out_degree(node)
+            'in_degree': np.bincount(dst, minlength=n).astype(np.int64),
+            'out_degree': np.bincount(src, minlength=n).astype(np.int64)
+        }
+        
+        # No backend 'csr' os atributos são copiados na exportação (_export_graph)
+        if self.store is None:
+            self._write_node_metrics(nodes, np.arange(n))
+    
+    def _write_node_metrics(self, nodes, ids, graph=None):
+        """Copia os acumuladores dos nós informados para os atributos do grafo."""
+        graph = self.graph if graph is None else graph
+        acc = {name: array[ids].tolist() for name, array in self.node_accumulators.items()}
+        
+        for i, node in enumerate(nodes):
+            in_flow, out_flow = acc['in_flow'][i], acc['out_flow'][i]
+            in_transactions, out_transactions = acc['in_transactions'][i], acc['out_transactions'][i]
+            in_degree, out_degree = acc['in_degree'][i], acc['out_degree'][i]
             
             # Atualizar atributos do nó
-            self.graph.nodes[node].update({
+            graph.nodes[node].update({
                 'in_flow': in_flow,
                 'out_flow': out_flow,
                 'total_flow': in_flow + out_flow,
@@ -166,136 +475,559 @@ class AdvancedFraudAnalyzer:
                 'total_degree': in_degree + out_degree
             })
     
-    def detect_structuring_patterns(self, threshold=10000, tolerance=0.1):
+    def append_transactions(self, new_data):
+        """
+        Acrescenta transações a uma rede já construída, de forma incremental.
+        
+        As novas linhas são limpas, agregadas por par (origem, destino) e
+        somadas às arestas existentes; somente os nós tocados têm as métricas
+        recalculadas. O custo de grafo e métricas é proporcional às novas
+        linhas, não ao histórico (self.data ainda é concatenado).
+        
+        Args:
+            new_data: DataFrame com as mesmas colunas usadas na carga original
+        
+        Returns:
+            Quantidade de transações acrescentadas
+        """
+        if self.network_columns is None:
+            print("❌ Construa a rede antes de anexar transações")
+            return 0
+        if self.stream is not None:
+            print("❌ Rede carregada em blocos: carregue o arquivo completo novamente")
+            return 0
+        source_col, target_col, value_col, date_col = self.network_columns
+        
+        new_data = new_data.copy()
+        new_data.columns = [col.strip().lower().replace(' ', '_') for col in new_data.columns]
+        new_data = self._clean_financial_data(new_data)
+        new_data = self._parse_dates(new_data)
+        if new_data.empty:
+            return 0
+        
+        # Continuar a numeração das linhas para manter 'row_index' único
+        offset = len(self.data)
+        if pd.api.types.is_integer_dtype(self.data.index) and len(self.data):
+            start = self.data.index.max() + 1
+            new_data.index = pd.RangeIndex(start, start + len(new_data))
+        self.data = pd.concat([self.data, new_data])
+        self.frame_ref.frame = self.data
+        
+        if self.store is not None:
+            # O CSRGraph é imutável: reconstrução colunar a partir de todas as linhas
+            self.build_transaction_network(source_col, target_col, value_col, date_col, backend='csr')
+            return len(new_data)
+        
+        edges = self._aggregate_edges(new_data, source_col, target_col, value_col)
+        
+        # Registrar nós novos e crescer os acumuladores
+        ids = []
+        for node in edges['nodes']:
+            if node not in self.node_ids:
+                self.node_ids[node] = len(self.node_ids)
+                self.graph.add_node(node)
+            ids.append(self.node_ids[node])
+        ids = np.array(ids, dtype=np.int64)
+        self._grow_accumulators(len(self.node_ids))
+        
+        src = ids[edges['source']]
+        dst = ids[edges['target']]
+        new_edge = np.zeros(len(src), dtype=bool)
+        order = edges['order'] + offset
+        
+        for i, (s, t) in enumerate(zip(edges['source'], edges['target'])):
+            u, v = edges['nodes'][s], edges['nodes'][t]
+            total, count, first = edges['total_value'][i], edges['count'][i], edges['start'][i]
+            positions = order[first:first + count]
+            
+            if self.graph.has_edge(u, v):
+                edge = self.graph[u][v]
+                edge['total_value'] += float(total)
+                edge['transaction_count'] += int(count)
+                edge['transactions'].extend(positions)
+            else:
+                new_edge[i] = True
+                self.graph.add_edge(u, v,
+                                    total_value=float(total),
+                                    transaction_count=int(count),
+                                    transactions=EdgeTransactions(self.frame_ref, positions,
+                                                                  value_col, date_col))
+        
+        acc = self.node_accumulators
+        np.add.at(acc['in_flow'], dst, edges['total_value'])
+        np.add.at(acc['out_flow'], src, edges['total_value'])
+        np.add.at(acc['in_transactions'], dst, edges['count'])
+        np.add.at(acc['out_transactions'], src, edges['count'])
+        np.add.at(acc['in_degree'], dst[new_edge], 1)
+        np.add.at(acc['out_degree'], src[new_edge], 1)
+        
+        # Todos os nós das novas linhas foram tocados; os demais não mudam
+        self._write_node_metrics(edges['nodes'], ids)
+        
+        n_nodes, n_edges = self._graph_size()
+        print(f"➕ {len(new_data)} transações anexadas: {n_nodes} entidades, {n_edges} conexões")
+        return len(new_data)
+    
+    def _grow_accumulators(self, size):
+        """Garante capacidade para 'size' nós nos acumuladores (crescimento geométrico)."""
+        for name, array in self.node_accumulators.items():
+            if len(array) < size:
+                grown = np.zeros(max(size, 2 * len(array)), dtype=array.dtype)
+                grown[:len(array)] = array
+                self.node_accumulators[name] = grown
+    
+    def detect_structuring_patterns(self, threshold=10000, tolerance=0.1, window_days=None):
         """
         Detecta padrões de estruturação (fracionamento de valores).
         
         Estruturação é dividir uma grande transação em várias pequenas 
         para evitar reportes obrigatórios.
+        
+        Args:
+            threshold: Valor total a partir do qual o grupo gera alerta
+            tolerance: Coeficiente de variação máximo (valores similares)
+            window_days: Se informado, também analisa janelas móveis de N dias
         """
-        structuring_alerts = []
+        if self.stream is not None:
+            if window_days:
+                print("⚠️ Janelas móveis não disponíveis na ingestão em blocos")
+            structuring_alerts = self._stream_structuring_patterns(threshold, tolerance)
+            self.suspicious_patterns['structuring'] = structuring_alerts
+            return structuring_alerts
         
-        # Agrupar transações por pessoa e período
-        if 'data' in self.data.columns:
-            self.data['date_group'] = self.data['data'].dt.date
-        else:
-            self.data['date_group'] = 'sem_data'
+        # Agrupar transações por pessoa e período (já calculado no contexto do relatório)
+        if self._current_context() is None:
+            self._add_date_group()
+        
+        # Estatísticas de todos os grupos (pessoa, dia) em uma única agregação
+        grouped = self.data.groupby(['nome', 'date_group'], sort=False)['valor']
+        stats = grouped.agg(['count', 'sum', 'mean'])
+        stats['std'] = grouped.std(ddof=0)
+        stats['cv'] = stats['std'] / stats['mean']
+        stats['group_id'] = np.arange(len(stats))
+        
+        # Múltiplas transações no mesmo dia, valores similares e total acima do limiar
+        flagged = stats[(stats['count'] >= 3) & (stats['mean'] > 0) &
+                        (stats['cv'] < tolerance) & (stats['sum'] > threshold)]
+        
+        # Manter a ordem original: pessoas por primeira aparição, depois dias
+        first_seen = {person: i for i, person in enumerate(self.data['nome'].unique())}
+        flagged = flagged.assign(
+            person_order=[first_seen[person] for person in flagged.index.get_level_values('nome')]
+        ).sort_values('person_order', kind='stable')
         
-        # Identificar possível estruturação
-        for person in self.data['nome'].unique():
-            person_data = self.data[self.data['nome'] == person]
+        structuring_alerts = []
+        if len(flagged):
+            row_groups = grouped.ngroup()
+            flagged_rows = row_groups.isin(flagged['group_id'])
+            values_by_group = (self.data.loc[flagged_rows, 'valor']
+                               .groupby(row_groups[flagged_rows])
+                               .agg(lambda v: v.tolist()))
             
-            # Agrupar por data
-            for date_group in person_data['date_group'].unique():
-                day_transactions = person_data[person_data['date_group'] == date_group]
-                
-                if len(day_transactions) >= 3:  # Múltiplas transações no mesmo dia
-                    values = day_transactions['valor'].tolist()
-                    total_value = sum(values)
-                    
-                    # Verificar se valores são similares (indicativo de estruturação)
-                    if len(values) >= 3:
-                        avg_value = np.mean(values)
-                        std_value = np.std(values)
-                        
-                        # Coeficiente de variação baixo indica valores similares
-                        if avg_value > 0 and (std_value / avg_value) < tolerance:
-                            if total_value > threshold:
-                                structuring_alerts.append({
-                                    'person': person,
-                                    'date': date_group,
-                                    'transaction_count': len(values),
-                                    'individual_values': values,
-                                    'total_value': total_value,
-                                    'avg_value': avg_value,
-                                    'std_value': std_value,
-                                    'coefficient_variation': std_value / avg_value,
-                                    'risk_level': 'ALTO' if total_value > threshold * 2 else 'MÉDIO'
-                                })
+            for group in flagged.itertuples():
+                person, date_group = group.Index
+                values = values_by_group[group.group_id]
+                total_value = sum(values)
+                structuring_alerts.append({
+                    'person': person,
+                    'date': date_group,
+                    'transaction_count': len(values),
+                    'individual_values': values,
+                    'total_value': total_value,
+                    'avg_value': group.mean,
+                    'std_value': group.std,
+                    'coefficient_variation': group.cv,
+                    'risk_level': 'ALTO' if total_value > threshold * 2 else 'MÉDIO'
+                })
+        
+        if window_days:
+            structuring_alerts.extend(
+                self.detect_windowed_structuring(window=pd.Timedelta(days=window_days), step='1D',
+                                                 threshold=threshold, tolerance=tolerance)
+            )
         
         self.suspicious_patterns['structuring'] = structuring_alerts
         return structuring_alerts
     
-    def detect_circular_transactions(self, min_cycle_length=3):
-        """Detecta transações circulares suspeitas."""
+    def _stream_structuring_patterns(self, threshold, tolerance):
+        """
+        Estruturação a partir dos grupos (pessoa, dia) agregados na ingestão em
+        blocos; os valores individuais dos grupos marcados vêm de uma releitura.
+        """
+        stream = self.stream
+        groups = stream.day_groups()
+        count, total = groups['count'], groups['sum']
+        mean = total / np.maximum(count, 1)
+        std = np.sqrt(np.maximum(groups['sumsq'] / np.maximum(count, 1) - mean ** 2, 0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cv = std / mean
+        flagged = np.flatnonzero((count >= 3) & (mean > 0) & (cv < tolerance) & (total > threshold))
+        if not len(flagged):
+            return []
+        
+        # Pessoas por primeira aparição, depois grupos por primeira transação
+        person_first = np.full(len(stream.person_index), np.iinfo(np.int64).max)
+        np.minimum.at(person_first, groups['person'], groups['first_row'])
+        flagged = flagged[np.lexsort((groups['first_row'][flagged],
+                                      person_first[groups['person'][flagged]]))]
+        
+        # Releitura: valores das transações dos grupos marcados, na ordem do arquivo
+        keys = (groups['person'] << 32) | (groups['day'] + (1 << 31))
+        wanted = keys[flagged]
+        values_by_group = {key: [] for key in wanted.tolist()}
+        for chunk in stream.chunks():
+            ids = stream.person_ids(chunk[stream.person_col])
+            days, valid = stream.day_numbers(chunk)
+            chunk_keys = (ids << 32) | (days + (1 << 31))
+            mask = valid & (ids >= 0) & np.isin(chunk_keys, wanted)
+            values = stream.values(chunk)
+            for key, value in zip(chunk_keys[mask].tolist(), values[mask].tolist()):
+                values_by_group[key].append(value)
+        
+        persons = stream.persons
+        structuring_alerts = []
+        for g in flagged.tolist():
+            values = values_by_group[int(keys[g])]
+            total_value = sum(values)
+            structuring_alerts.append({
+                'person': persons[groups['person'][g]],
+                'date': np.datetime64(int(groups['day'][g]), 'D').astype(object) if stream.has_dates else 'sem_data',
+                'transaction_count': len(values),
+                'individual_values': values,
+                'total_value': total_value,
+                'avg_value': mean[g],
+                'std_value': std[g],
+                'coefficient_variation': cv[g],
+                'risk_level': 'ALTO' if total_value > threshold * 2 else 'MÉDIO'
+            })
+        return structuring_alerts
+    
+    def detect_windowed_structuring(self, window='72h', step='1D', threshold=None,
+                                    tolerance=None, min_transactions=3):
+        """
+        Detecta estruturação espalhada por vários dias (janelas deslizantes).
+        
+        Para cada pessoa, janelas [início, início + window) avançam em passos
+        de 'step' sobre a linha do tempo. Uma janela gera alerta quando o total
+        ultrapassa o limiar enquanto cada transação individual fica abaixo dele.
+        As transações são ordenadas uma vez por (pessoa, data) e os limites de
+        cada janela vêm de searchsorted sobre esse array, com somas por
+        prefixo, de modo que o custo cresce linearmente com as transações.
+        
+        Args:
+            window: Duração da janela (ex.: '72h', '7D')
+            step: Passo entre o início de janelas consecutivas
+            threshold: Limiar de estruturação (padrão: self.structuring_threshold)
+            tolerance: Se informado, exige também coeficiente de variação < tolerance
+                (em cada janela, antes de agrupar as janelas sobrepostas)
+            min_transactions: Número mínimo de transações na janela
+        """
+        if threshold is None:
+            threshold = self.structuring_threshold
+        if self.stream is not None:
+            print("⚠️ Janelas móveis não disponíveis na ingestão em blocos")
+            self.suspicious_patterns['structuring_windows'] = []
+            return []
+        if 'data' not in self.data.columns:
+            self.suspicious_patterns['structuring_windows'] = []
+            return []
+        
+        window_s = max(int(pd.Timedelta(window).total_seconds()), 1)
+        step_s = max(int(pd.Timedelta(step).total_seconds()), 1)
+        
+        valid = self.data[['nome', 'data', 'valor']].dropna()
+        codes, names = pd.factorize(valid['nome'])
+        seconds = valid['data'].to_numpy(dtype='datetime64[s]').astype(np.int64)
+        order = np.lexsort((seconds, codes))
+        codes = codes[order].astype(np.int64)
+        values = valid['valor'].to_numpy(dtype=float)[order]
+        
+        # Tempo relativo alinhado à grade de passos (com folga de uma janela antes
+        # da primeira transação); 'key' ordena (pessoa, tempo)
+        lead = -(-window_s // step_s) * step_s
+        base = (seconds.min() // step_s) * step_s - lead if len(seconds) else 0
+        rel = seconds[order] - base
+        span = int(rel.max()) + step_s + window_s + 1 if len(rel) else 1
+        key = codes * span + rel
+        
+        # O conteúdo de uma janela só muda nos pontos da grade logo após
+        # t - window (a transação entra) e logo após t (a transação sai);
+        # os demais inícios repetem a janela anterior e são ignorados
+        enter = ((rel - window_s) // step_s + 1) * step_s
+        leave = (rel // step_s + 1) * step_s
+        anchor_keys = np.sort(np.r_[key - rel + enter, key - rel + leave])
+        anchor_keys = anchor_keys[np.r_[True, anchor_keys[1:] != anchor_keys[:-1]]]
+        anchor_code = anchor_keys // span
+        anchors = anchor_keys % span
+        
+        lo = np.searchsorted(key, anchor_code * span + anchors, side='left')
+        hi = np.searchsorted(key, anchor_code * span + anchors + window_s, side='left')
+        
+        # Descartar janelas vazias e janelas idênticas à anterior
+        keep = hi > lo
+        keep[1:] &= (lo[1:] != lo[:-1]) | (hi[1:] != hi[:-1])
+        lo, hi, anchors = lo[keep], hi[keep], anchors[keep]
+        
+        # Somas por prefixo: total e quantidade de valores individuais acima do limiar
+        value_sum = np.r_[0.0, np.cumsum(values)]
+        above = np.r_[0, np.cumsum(values >= threshold)]
+        count = hi - lo
+        total = value_sum[hi] - value_sum[lo]
+        hit = (count >= min_transactions) & (total > threshold) & (above[hi] == above[lo])
+        lo, hi, anchors, total = lo[hit], hi[hit], anchors[hit], total[hit]
+        
+        alerts = []
+        if len(lo):
+            # Média e desvio exatos (duas passadas) de cada janela marcada
+            count = hi - lo
+            starts = np.r_[0, np.cumsum(count)[:-1]]
+            rows = np.repeat(lo - starts, count) + np.arange(count.sum())
+            window_values = values[rows]
+            avg_value = np.add.reduceat(window_values, starts) / count
+            deviation = window_values - np.repeat(avg_value, count)
+            std_value = np.sqrt(np.add.reduceat(deviation * deviation, starts) / count)
+            cv = np.divide(std_value, avg_value, out=np.zeros_like(std_value), where=avg_value != 0)
+            
+            # A tolerância é aplicada a cada janela antes de agrupar as sobrepostas
+            if tolerance is not None:
+                passed = (avg_value > 0) & (cv < tolerance)
+                lo, hi, anchors, total = lo[passed], hi[passed], anchors[passed], total[passed]
+                avg_value, std_value, cv = avg_value[passed], std_value[passed], cv[passed]
+        
+        # Janelas sobrepostas da mesma pessoa viram um único alerta (a de maior total)
+        if len(lo):
+            new_cluster = np.r_[True, (codes[lo[1:]] != codes[lo[:-1]]) | (lo[1:] >= hi[:-1])]
+            cluster = np.cumsum(new_cluster)
+            best = pd.Series(total).groupby(cluster).idxmax().to_numpy()
+            
+            lo, hi, anchors = lo[best], hi[best], anchors[best]
+            avg_value, std_value, cv = avg_value[best], std_value[best], cv[best]
+            count = hi - lo
+            
+            sorted_dates = valid['data'].to_numpy()[order]
+            window_starts = pd.to_datetime(base + anchors, unit='s')
+            window_length = pd.Timedelta(seconds=window_s)
+            persons = np.asarray(names, dtype=object)[codes[lo]]
+            
+            for i in range(len(lo)):
+                transaction_values = values[lo[i]:hi[i]].tolist()
+                total_value = sum(transaction_values)
+                alerts.append({
+                    'person': persons[i],
+                    'date': window_starts[i].date(),
+                    'transaction_count': int(count[i]),
+                    'individual_values': transaction_values,
+                    'total_value': total_value,
+                    'avg_value': avg_value[i],
+                    'std_value': std_value[i],
+                    'coefficient_variation': cv[i],
+                    'max_value': max(transaction_values),
+                    'risk_level': 'ALTO' if total_value > threshold * 2 else 'MÉDIO',
+                    'window_start': window_starts[i],
+                    'window_end': window_starts[i] + window_length,
+                    'first_transaction': pd.Timestamp(sorted_dates[lo[i]]),
+                    'last_transaction': pd.Timestamp(sorted_dates[hi[i] - 1])
+                })
+        
+        self.suspicious_patterns['structuring_windows'] = alerts
+        return alerts
+    
+    def detect_circular_transactions(self, min_cycle_length=3, max_cycle_length=6,
+                                     min_edge_value=0, top_k=100,
+                                     node_step_budget=DEFAULT_STEP_BUDGET, workers=1, cancel=None):
+        """
+        Detecta transações circulares suspeitas.
+        
+        A busca é limitada: arestas com valor abaixo de min_edge_value são
+        podadas antes da busca, cada componente fortemente conectado é
+        processado de forma independente e os ciclos são consumidos como
+        gerador, mantendo apenas os top_k de maior valor.
+        
+        Os padrões mudaram em relação à versão original, que devolvia todos
+        os ciclos de nx.simple_cycles acima do limiar:
+        - só ciclos de até 6 entidades são buscados (max_cycle_length=6);
+        - só os 100 de maior valor são devolvidos (top_k=100);
+        - cada nó inicial examina no máximo DEFAULT_STEP_BUDGET arestas
+          (node_step_budget); o limite é em passos, e não em segundos,
+          para que o resultado não dependa da máquina.
+        Com max_cycle_length=None, top_k=None e node_step_budget=None o
+        resultado é o da versão original (ordenado por valor decrescente).
+        Quando algum limite corta o resultado, 'search' registra isso.
+        
+        Args:
+            min_cycle_length: Número mínimo de entidades no ciclo
+            max_cycle_length: Número máximo de entidades no ciclo (None = sem limite)
+            min_edge_value: Valor mínimo de uma conexão para participar de ciclos
+            top_k: Quantidade máxima de ciclos retornados (None = todos)
+            node_step_budget: Máximo de arestas examinadas por nó inicial
+                (padrão DEFAULT_STEP_BUDGET; None = sem limite)
+            workers: Processos usados na busca (1 = sequencial)
+            cancel: Evento (threading.Event) verificado durante a busca; se
+                sinalizado, a busca para e o resultado parcial não é gravado
+                em suspicious_patterns
+        
+        Retorna uma CycleSearchResult (lista de alertas) cujo atributo
+        'search' traz os limites usados e se o resultado foi truncado ou
+        cancelado.
+        """
         circular_patterns = []
+        max_length = max_cycle_length if max_cycle_length is not None else max(self._graph_size()[0], 1)
+        search = {
+            'min_cycle_length': min_cycle_length,
+            'max_cycle_length': max_cycle_length,
+            'min_edge_value': min_edge_value,
+            'top_k': top_k,
+            'node_step_budget': node_step_budget,
+            'truncated': False,
+            'truncated_starts': 0,
+            'cycles_above_threshold': 0,
+            'limited_by_top_k': False,
+            'cancelled': False
+        }
         
-        # Encontrar ciclos no grafo
         try:
-            cycles = list(nx.simple_cycles(self.graph))
+            if self.store is not None:
+                cycle_graph = CycleGraph.from_store(self.store, min_edge_value=min_edge_value)
+            else:
+                cycle_graph = CycleGraph.from_networkx(self.graph, min_edge_value=min_edge_value)
+            stats = {}
+            if workers == 1:
+                cycles = iter_cycles(cycle_graph, max_length=max_length,
+                                     min_length=min_cycle_length,
+                                     step_budget=node_step_budget, stats=stats, cancel=cancel)
+                found = top_cycles(cycles, top_k, min_total=self.alert_threshold, stats=stats)
+            else:
+                # Componentes (e fatias de componentes grandes) em paralelo
+                found = parallel_top_cycles(cycle_graph, max_length=max_length,
+                                            min_length=min_cycle_length,
+                                            step_budget=node_step_budget, k=top_k,
+                                            min_total=self.alert_threshold,
+                                            workers=workers, stats=stats, cancel=cancel)
+            
+            for cycle_ids, total_value in found:
+                cycle = [cycle_graph.nodes[i] for i in cycle_ids]
+                circular_patterns.append(self._describe_cycle(cycle, total_value))
             
-            for cycle in cycles:
-                if len(cycle) >= min_cycle_length:
-                    # Calcular valor total do ciclo
-                    total_value = 0
-                    cycle_transactions = []
-                    
-                    for i in range(len(cycle)):
-                        source = cycle[i]
-                        target = cycle[(i + 1) % len(cycle)]
-                        
-                        if self.graph.has_edge(source, target):
-                            edge_value = self.graph[source][target]['total_value']
-                            total_value += edge_value
-                            cycle_transactions.append({
-                                'from': source,
-                                'to': target,
-                                'value': edge_value,
-                                'transactions': self.graph[source][target]['transaction_count']
-                            })
-                    
-                    if total_value > self.alert_threshold:
-                        circular_patterns.append({
-                            'cycle': cycle,
-                            'cycle_length': len(cycle),
-                            'total_value': total_value,
-                            'avg_value': total_value / len(cycle),
-                            'transactions': cycle_transactions,
-                            'risk_level': 'CRÍTICO' if total_value > self.alert_threshold * 5 else 'ALTO'
-                        })
+            search.update(truncated=bool(stats.get('truncated')),
+                          truncated_starts=stats.get('truncated', 0),
+                          cycles_above_threshold=stats.get('matches', 0),
+                          limited_by_top_k=top_k is not None and stats.get('matches', 0) > top_k,
+                          cancelled=bool(stats.get('cancelled')))
+            if search['truncated']:
+                print(f"⚠️ Busca de ciclos truncada pelo orçamento de passos em {search['truncated_starts']} nós iniciais")
         
         except Exception as e:
             print(f"Erro ao detectar ciclos: {e}")
         
-        # Ordenar por valor total
-        circular_patterns.sort(key=lambda x: x['total_value'], reverse=True)
-        
-        self.suspicious_patterns['circular'] = circular_patterns
+        circular_patterns = CycleSearchResult(circular_patterns, search)
+        if circular_patterns.cancelled:
+            print("⚠️ Busca de ciclos cancelada")
+        else:
+            self.suspicious_patterns['circular'] = circular_patterns
         return circular_patterns
     
+    @staticmethod
+    def _describe_cycle_search(search):
+        """Resumo dos limites da busca de ciclos e de eventuais truncamentos."""
+        length = search.get('max_cycle_length')
+        top_k = search.get('top_k')
+        text = (f"Ciclos de {search.get('min_cycle_length')} a "
+                f"{length if length is not None else 'qualquer número de'} entidades, "
+                f"{'todos' if top_k is None else f'até {top_k}'} de maior valor")
+        if search.get('limited_by_top_k'):
+            text += f" ({search['cycles_above_threshold']} acima do limiar; lista cortada)"
+        if search.get('truncated'):
+            text += f"; busca TRUNCADA em {search['truncated_starts']} nós iniciais (resultado incompleto)"
+        return text
+    
+    def _describe_cycle(self, cycle, total_value):
+        """Monta o alerta de um ciclo a partir das arestas do grafo."""
+        cycle_transactions = []
+        for i in range(len(cycle)):
+            source = cycle[i]
+            target = cycle[(i + 1) % len(cycle)]
+            value, count = self._edge_totals(source, target)
+            cycle_transactions.append({
+                'from': source,
+                'to': target,
+                'value': value,
+                'transactions': count
+            })
+        
+        return {
+            'cycle': cycle,
+            'cycle_length': len(cycle),
+            'total_value': total_value,
+            'avg_value': total_value / len(cycle),
+            'transactions': cycle_transactions,
+            'risk_level': 'CRÍTICO' if total_value > self.alert_threshold * 5 else 'ALTO'
+        }
+    
+    def _edge_totals(self, source, target):
+        """(total_value, transaction_count) da aresta, em qualquer backend."""
+        if self.store is not None:
+            e = self.store.edge_id(source, target)
+            return float(self.store.edge_values[e]), int(self.store.edge_counts[e])
+        edge = self.graph[source][target]
+        return edge['total_value'], edge['transaction_count']
+    
     def identify_hub_entities(self, top_n=10):
         """Identifica entidades centrais (hubs) na rede."""
-        hub_analysis = []
+        context = self._current_context()
+        metrics = context['node_metrics'] if context else self._node_metrics_frame()
+        if metrics.empty:
+            self.investigation_results['hubs'] = []
+            return []
         
-        for node in self.graph.nodes():
-            node_data = self.graph.nodes[node]
-            
-            # Calcular score de centralidade
-            centrality_score = (
-                node_data.get('total_degree', 0) * 0.3 +
-                node_data.get('total_flow', 0) / 100000 * 0.4 +  # Normalizar valor
-                node_data.get('total_transactions', 0) * 0.3
-            )
-            
+        # Calcular score de centralidade (vetorizado sobre todos os nós)
+        centrality = (
+            metrics['total_degree'] * 0.3 +
+            metrics['total_flow'] / 100000 * 0.4 +  # Normalizar valor
+            metrics['total_transactions'] * 0.3
+        ).to_numpy()
+        
+        # Ordenar por score de centralidade (estável: empates mantêm a ordem dos nós)
+        top = np.argsort(-centrality, kind='stable')[:top_n]
+        
+        hub_analysis = []
+        for i in top:
+            node_data = {col: metrics[col].iat[i] for col in metrics.columns}
             hub_analysis.append({
-                'entity': node,
-                'total_connections': node_data.get('total_degree', 0),
-                'in_connections': node_data.get('in_degree', 0),
-                'out_connections': node_data.get('out_degree', 0),
-                'total_flow': node_data.get('total_flow', 0),
-                'in_flow': node_data.get('in_flow', 0),
-                'out_flow': node_data.get('out_flow', 0),
-                'net_flow': node_data.get('net_flow', 0),
-                'total_transactions': node_data.get('total_transactions', 0),
-                'centrality_score': centrality_score,
-                'risk_level': self._calculate_risk_level(centrality_score)
+                'entity': metrics.index[i],
+                'total_connections': int(node_data['total_degree']),
+                'in_connections': int(node_data['in_degree']),
+                'out_connections': int(node_data['out_degree']),
+                'total_flow': float(node_data['total_flow']),
+                'in_flow': float(node_data['in_flow']),
+                'out_flow': float(node_data['out_flow']),
+                'net_flow': float(node_data['net_flow']),
+                'total_transactions': int(node_data['total_transactions']),
+                'centrality_score': float(centrality[i]),
+                'risk_level': self._calculate_risk_level(centrality[i])
             })
         
-        # Ordenar por score de centralidade
-        hub_analysis.sort(key=lambda x: x['centrality_score'], reverse=True)
-        
-        self.investigation_results['hubs'] = hub_analysis[:top_n]
-        return hub_analysis[:top_n]
+        self.investigation_results['hubs'] = hub_analysis
+        return hub_analysis
+    
+    def _node_metrics_frame(self):
+        """Métricas dos nós (ver _calculate_node_metrics) como DataFrame indexado pela entidade."""
+        columns = ['in_flow', 'out_flow', 'total_flow', 'net_flow', 'in_transactions',
+                   'out_transactions', 'total_transactions', 'in_degree', 'out_degree', 'total_degree']
+        counts = ['in_transactions', 'out_transactions', 'total_transactions',
+                  'in_degree', 'out_degree', 'total_degree']
+        if self.store is not None:
+            acc = self.node_accumulators
+            metrics = pd.DataFrame({name: acc[name][:len(self.store.nodes)] for name in acc},
+                                   index=self.store.nodes)
+            metrics['total_flow'] = metrics['in_flow'] + metrics['out_flow']
+            metrics['net_flow'] = metrics['in_flow'] - metrics['out_flow']
+            metrics['total_transactions'] = metrics['in_transactions'] + metrics['out_transactions']
+            metrics['total_degree'] = metrics['in_degree'] + metrics['out_degree']
+        else:
+            nodes = list(self.graph.nodes(data=True))
+            metrics = pd.DataFrame([data for _, data in nodes], index=[node for node, _ in nodes])
+        metrics = metrics.reindex(columns=columns).fillna(0)
+        return metrics.astype({col: np.int64 for col in counts})
     
     def _calculate_risk_level(self, score):
         """Calcula nível de risco baseado no score."""
@@ -308,65 +1040,204 @@ class AdvancedFraudAnalyzer:
         else:
             return 'BAIXO'
     
-    def detect_unusual_patterns(self):
-        """Detecta padrões incomuns nas transações."""
+    def detect_unusual_patterns(self, robust_z_threshold=None, min_entity_transactions=5):
+        """
+        Detecta padrões incomuns nas transações.
+        
+        Percentis vêm de uma busca binária sobre os valores ordenados e as
+        estatísticas por pessoa de um único groupby, mantendo o custo em
+        O(N log N).
+        
+        Args:
+            robust_z_threshold: Se informado, também marca transações cujo
+                z-score robusto (mediana/MAD da própria pessoa) excede o limiar
+            min_entity_transactions: Mínimo de transações da pessoa para o z-score robusto
+        """
+        if self.stream is not None:
+            if robust_z_threshold is not None:
+                print("⚠️ Z-score robusto por pessoa não disponível na ingestão em blocos")
+            unusual_patterns = self._stream_unusual_patterns()
+            self.suspicious_patterns['unusual'] = unusual_patterns
+            return unusual_patterns
+        
         unusual_patterns = []
+        context = self._current_context()
         
         # Análise de outliers de valores
-        values = self.data['valor'].values
+        if context:
+            values, sorted_values = context['values'], context['sorted_values']
+        else:
+            values = self.data['valor'].to_numpy(dtype=float)
+            sorted_values = np.sort(values)
         q1, q3 = np.percentile(values, [25, 75])
         iqr = q3 - q1
         outlier_threshold = q3 + 1.5 * iqr
         
         outliers = self.data[self.data['valor'] > outlier_threshold]
         
-        for _, transaction in outliers.iterrows():
+        # Percentil = fração de valores estritamente menores que a transação
+        percentiles = np.searchsorted(sorted_values, outliers['valor'].to_numpy(dtype=float),
+                                      side='left') / len(values) * 100
+        dates = outliers['data'] if 'data' in outliers.columns else ['N/A'] * len(outliers)
+        
+        for person, company, value, date, percentile in zip(outliers['nome'], outliers['empresa'],
+                                                             outliers['valor'], dates, percentiles):
             unusual_patterns.append({
                 'type': 'high_value_outlier',
-                'person': transaction['nome'],
-                'company': transaction['empresa'],
-                'value': transaction['valor'],
-                'date': transaction.get('data', 'N/A'),
-                'percentile': (transaction['valor'] > values).mean() * 100,
-                'description': f"Transação {transaction['valor']:.2f} é outlier (acima do percentil {(transaction['valor'] > values).mean() * 100:.1f}%)"
+                'person': person,
+                'company': company,
+                'value': value,
+                'date': date,
+                'percentile': percentile,
+                'description': f"Transação {value:.2f} é outlier (acima do percentil {percentile:.1f}%)"
             })
         
         # Padrões de frequência suspeitos
         person_frequency = self.data['nome'].value_counts()
         high_frequency_persons = person_frequency[person_frequency > person_frequency.quantile(0.9)]
         
+        # Estatísticas de todas as pessoas frequentes em um único groupby
+        frequent = self.data[self.data['nome'].isin(high_frequency_persons.index)]
+        person_stats = frequent.groupby('nome', sort=False).agg(
+            average_value=('valor', 'mean'),
+            total_value=('valor', 'sum'),
+            companies=('empresa', 'nunique')
+        )
+        
         for person, count in high_frequency_persons.items():
-            person_data = self.data[self.data['nome'] == person]
-            avg_value = person_data['valor'].mean()
-            total_value = person_data['valor'].sum()
-            
+            stats = person_stats.loc[person]
             unusual_patterns.append({
                 'type': 'high_frequency',
                 'person': person,
                 'transaction_count': count,
-                'average_value': avg_value,
-                'total_value': total_value,
-                'companies': person_data['empresa'].nunique(),
+                'average_value': stats['average_value'],
+                'total_value': stats['total_value'],
+                'companies': int(stats['companies']),
                 'description': f"{person} tem {count} transações (acima do normal)"
             })
         
+        if robust_z_threshold is not None:
+            unusual_patterns.extend(
+                self._robust_entity_outliers(values, robust_z_threshold, min_entity_transactions)
+            )
+        
         self.suspicious_patterns['unusual'] = unusual_patterns
         return unusual_patterns
     
+    def _stream_unusual_patterns(self):
+        """
+        Padrões incomuns na ingestão em blocos: quartis do esboço de quantis
+        (erro relativo de 1%), outliers listados em uma releitura do arquivo e
+        frequência por pessoa a partir das métricas de saída dos nós.
+        """
+        stream = self.stream
+        unusual_patterns = []
+        
+        q1, q3 = stream.sketch.quantile([0.25, 0.75])
+        outlier_threshold = q3 + 1.5 * (q3 - q1)
+        for chunk in stream.chunks():
+            values = pd.to_numeric(chunk[stream.value_col], errors='coerce').to_numpy(dtype=float)
+            mask = values > outlier_threshold
+            outliers = chunk[mask]
+            percentiles = stream.sketch.rank(values[mask]) * 100
+            dates = outliers[stream.date_col] if stream.has_dates else ['N/A'] * len(outliers)
+            for person, company, value, date, percentile in zip(
+                    outliers[stream.source_col], outliers[stream.target_col], values[mask],
+                    dates, percentiles):
+                unusual_patterns.append({
+                    'type': 'high_value_outlier',
+                    'person': person,
+                    'company': company,
+                    'value': value,
+                    'date': date,
+                    'percentile': percentile,
+                    'description': f"Transação {value:.2f} é outlier (acima do percentil {percentile:.1f}%)"
+                })
+        
+        # Pessoa = origem da transação: contagem, valor e empresas vêm das arestas de saída
+        acc = self.node_accumulators
+        nodes = list(self.node_ids)
+        out_transactions = acc['out_transactions'][:len(nodes)]
+        persons = np.flatnonzero(out_transactions > 0)
+        person_frequency = pd.Series(out_transactions[persons], index=persons).sort_values(
+            ascending=False, kind='stable')
+        high_frequency = person_frequency[person_frequency > person_frequency.quantile(0.9)]
+        
+        for i, count in high_frequency.items():
+            person = nodes[i]
+            unusual_patterns.append({
+                'type': 'high_frequency',
+                'person': person,
+                'transaction_count': int(count),
+                'average_value': acc['out_flow'][i] / count,
+                'total_value': acc['out_flow'][i],
+                'companies': int(acc['out_degree'][i]),
+                'description': f"{person} tem {count} transações (acima do normal)"
+            })
+        return unusual_patterns
+    
+    def _robust_entity_outliers(self, values, threshold, min_transactions):
+        """
+        Transações atípicas para a própria pessoa (z-score robusto).
+        
+        z = 0.6745 * (valor - mediana) / MAD, com mediana e MAD calculadas por
+        pessoa; pessoas com MAD zero ou poucas transações são ignoradas.
+        """
+        context = self._current_context()
+        if context:
+            codes = context['entity_codes']
+        else:
+            codes, _ = pd.factorize(self.data['nome'])
+        
+        series = pd.Series(values)
+        by_entity = series.groupby(codes)
+        median = by_entity.transform('median').to_numpy()
+        deviation = values - median
+        mad = pd.Series(np.abs(deviation)).groupby(codes).transform('median').to_numpy()
+        counts = by_entity.transform('size').to_numpy()
+        
+        valid = (codes >= 0) & (mad > 0) & (counts >= min_transactions)
+        robust_z = np.zeros(len(values))
+        robust_z[valid] = 0.6745 * deviation[valid] / mad[valid]
+        flagged = np.flatnonzero(np.abs(robust_z) > threshold)
+        
+        rows = self.data.iloc[flagged]
+        dates = rows['data'] if 'data' in rows.columns else ['N/A'] * len(rows)
+        
+        outliers = []
+        for person, company, value, date, z, person_median in zip(
+                rows['nome'], rows['empresa'], rows['valor'], dates,
+                robust_z[flagged], median[flagged]):
+            outliers.append({
+                'type': 'entity_robust_outlier',
+                'person': person,
+                'company': company,
+                'value': value,
+                'date': date,
+                'robust_z': z,
+                'entity_median': person_median,
+                'description': f"Transação {value:.2f} foge do padrão de {person} (z robusto {z:.1f}, mediana {person_median:.2f})"
+            })
+        return outliers
+    
     def analyze_temporal_patterns(self):
         """Analisa padrões temporais suspeitos."""
+        if self.stream is not None:
+            temporal_analysis = self._stream_temporal_patterns()
+            self.suspicious_patterns['temporal'] = temporal_analysis
+            return temporal_analysis
         if 'data' not in self.data.columns:
             return []
         
         temporal_analysis = []
         
-        # Análise por dia da semana
-        self.data['day_of_week'] = self.data['data'].dt.dayofweek
-        self.data['hour'] = self.data['data'].dt.hour
+        # Análise por dia da semana (já calculado no contexto do relatório)
+        if self._current_context() is None:
+            self._add_time_parts()
         
         # Transações em horários incomuns (noites, fins de semana)
-        weekend_transactions = self.data[self.data['day_of_week'].isin([5, 6])]
-        night_transactions = self.data[self.data['hour'].isin([22, 23, 0, 1, 2, 3, 4, 5])]
+        weekend_transactions = self.data[self.data['day_of_week'].isin(WEEKEND_DAYS)]
+        night_transactions = self.data[self.data['hour'].isin(NIGHT_HOURS)]
         
         if len(weekend_transactions) > 0:
             temporal_analysis.append({
@@ -389,14 +1260,208 @@ class AdvancedFraudAnalyzer:
         self.suspicious_patterns['temporal'] = temporal_analysis
         return temporal_analysis
     
-    def generate_comprehensive_report(self):
-        """Gera relatório completo da investigação."""
+    def _stream_temporal_patterns(self):
+        """Padrões temporais a partir dos contadores da ingestão em blocos."""
+        stream = self.stream
+        if not stream.has_dates:
+            return []
+        
+        temporal_analysis = []
+        for pattern, key, description in (('weekend_activity', 'weekend', 'transações em fins de semana'),
+                                          ('night_activity', 'night', 'transações noturnas')):
+            count, total_value = stream.temporal[key]
+            if count > 0:
+                temporal_analysis.append({
+                    'pattern': pattern,
+                    'count': count,
+                    'total_value': total_value,
+                    'avg_value': total_value / count,
+                    'description': f"{count} {description}"
+                })
+        return temporal_analysis
+    
+    def _add_date_group(self):
+        """Coluna 'date_group' (dia da transação) usada na detecção de estruturação."""
+        if 'data' in self.data.columns:
+            self.data['date_group'] = self.data['data'].dt.date
+        else:
+            self.data['date_group'] = 'sem_data'
+    
+    def _add_time_parts(self):
+        """Colunas 'day_of_week' e 'hour' usadas na análise temporal."""
+        self.data['day_of_week'] = self.data['data'].dt.dayofweek
+        self.data['hour'] = self.data['data'].dt.hour
+    
+    def build_report_context(self):
+        """
+        Pré-calcula, uma única vez, as estruturas compartilhadas pelos detectores.
+        
+        Inclui as colunas derivadas de data, os valores ordenados, os índices
+        das transações de cada entidade e as métricas dos nós do grafo. Enquanto
+        self.data e self.graph não mudarem, os detectores reutilizam o contexto
+        em vez de varrer os dados novamente. Na ingestão em blocos o contexto
+        tem apenas as métricas dos nós.
+        """
+        if self.stream is not None:
+            self.report_context = {
+                'data_id': id(self.stream),
+                'rows': self.stream.rows,
+                'graph_id': self._graph_token(),
+                'edges': self._graph_size()[1],
+                'node_metrics': self._node_metrics_frame()
+            }
+            return self.report_context
+        
+        self._add_date_group()
+        if 'data' in self.data.columns:
+            self._add_time_parts()
+        
+        values = self.data['valor'].to_numpy(dtype=float)
+        entity_codes, entity_names = pd.factorize(self.data['nome'])
+        
+        self.report_context = {
+            'data_id': id(self.data),
+            'rows': len(self.data),
+            'graph_id': self._graph_token(),
+            'edges': self._graph_size()[1],
+            'values': values,
+            'sorted_values': np.sort(values),
+            'entity_codes': entity_codes,
+            'entity_names': entity_names,
+            'node_metrics': self._node_metrics_frame()
+        }
+        return self.report_context
+    
+    def _current_context(self):
+        """Retorna o contexto do relatório se ainda corresponder aos dados e ao grafo atuais."""
+        context = self.report_context
+        source = self.stream if self.stream is not None else self.data
+        if (context is None or context['data_id'] != id(source) or
+                context['rows'] != self._row_count() or context['graph_id'] != self._graph_token() or
+                context['edges'] != self._graph_size()[1]):
+            return None
+        return context
+    
+    def detector_key(self, name):
+        """Valores dos parâmetros de que o detector 'name' depende (chave de cache)."""
+        return (name,) + tuple(getattr(self, attr) for attr in DETECTOR_PARAMETERS[name])
+    
+    def run_detectors(self, parallel=True, cycle_workers=None, precomputed=None,
+                      on_result=None, cancel=None):
+        """
+        Executa os detectores do relatório sobre um contexto compartilhado.
+        
+        Com parallel=True os detectores independentes rodam ao mesmo tempo em
+        um pool de threads (as operações NumPy/pandas liberam o GIL); a busca
+        de ciclos, que é a análise de grafo mais cara, distribui seu trabalho
+        em um pool de processos (cycle_workers, None = DEFAULT_CYCLE_WORKERS).
+        
+        Args:
+            precomputed: {detector: resultado} já conhecido (por exemplo, de
+                um cache); esses detectores não são executados novamente
+            on_result: Função (detector, resultado, segundos) chamada assim
+                que cada detector termina
+            cancel: Evento (threading.Event); quando sinalizado, detectores
+                ainda não iniciados são descartados, a busca de ciclos para em
+                poucos passos e o retorno é parcial. Os detectores em
+                andamento terminam antes do retorno, então nenhum continua
+                alterando o analisador depois dele
+        
+        Returns:
+            (resultados por detector, tempo de parede em segundos por etapa)
+        """
+        timings = {}
+        results = dict(precomputed or {})
+        if cycle_workers is None:
+            cycle_workers = DEFAULT_CYCLE_WORKERS
+        
+        detectors = {
+            'structuring': lambda: self.detect_structuring_patterns(
+                threshold=self.structuring_threshold, tolerance=self.structuring_tolerance),
+            'circular': lambda: self.detect_circular_transactions(
+                workers=cycle_workers if parallel else 1, cancel=cancel),
+            'hubs': self.identify_hub_entities,
+            'unusual': self.detect_unusual_patterns,
+            'temporal': self.analyze_temporal_patterns
+        }
+        detectors = {name: fn for name, fn in detectors.items() if name not in results}
+        for name in results:
+            timings[name] = 0.0
+        if not detectors:
+            return results, timings
+        
+        start = time.perf_counter()
+        self.build_report_context()
+        timings['context'] = time.perf_counter() - start
+        
+        def timed(name):
+            detector_start = time.perf_counter()
+            result = detectors[name]()
+            return result, time.perf_counter() - detector_start
+        
+        def finished(name, result, seconds):
+            if getattr(result, 'cancelled', False):
+                # Resultado parcial de um detector interrompido
+                return
+            results[name], timings[name] = result, seconds
+            if on_result is not None:
+                on_result(name, result, seconds)
+        
+        if parallel:
+            executor = ThreadPoolExecutor(max_workers=len(detectors))
+            pending = {executor.submit(timed, name): name for name in detectors}
+            while pending:
+                done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finished(pending.pop(future), *future.result())
+                if cancel is not None and cancel.is_set():
+                    break
+            # Ao cancelar descarta os detectores não iniciados e espera os que
+            # estão rodando (os concluídos entram no resultado parcial)
+            executor.shutdown(wait=True, cancel_futures=True)
+            for future, name in pending.items():
+                if not future.cancelled():
+                    finished(name, *future.result())
+        else:
+            for name in detectors:
+                if cancel is not None and cancel.is_set():
+                    break
+                finished(name, *timed(name))
+        
+        return results, timings
+    
+    def generate_comprehensive_report(self, parallel=True, cycle_workers=None, precomputed=None,
+                                      on_result=None, cancel=None):
+        """
+        Gera relatório completo da investigação.
+        
+        Args:
+            parallel: Executa os detectores simultaneamente (ver run_detectors)
+            cycle_workers: Processos da busca de ciclos (None = DEFAULT_CYCLE_WORKERS)
+            precomputed: Resultados de detectores já conhecidos (ver run_detectors)
+            on_result, cancel: Progresso e cancelamento (ver run_detectors); se
+                cancelado, detectores não concluídos aparecem vazios e
+                'complete' é False
+        """
+        report_start = time.perf_counter()
+        
+        # Executar todas as análises
+        results, timings = self.run_detectors(parallel=parallel, cycle_workers=cycle_workers,
+                                              precomputed=precomputed, on_result=on_result,
+                                              cancel=cancel)
+        complete = all(name in results for name in DETECTOR_PARAMETERS)
+        structuring = results.get('structuring', [])
+        circular = results.get('circular', [])
+        hubs = results.get('hubs', [])
+        unusual = results.get('unusual', [])
+        temporal = results.get('temporal', [])
+        if not complete:
+            print("⚠️ Análise cancelada: relatório parcial")
+        
         print("🔍 RELATÓRIO COMPLETO DE INVESTIGAÇÃO FINANCEIRA")
         print("=" * 80)
         
-        # Executar todas as análises
         print("\n📊 1. ANÁLISE DE ESTRUTURAÇÃO (FRACIONAMENTO)")
-        structuring = self.detect_structuring_patterns()
         if structuring:
             print(f"   ⚠️  {len(structuring)} padrões de estruturação detectados")
             for pattern in structuring[:3]:  # Top 3
@@ -405,7 +1470,9 @@ class AdvancedFraudAnalyzer:
             print("   ✅ Nenhum padrão de estruturação detectado")
         
         print("\n🔄 2. ANÁLISE DE TRANSAÇÕES CIRCULARES")
-        circular = self.detect_circular_transactions()
+        circular_search = getattr(circular, 'search', {})
+        if circular_search:
+            print(f"   ℹ️  {self._describe_cycle_search(circular_search)}")
         if circular:
             print(f"   ⚠️  {len(circular)} ciclos suspeitos detectados")
             for cycle in circular[:3]:  # Top 3
@@ -414,14 +1481,12 @@ class AdvancedFraudAnalyzer:
             print("   ✅ Nenhum ciclo suspeito detectado")
         
         print("\n🎯 3. ENTIDADES CENTRAIS (HUBS)")
-        hubs = self.identify_hub_entities()
         if hubs:
             print(f"   📈 Top {len(hubs)} entidades mais conectadas:")
             for hub in hubs[:5]:  # Top 5
                 print(f"   • {hub['entity']}: {hub['total_connections']} conexões, R$ {hub['total_flow']:.2f} total")
         
         print("\n🚨 4. PADRÕES INCOMUNS")
-        unusual = self.detect_unusual_patterns()
         if unusual:
             print(f"   ⚠️  {len(unusual)} padrões incomuns detectados")
             for pattern in unusual[:3]:  # Top 3
@@ -430,7 +1495,6 @@ class AdvancedFraudAnalyzer:
             print("   ✅ Nenhum padrão incomum detectado")
         
         print("\n⏰ 5. ANÁLISE TEMPORAL")
-        temporal = self.analyze_temporal_patterns()
         if temporal:
             for pattern in temporal:
                 print(f"   • {pattern['description']}: R$ {pattern['total_value']:.2f}")
@@ -439,10 +1503,11 @@ class AdvancedFraudAnalyzer:
         
         print("\n" + "=" * 80)
         print("📋 RESUMO EXECUTIVO:")
-        print(f"   • Total de transações analisadas: {len(self.data)}")
-        print(f"   • Entidades únicas: {self.graph.number_of_nodes()}")
-        print(f"   • Conexões totais: {self.graph.number_of_edges()}")
-        print(f"   • Valor total movimentado: R$ {self.data['valor'].sum():.2f}")
+        print(f"   • Total de transações analisadas: {self._row_count()}")
+        n_nodes, n_edges = self._graph_size()
+        print(f"   • Entidades únicas: {n_nodes}")
+        print(f"   • Conexões totais: {n_edges}")
+        print(f"   • Valor total movimentado: R$ {self._total_value():.2f}")
         print(f"   • Alertas de estruturação: {len(structuring)}")
         print(f"   • Ciclos suspeitos: {len(circular)}")
         print(f"   • Padrões incomuns: {len(unusual)}")
@@ -461,22 +1526,44 @@ class AdvancedFraudAnalyzer:
         else:
             print("   ✅ RISCO BAIXO - Padrões normais detectados")
         
+        timings['total'] = time.perf_counter() - report_start
+        print("\n⏱️ TEMPO POR DETECTOR:")
+        for name, seconds in timings.items():
+            print(f"   • {name}: {seconds:.3f}s")
+        
         return {
             'structuring': structuring,
             'circular': circular,
+            'circular_search': circular_search,
             'hubs': hubs,
             'unusual': unusual,
             'temporal': temporal,
-            'risk_score': risk_score
+            'risk_score': risk_score,
+            'timings': timings,
+            'complete': complete
         }
     
-    def create_investigation_visualization(self):
-        """Cria visualização interativa para investigação."""
-        if self.graph.number_of_nodes() == 0:
+    def create_investigation_visualization(self, layout='force', render='svg', level='auto',
+                                           max_edges=5000, payload_budget=None):
+        """
+        Cria visualização interativa para investigação.
+        
+        Args:
+            layout: 'force' ou 'hierarchical' (comunidades primeiro, depois
+                seus membros); as posições ficam em cache por grafo
+            render: 'svg' (Scatter) ou 'webgl' (Scattergl com nível de detalhe)
+            level: Nível de detalhe do modo 'webgl' ('auto', 'detail', 'overview')
+            max_edges: Máximo de arestas desenhadas no modo 'webgl' (maiores valores)
+            payload_budget: Tamanho máximo da figura em bytes no modo 'webgl'
+        """
+        if self._graph_size()[0] == 0:
             return None
         
         # Calcular layout
-        pos = nx.spring_layout(self.graph, k=2, iterations=50)
+        pos = self._layout_positions(layout)
+        
+        if render == 'webgl':
+            return self._webgl_investigation_figure(pos, level, max_edges, payload_budget)
         
         # Preparar dados dos nós
         node_x = []
@@ -563,6 +1650,64 @@ class AdvancedFraudAnalyzer:
         
         return fig
     
+    def _plot_store(self):
+        """CSRGraph da rede (o próprio store no backend 'csr')."""
+        if self.store is not None:
+            return self.store
+        return CSRGraph.from_networkx(self.graph, value_attr='total_value')
+    
+    def _layout_positions(self, layout='force'):
+        """Posições dos nós pelo motor de layout compartilhado (módulo layout)."""
+        store = self._plot_store()
+        
+        labels = None
+        if layout == 'hierarchical':
+            labels, _ = detect_communities(store.number_of_nodes(), store.edge_source,
+                                           store.edge_target, seed=42)
+        return default_engine.layout(store.nodes, store.edge_source, store.edge_target,
+                                     method=layout, iterations=50, labels=labels)
+    
+    def _webgl_investigation_figure(self, pos, level, max_edges, payload_budget):
+        """Versão Scattergl de create_investigation_visualization; estatísticas em self.render_stats."""
+        store = self._plot_store()
+        nodes = store.nodes
+        metrics = self._node_metrics_frame().reindex(nodes).fillna(0)
+        xy = np.array([pos[node] for node in nodes], dtype=float).reshape(-1, 2)
+        sizes = np.clip(10 + metrics['total_flow'].to_numpy() / 10000, 10, 50)
+        
+        labels = None
+        if level == 'overview' or (level == 'auto' and len(nodes) > 5000) or payload_budget:
+            labels, _ = detect_communities(store.number_of_nodes(), store.edge_source,
+                                           store.edge_target, seed=42)
+        
+        fig, self.render_stats = webgl_network_figure(
+            nodes, xy, store.edge_source, store.edge_target, store.edge_values, sizes,
+            metrics['net_flow'].to_numpy(),
+            custom={
+                'Conexões': metrics['total_degree'].to_numpy(),
+                'Fluxo Total': metrics['total_flow'].to_numpy(),
+                'Entrada': metrics['in_flow'].to_numpy(),
+                'Saída': metrics['out_flow'].to_numpy(),
+                'Transações': metrics['total_transactions'].to_numpy()
+            },
+            custom_formats={'Conexões': ',d', 'Fluxo Total': ',.2f', 'Entrada': ',.2f',
+                            'Saída': ',.2f', 'Transações': ',d'},
+            labels=labels, level=level, max_edges=max_edges, payload_budget=payload_budget,
+            colorscale='RdYlBu', colorbar_title="Fluxo Líquido (R$)"
+        )
+        
+        fig.update_layout(
+            title="🔍 Rede de Investigação Financeira",
+            showlegend=False,
+            hovermode='closest',
+            margin=dict(b=20, l=5, r=5, t=40),
+            xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+            yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+            plot_bgcolor='white',
+            height=600
+        )
+        return fig
+    
     def export_investigation_report(self, filename_prefix='investigation_report'):
         """Exporta relatório de investigação."""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -575,8 +1720,8 @@ class AdvancedFraudAnalyzer:
             # Aba principal com resumo
             summary_data = {
                 'Métrica': ['Total Transações', 'Entidades Únicas', 'Valor Total', 'Score de Risco'],
-                'Valor': [len(self.data), self.graph.number_of_nodes(), 
-                         f"R$ {self.data['valor'].sum():,.2f}", f"{report.get('risk_score', 0)}/100"]
+                'Valor': [self._row_count(), self._graph_size()[0], 
+                         f"R$ {self._total_value():,.2f}", f"{report.get('risk_score', 0)}/100"]
             }
             pd.DataFrame(summary_data).to_excel(writer, sheet_name='Resumo', index=False)
             
@@ -10,8 +10,12 @@ import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
-from advanced_fraud_analyzer import AdvancedFraudAnalyzer
+from advanced_fraud_analyzer import AdvancedFraudAnalyzer, DETECTOR_PARAMETERS
+from result_cache import ResultCache, content_hash
+from background_jobs import BackgroundJob
+from prepared_dataset import prepare_dataset
 import io
+import time
 import base64
 from datetime import datetime
 import json
@@ -132,6 +136,129 @@ if 'analyzer' not in st.session_state:
     st.session_state.analysis_complete = False
     st.session_state.investigation_results = {}
 
+# Cache de resultados da sessão: dados tratados, rede, detectores e figura
+if 'result_cache' not in st.session_state:
+    st.session_state.result_cache = ResultCache(max_bytes=512 * 1024 ** 2)
+    st.session_state.file_key = None
+    st.session_state.network_key = None
+    st.session_state.job = None
+cache = st.session_state.result_cache
+
+DETECTOR_LABELS = {
+    'structuring': '📊 Estruturação',
+    'circular': '🔄 Ciclos',
+    'hubs': '🎯 Entidades Centrais',
+    'unusual': '🚨 Padrões Incomuns',
+    'temporal': '⏰ Padrões Temporais'
+}
+
+
+def parse_upload(content, file_extension, key):
+    """
+    Lê e trata o arquivo enviado. O resultado fica em disco como conjunto
+    preparado (chave = hash do conteúdo), então reabrir o mesmo caso em
+    outra sessão não lê a planilha de novo.
+    """
+    loader = AdvancedFraudAnalyzer()
+    
+    def read(source):
+        if file_extension == 'csv':
+            return pd.read_csv(io.BytesIO(source))
+        return pd.read_excel(io.BytesIO(source))
+    
+    def clean(df):
+        df = loader._clean_financial_data(df)
+        return loader._parse_dates(df)
+    
+    df, _ = prepare_dataset(content, read, clean, variant=f"app:{file_extension}", key=key)
+    return df
+
+
+def run_investigation(job, cache, df, file_key, columns, thresholds):
+    """
+    Constrói a rede e gera o relatório em segundo plano (ver BackgroundJob).
+    
+    O cache guarda apenas resultados imutáveis: a agregação das arestas
+    (arrays) para o mesmo arquivo e mapeamento e o resultado de cada
+    detector para os mesmos limiares. Cada execução usa um analisador
+    novo, que fica só nesta sessão. Retorna (analisador, chave da rede,
+    relatório) ou None se cancelada antes do relatório.
+    """
+    source_col, target_col, value_col, date_col = columns
+    alert_threshold, structuring_threshold, tolerance = thresholds
+    job.stage('ingest', rows=len(df))
+    
+    analyzer = AdvancedFraudAnalyzer()
+    analyzer.data = df.copy(deep=False)
+    analyzer.alert_threshold = alert_threshold
+    analyzer.structuring_threshold = structuring_threshold
+    analyzer.structuring_tolerance = tolerance
+    
+    # Construir rede (agregação reaproveitada para o mesmo arquivo e mapeamento)
+    network_key = ('network',) + file_key + columns
+    edges = cache.get(network_key)
+    if edges is None:
+        edges = cache.put(network_key, AdvancedFraudAnalyzer._aggregate_edges(
+            df, source_col, target_col, value_col))
+    if not analyzer.build_transaction_network(source_col=source_col, target_col=target_col,
+                                              value_col=value_col, date_col=date_col,
+                                              edges=edges):
+        raise ValueError("Não foi possível construir a rede de transações")
+    n_nodes, n_edges = analyzer._graph_size()
+    job.stage('network', nodes=n_nodes, edges=n_edges)
+    if job.cancelled():
+        return None
+    
+    # Executar apenas os detectores sem resultado para estes parâmetros
+    detector_keys = {name: network_key + analyzer.detector_key(name)
+                     for name in DETECTOR_PARAMETERS}
+    precomputed = {name: cache.get(key) for name, key in detector_keys.items() if key in cache}
+    
+    def on_result(name, result, seconds):
+        if name not in precomputed:
+            cache.put(detector_keys[name], result)
+        job.publish(name, result)
+        job.stage(name, found=len(result), seconds=seconds)
+    
+    for name, result in precomputed.items():
+        on_result(name, result, 0.0)
+    results = analyzer.generate_comprehensive_report(precomputed=precomputed, on_result=on_result,
+                                                     cancel=job.cancel_event)
+    return analyzer, network_key, results
+
+
+def show_job_progress(job):
+    """Andamento da investigação em segundo plano, com resultados parciais."""
+    snapshot = job.snapshot()
+    stages = snapshot['stages']
+    total_stages = 2 + len(DETECTOR_PARAMETERS)
+    
+    st.markdown('<div class="section-header">⏳ Investigação em Andamento</div>', unsafe_allow_html=True)
+    st.progress(len(stages) / total_stages,
+                text=f"{len(stages)}/{total_stages} etapas • {snapshot['elapsed']:.0f}s")
+    
+    if 'ingest' in stages:
+        st.write(f"✅ **Transações carregadas**: {stages['ingest']['rows']:,}")
+    if 'network' in stages:
+        st.write(f"✅ **Rede construída**: {stages['network']['nodes']:,} entidades, "
+                 f"{stages['network']['edges']:,} conexões")
+    else:
+        st.write("⏳ Construindo rede...")
+    
+    for name, label in DETECTOR_LABELS.items():
+        if name in snapshot['results']:
+            result = snapshot['results'][name]
+            with st.expander(f"✅ {label}: {len(result)} ({stages[name]['seconds']:.1f}s)"):
+                if result:
+                    st.dataframe(pd.DataFrame(result), use_container_width=True)
+        elif 'network' in stages:
+            st.write(f"⏳ {label}...")
+    
+    if job.cancelled():
+        st.info("🛑 Cancelando após a etapa atual...")
+    elif st.button("🛑 CANCELAR INVESTIGAÇÃO"):
+        job.cancel()
+
 # Sidebar para configurações
 st.sidebar.markdown("## ⚙️ Configurações de Investigação")
 st.sidebar.markdown("---")
@@ -179,18 +306,23 @@ if uploaded_file is not None:
     try:
         # Determinar tipo de arquivo
         file_extension = uploaded_file.name.split('.')[-1].lower()
+        content = uploaded_file.getvalue()
+        file_key = (content_hash(content), file_extension)
         
-        if file_extension == 'csv':
-            df = pd.read_csv(uploaded_file)
-        else:
-            df = pd.read_excel(uploaded_file)
+        df = cache.get_or_compute(('parsed',) + file_key,
+                                  lambda: parse_upload(content, file_extension, file_key[0]))
         
-        # Carregar no analisador
-        st.session_state.analyzer.data = df
-        st.session_state.analyzer._clean_financial_data()
-        st.session_state.analyzer._parse_dates()
+        # Carregar no analisador apenas quando o arquivo muda
+        if st.session_state.file_key != file_key:
+            st.session_state.analyzer = AdvancedFraudAnalyzer()
+            st.session_state.analyzer.data = df.copy(deep=False)
+            st.session_state.file_key = file_key
+            st.session_state.network_key = None
+            st.session_state.analysis_complete = False
+            st.session_state.investigation_results = {}
         st.session_state.analyzer.alert_threshold = alert_threshold
         st.session_state.analyzer.structuring_threshold = structuring_threshold
+        st.session_state.analyzer.structuring_tolerance = tolerance
         
         st.session_state.data_loaded = True
         
@@ -238,30 +370,42 @@ if uploaded_file is not None:
         )
         date_col = None if date_col == "Nenhuma" else date_col
         
-        # Botão para iniciar análise
-        if st.sidebar.button("🚀 INICIAR INVESTIGAÇÃO", type="primary"):
-            with st.spinner("🔍 Realizando análise investigativa..."):
-                # Construir rede
-                success = st.session_state.analyzer.build_transaction_network(
-                    source_col=source_col,
-                    target_col=target_col,
-                    value_col=value_col,
-                    date_col=date_col
-                )
-                
-                if success:
-                    # Executar análises
-                    results = st.session_state.analyzer.generate_comprehensive_report()
-                    st.session_state.investigation_results = results
-                    st.session_state.analysis_complete = True
-                    st.sidebar.success("✅ Investigação concluída!")
-                else:
-                    st.sidebar.error("❌ Erro na análise")
+        # Botão para iniciar análise (executada em segundo plano)
+        job_running = st.session_state.job is not None and st.session_state.job.running
+        if st.sidebar.button("🚀 INICIAR INVESTIGAÇÃO", type="primary", disabled=job_running):
+            columns = (source_col, target_col, value_col, date_col)
+            thresholds = (alert_threshold, structuring_threshold, tolerance)
+            st.session_state.job = BackgroundJob(
+                lambda job: run_investigation(job, cache, df, file_key, columns, thresholds)
+            )
         
     except Exception as e:
         st.sidebar.error(f"❌ Erro ao carregar arquivo: {e}")
         st.session_state.data_loaded = False
 
+# Investigação em segundo plano: andamento ou resultado final
+job = st.session_state.job
+if job is not None and job.running:
+    show_job_progress(job)
+    time.sleep(1)
+    st.rerun()
+elif job is not None:
+    st.session_state.job = None
+    if job.status == 'error':
+        st.sidebar.error(f"❌ Erro na análise: {job.error}")
+    elif job.value is None:
+        st.sidebar.warning("🛑 Investigação cancelada")
+    else:
+        analyzer, network_key, results = job.value
+        st.session_state.analyzer = analyzer
+        st.session_state.network_key = network_key
+        st.session_state.investigation_results = results
+        st.session_state.analysis_complete = True
+        if results['complete']:
+            st.sidebar.success(f"✅ Investigação concluída em {job.elapsed():.1f}s!")
+        else:
+            st.sidebar.warning("🛑 Investigação cancelada: exibindo resultados parciais")
+
 # Área principal
 if not st.session_state.data_loaded:
     # Tela de boas-vindas
@@ -451,6 +595,12 @@ else:
         st.markdown('<div class="section-header">🔄 Análise de Transações Circulares</div>', unsafe_allow_html=True)
         
         circular = results.get('circular', [])
+        circular_search = results.get('circular_search') or {}
+        
+        if circular_search:
+            st.caption(f"ℹ️ {AdvancedFraudAnalyzer._describe_cycle_search(circular_search)}")
+            if circular_search.get('truncated'):
+                st.warning("⚠️ A busca de ciclos foi truncada: a lista pode estar incompleta")
         
         if circular:
             st.error(f"🚨 {len(circular)} ciclos suspeitos detectados!")
@@ -516,11 +666,29 @@ else:
     with tab6:
         st.markdown('<div class="section-header">🕸️ Visualização da Rede</div>', unsafe_allow_html=True)
         
-        # Criar visualização
-        fig = analyzer.create_investigation_visualization()
+        # Criar visualização (WebGL com nível de detalhe em redes grandes)
+        large_network = analyzer.graph.number_of_nodes() > 2000
+        render = 'webgl' if large_network else 'svg'
+        
+        def build_figure():
+            figure = analyzer.create_investigation_visualization(render=render)
+            return figure, dict(analyzer.render_stats)
+        
+        # A figura é guardada com o tamanho do payload já medido no modo 'webgl'
+        figure_key = ('figure', st.session_state.network_key, render)
+        cached_figure = cache.get(figure_key) if st.session_state.network_key is not None else None
+        if cached_figure is not None:
+            fig, stats = cached_figure
+        else:
+            fig, stats = build_figure()
+            if st.session_state.network_key is not None and fig is not None:
+                cache.put(figure_key, (fig, stats), size=stats.get('payload_bytes'))
         
         if fig:
             st.plotly_chart(fig, use_container_width=True)
+            if large_network:
+                st.caption(f"Exibindo {stats['nodes_rendered']} nós e {stats['edges_rendered']} de "
+                           f"{stats['edges_total']} conexões ({stats['payload_bytes'] / 1024:,.0f} KB)")
             
             # Controles de visualização
             col1, col2 = st.columns(2)
@@ -1,7 +1,9 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 import os
+import time
 from typing import List, Optional
 import uvicorn
 
@@ -9,12 +11,18 @@ from services.document_processor import DocumentProcessor
 from services.entity_extractor import EntityExtractor
 from services.timeline_builder import TimelineBuilder
 from services.ai_assistant import AIAssistant
+from services.pipeline import PipelinePool, AdmissionMiddleware, analyze_document
+from services.ingestion_jobs import JobStore, IngestionJobs
+from services.upload_storage import UploadSizeLimitMiddleware, UploadTooLarge, save_upload, remove_upload
+from services.analysis_cache import AnalysisCache
 from models.schemas import (
     DocumentAnalysis, 
     EntityRelationship, 
     TimelineEvent,
     QueryRequest,
-    QueryResponse
+    QueryResponse,
+    JobCreated,
+    JobStatus
 )
 
 app = FastAPI(
@@ -23,7 +31,39 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# Configurar CORS
+# Inicializar serviços
+document_processor = DocumentProcessor()
+entity_extractor = EntityExtractor()
+timeline_builder = TimelineBuilder()
+ai_assistant = AIAssistant()
+
+# Processamento de documentos fora do event loop, com fila limitada
+pipeline_pool = PipelinePool()
+
+def register_results(entities, events):
+    """Disponibiliza entidades e eventos de um documento para /timeline e /entities"""
+    entity_extractor.register_entities(entities)
+    timeline_builder.add_events(events)
+
+# Análises já feitas, pelo hash do conteúdo (reenvios não são reprocessados)
+analysis_cache = AnalysisCache()
+
+# Jobs de ingestão em segundo plano, persistidos em SQLite
+ingestion_jobs = IngestionJobs(JobStore(), pipeline_pool, on_complete=register_results, cache=analysis_cache)
+
+# Vagas (no pool e entre os jobs pendentes) reservadas antes de o corpo ser
+# recebido: com a fila cheia a resposta é 429 sem receber o arquivo
+app.add_middleware(AdmissionMiddleware, path="/upload", acquire=pipeline_pool.acquire,
+                   release=lambda _: pipeline_pool.release(), state_key="pipeline_slot")
+app.add_middleware(AdmissionMiddleware, path="/jobs", acquire=ingestion_jobs.new_job,
+                   release=ingestion_jobs.release, state_key="job_id", retry_after=30)
+
+# Uploads acima do limite são recusados antes de o corpo ser recebido (e antes
+# de ocupar uma vaga: o último middleware registrado é a camada mais externa)
+app.add_middleware(UploadSizeLimitMiddleware, paths=["/upload", "/jobs"])
+
+# Configurar CORS (registrado por último: envolve os demais, então as
+# respostas 413 e 429 também levam os cabeçalhos CORS)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],  # React dev server
@@ -32,11 +72,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Inicializar serviços
-document_processor = DocumentProcessor()
-entity_extractor = EntityExtractor()
-timeline_builder = TimelineBuilder()
-ai_assistant = AIAssistant()
+ALLOWED_TYPES = [
+    "application/pdf", "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "text/plain", "text/csv", "application/vnd.ms-excel",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "image/png", "image/jpeg", "image/jpg"
+]
+
+@app.on_event("startup")
+async def start_pipeline():
+    pipeline_pool.start()
+    await ingestion_jobs.resume()
+
+@app.on_event("shutdown")
+async def stop_pipeline():
+    await ingestion_jobs.shutdown()
+    pipeline_pool.shutdown(wait=False)
+    ingestion_jobs.store.close()
 
 @app.get("/")
 async def root():
@@ -47,50 +99,103 @@ async def upload_document(file: UploadFile = File(...)):
     """
     Fazer upload e processar documento (PDF, DOCX, TXT, CSV, XLSX, imagens)
     """
+    started = time.time()
     try:
         # Verificar tipo do arquivo
-        allowed_types = [
-            "application/pdf", "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            "text/plain", "text/csv", "application/vnd.ms-excel",
-            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            "image/png", "image/jpeg", "image/jpg"
-        ]
-        
-        if file.content_type not in allowed_types:
+        if file.content_type not in ALLOWED_TYPES:
             raise HTTPException(status_code=400, detail="Tipo de arquivo não suportado")
         
-        # Salvar arquivo temporariamente
-        upload_dir = "uploads"
-        os.makedirs(upload_dir, exist_ok=True)
-        file_path = os.path.join(upload_dir, file.filename)
+        # A vaga no pool já foi reservada por AdmissionMiddleware, antes de o
+        # corpo ser recebido, e é devolvida por ele ao fim da requisição
+        stored = None
+        try:
+            # Gravar em disco em blocos, com limite de tamanho e hash no mesmo passo
+            try:
+                stored = await save_upload(file)
+            except UploadTooLarge as e:
+                raise HTTPException(status_code=413, detail=str(e))
+            
+            # Reaproveitar a análise de um arquivo com o mesmo conteúdo
+            cached = await run_in_threadpool(analysis_cache.get, stored.sha256)
+            page_timings = None
+            if cached is not None:
+                extracted_text, entities, events = cached
+            else:
+                # Extrair texto, entidades e eventos no pool de processos
+                extracted_text, entities, events, page_timings = await pipeline_pool.run(
+                    analyze_document, stored.path, file.content_type
+                )
+                await run_in_threadpool(analysis_cache.put, stored.sha256, extracted_text, entities, events)
+        finally:
+            # Limpar arquivo temporário
+            if stored is not None:
+                remove_upload(stored.path)
         
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
-        # Processar documento
-        extracted_text = document_processor.process_document(file_path, file.content_type)
-        
-        # Extrair entidades
-        entities = entity_extractor.extract_entities(extracted_text)
-        
-        # Construir eventos da timeline
-        events = timeline_builder.extract_events(extracted_text, entities)
-        
-        # Limpar arquivo temporário
-        os.remove(file_path)
+        # Registrar resultados para /timeline e /entities
+        register_results(entities, events)
         
         return DocumentAnalysis(
             filename=file.filename,
             extracted_text=extracted_text,
             entities=entities,
             events=events,
-            summary=f"Processado {len(entities)} entidades e {len(events)} eventos"
+            summary=f"Processado {len(entities)} entidades e {len(events)} eventos",
+            processing_time=time.time() - started,
+            cached=cached is not None,
+            page_timings=page_timings or None
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao processar documento: {str(e)}")
 
+@app.post("/jobs", response_model=JobCreated, status_code=202)
+async def create_ingestion_job(request: Request, file: UploadFile = File(...)):
+    """
+    Enviar documento para processamento em segundo plano (acompanhar em /jobs/{job_id})
+    """
+    try:
+        if file.content_type not in ALLOWED_TYPES:
+            raise HTTPException(status_code=400, detail="Tipo de arquivo não suportado")
+        
+        # Vaga reservada por AdmissionMiddleware (new_job) antes de o corpo ser
+        # recebido; se o job não for registrado ela é devolvida ao fim da requisição
+        job_id = request.state.job_id
+        try:
+            stored = await save_upload(file, directory=ingestion_jobs.jobs_dir)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        
+        try:
+            job = ingestion_jobs.submit(job_id, file.filename, file.content_type, stored)
+        except Exception:
+            remove_upload(stored.path)
+            raise
+        return JobCreated(job_id=job_id, status=job["status"], filename=file.filename)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao criar job: {str(e)}")
+
+@app.get("/jobs", response_model=List[JobStatus])
+async def list_ingestion_jobs(limit: int = 50):
+    """
+    Listar os jobs de ingestão mais recentes (sem resultados)
+    """
+    return ingestion_jobs.list_jobs(limit=limit)
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_ingestion_job(job_id: str, include_text: bool = False):
+    """
+    Progresso por etapa (extract, entities, events) e, quando concluído, o resultado
+    """
+    job = ingestion_jobs.status(job_id, include_text=include_text)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
+
 @app.get("/timeline", response_model=List[TimelineEvent])
 async def get_timeline(
     start_date: Optional[str] = None,
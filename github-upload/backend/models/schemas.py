@@ -32,6 +32,13 @@ class TimelineEvent(BaseModel):
     confidence: float
     source_document: str
 
+class PageTiming(BaseModel):
+    """Tempo de extração de uma página de PDF"""
+    page: int
+    method: str  # pdfplumber, pypdf2, ocr, empty
+    seconds: float
+    characters: int
+
 class DocumentAnalysis(BaseModel):
     """Resultado da análise de um documento"""
     filename: str
@@ -40,6 +47,37 @@ class DocumentAnalysis(BaseModel):
     events: List[TimelineEvent]
     summary: str
     processing_time: Optional[float] = None
+    cached: bool = False
+    page_timings: Optional[List[PageTiming]] = None
+
+class JobStage(BaseModel):
+    """Etapa de um job de ingestão (extract, entities, events)"""
+    name: str
+    status: str  # pending, running, done, error
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    pages: Optional[List[PageTiming]] = None  # etapa extract de PDFs
+
+class JobCreated(BaseModel):
+    """Resposta ao enviar um documento para processamento em segundo plano"""
+    job_id: str
+    status: str
+    filename: str
+
+class JobStatus(BaseModel):
+    """Estado de um job de ingestão e, quando concluído, o resultado"""
+    job_id: str
+    filename: str
+    sha256: Optional[str] = None
+    size: Optional[int] = None
+    status: str  # queued, running, done, error
+    stage: Optional[str] = None
+    stages: List[JobStage]
+    created_at: datetime
+    updated_at: datetime
+    error: Optional[str] = None
+    text_length: Optional[int] = None
+    result: Optional[DocumentAnalysis] = None
 
 class QueryRequest(BaseModel):
     """Requisição de consulta em linguagem natural"""
@@ -0,0 +1,149 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+import logging
+
+from models.schemas import Entity, TimelineEvent
+from services.pipeline import PIPELINE_VERSION
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.environ.get('INVESTIGIA_ANALYSIS_CACHE_DIR', os.path.join('data', 'analysis_cache'))
+DEFAULT_CACHE_MB = int(os.environ.get('INVESTIGIA_ANALYSIS_CACHE_MB', 1024))
+
+
+class AnalysisCache:
+    """
+    Cache em disco das análises de documentos, endereçado pelo conteúdo
+
+    A chave é o SHA-256 do arquivo mais a versão do pipeline; cada entrada
+    é um JSON com o texto extraído, as entidades e os eventos. O horário de
+    modificação do arquivo marca o último uso: ao passar de max_bytes as
+    entradas usadas há mais tempo são removidas.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None,
+                 version: str = PIPELINE_VERSION):
+        self.directory = directory or DEFAULT_CACHE_DIR
+        self.max_bytes = DEFAULT_CACHE_MB * 1024 ** 2 if max_bytes is None else max_bytes
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # caminho -> tamanho, do uso mais antigo ao mais recente
+        self.total_bytes = 0
+        self._scan()
+
+    def _scan(self):
+        """Reconstrói o índice a partir dos arquivos já gravados."""
+        os.makedirs(self.directory, exist_ok=True)
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.json'):
+                    path = os.path.join(root, name)
+                    stat = os.stat(path)
+                    found.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(found):
+            self._entries[path] = size
+            self.total_bytes += size
+
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.directory, sha256[:2], f"{sha256}-v{self.version}.json")
+
+    def get(self, sha256: str) -> Optional[Tuple[str, List[Entity], List[TimelineEvent]]]:
+        """(texto, entidades, eventos) do arquivo com esse hash, ou None."""
+        path = self._path(sha256)
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+                self._forget(path)
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Entrada de cache inválida {path}: {str(e)}")
+            self.discard(sha256)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            if path in self._entries:
+                self._entries.move_to_end(path)
+        return (entry['text'],
+                [Entity(**item) for item in entry['entities']],
+                [TimelineEvent(**item) for item in entry['events']])
+
+    def put(self, sha256: str, text: str, entities: List[Entity], events: List[TimelineEvent]):
+        """Grava a análise (atomicamente) e remove as entradas mais antigas se preciso."""
+        entry = {
+            'sha256': sha256,
+            'version': self.version,
+            'created_at': time.time(),
+            'text': text,
+            'entities': [entity.model_dump(mode='json') for entity in entities],
+            'events': [event.model_dump(mode='json') for event in events]
+        }
+        path = self._path(sha256)
+        staging = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, staging = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            size = os.path.getsize(staging)
+            if size > self.max_bytes:
+                os.remove(staging)
+                return
+            os.replace(staging, path)
+        except OSError as e:
+            # Falha no cache (ex.: disco cheio) não interrompe o processamento
+            logger.warning(f"Não foi possível gravar no cache de análises: {str(e)}")
+            if staging and os.path.exists(staging):
+                os.remove(staging)
+            return
+
+        with self._lock:
+            self._forget(path)
+            self._entries[path] = size
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes and self._entries:
+                oldest, _ = next(iter(self._entries.items()))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def discard(self, sha256: str):
+        with self._lock:
+            self._remove(self._path(sha256))
+
+    def _forget(self, path: str):
+        if path in self._entries:
+            self.total_bytes -= self._entries.pop(path)
+
+    def _remove(self, path: str):
+        self._forget(path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'version': self.version
+            }
@@ -1,6 +1,8 @@
 import os
+import time
 import pandas as pd
-from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
 import pytesseract
 from PIL import Image
 import PyPDF2
@@ -10,10 +12,104 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Extração de PDF por páginas: processos, páginas por bloco e OCR de páginas sem texto.
+# PDF_WORKERS é o máximo; dentro do PipelinePool cada processo recebe sua parte
+# dos núcleos (ver pipeline.pdf_workers_per_process)
+PDF_WORKERS = int(os.environ.get('INVESTIGIA_PDF_WORKERS', min(4, os.cpu_count() or 1)))
+PDF_PAGES_PER_SHARD = int(os.environ.get('INVESTIGIA_PDF_PAGES_PER_SHARD', 8))
+PDF_OCR_RESOLUTION = 300
+SLOW_PAGE_SECONDS = 10.0
+
+# Pools de extração de páginas por número de processos (criados no primeiro
+# PDF grande do processo que pede aquele número)
+_pdf_executors = {}
+
+def _get_pdf_executor(max_workers: int) -> ProcessPoolExecutor:
+    executor = _pdf_executors.get(max_workers)
+    if executor is None:
+        executor = _pdf_executors[max_workers] = ProcessPoolExecutor(max_workers=max_workers)
+    return executor
+
+def _reset_pdf_executor(max_workers: int):
+    """Descarta o pool de páginas (um processo morreu); o próximo PDF cria outro"""
+    executor = _pdf_executors.pop(max_workers, None)
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def _count_pdf_pages(file_path: str) -> int:
+    """Número de páginas do PDF (PyPDF2, com pdfplumber como alternativa)"""
+    try:
+        return len(PyPDF2.PdfReader(file_path).pages)
+    except Exception:
+        with pdfplumber.open(file_path) as pdf:
+            return len(pdf.pages)
+
+def _extract_pdf_pages(file_path: str, start: int, end: int, ocr: bool = True) -> List[Tuple[Dict, str]]:
+    """
+    Extrai as páginas [start, end) do PDF, cada uma com sua própria alternativa:
+    pdfplumber, depois PyPDF2 e, para páginas sem texto, OCR da página renderizada.
+    Retorna (estatísticas da página, texto) na ordem das páginas.
+    """
+    results = []
+    plumber = None
+    reader = None
+    try:
+        plumber = pdfplumber.open(file_path)
+    except Exception as e:
+        logger.warning(f"pdfplumber não abriu {file_path}: {str(e)}")
+
+    try:
+        for number in range(start, end):
+            started = time.perf_counter()
+            text = ""
+            method = None
+
+            if plumber is not None:
+                try:
+                    text = plumber.pages[number].extract_text() or ""
+                    method = "pdfplumber"
+                except Exception as e:
+                    logger.warning(f"pdfplumber falhou na página {number + 1}: {str(e)}")
+
+            if not text.strip():
+                try:
+                    if reader is None:
+                        reader = PyPDF2.PdfReader(file_path)
+                    text = reader.pages[number].extract_text() or ""
+                    method = "pypdf2"
+                except Exception as e:
+                    logger.warning(f"PyPDF2 falhou na página {number + 1}: {str(e)}")
+
+            if not text.strip() and ocr and plumber is not None:
+                # Página escaneada: renderizar e aplicar OCR
+                try:
+                    image = plumber.pages[number].to_image(resolution=PDF_OCR_RESOLUTION).original
+                    text = pytesseract.image_to_string(image, lang='por+eng') or ""
+                    method = "ocr"
+                except Exception as e:
+                    logger.warning(f"OCR falhou na página {number + 1}: {str(e)}")
+
+            stats = {
+                "page": number + 1,
+                "method": method if text.strip() else "empty",
+                "seconds": time.perf_counter() - started,
+                "characters": len(text)
+            }
+            results.append((stats, text))
+    finally:
+        if plumber is not None:
+            plumber.close()
+    return results
+
 class DocumentProcessor:
     """Processa diferentes tipos de documentos e extrai texto"""
     
-    def __init__(self):
+    def __init__(self, pdf_workers: Optional[int] = None, pages_per_shard: Optional[int] = None):
+        self.pdf_workers = pdf_workers or PDF_WORKERS
+        self.pages_per_shard = pages_per_shard or PDF_PAGES_PER_SHARD
+        # Tempo e método de extração de cada página do último PDF processado
+        self.page_stats = []
+        
         # Configurar Tesseract se estiver no Windows
         if os.name == 'nt':
             # Caminho comum do Tesseract no Windows
@@ -23,6 +119,7 @@ class DocumentProcessor:
         """
         Processa documento baseado no tipo de arquivo
         """
+        self.page_stats = []
         try:
             if content_type == "application/pdf":
                 return self._process_pdf(file_path)
@@ -42,26 +139,41 @@ class DocumentProcessor:
             raise
 
     def _process_pdf(self, file_path: str) -> str:
-        """Extrai texto de arquivo PDF"""
-        text = ""
+        """
+        Extrai texto de arquivo PDF página a página
+        
+        PDFs com mais de pages_per_shard páginas são divididos em blocos de
+        páginas extraídos em paralelo; cada página tem sua própria alternativa
+        (pdfplumber → PyPDF2 → OCR). O tempo de cada página fica em page_stats.
+        """
         try:
-            # Tentar com pdfplumber primeiro (melhor para tabelas)
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-        except:
-            # Fallback para PyPDF2
+            n_pages = _count_pdf_pages(file_path)
+        except Exception as e:
+            logger.error(f"Erro ao processar PDF: {str(e)}")
+            return ""
+        
+        shards = [(start, min(start + self.pages_per_shard, n_pages))
+                  for start in range(0, n_pages, self.pages_per_shard)]
+        pages = None
+        if len(shards) > 1 and self.pdf_workers > 1:
             try:
-                with open(file_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    for page in pdf_reader.pages:
-                        text += page.extract_text() + "\n"
+                executor = _get_pdf_executor(self.pdf_workers)
+                futures = [executor.submit(_extract_pdf_pages, file_path, start, end) for start, end in shards]
+                pages = [page for future in futures for page in future.result()]
             except Exception as e:
-                logger.error(f"Erro ao processar PDF: {str(e)}")
-                
-        return text.strip()
+                # Pool interrompido ou encerrado (BrokenProcessPool é um RuntimeError): descartar
+                if isinstance(e, RuntimeError):
+                    _reset_pdf_executor(self.pdf_workers)
+                logger.warning(f"Extração paralela de páginas falhou, extraindo em sequência: {str(e)}")
+        if pages is None:
+            pages = [page for start, end in shards for page in _extract_pdf_pages(file_path, start, end)]
+        
+        self.page_stats = [stats for stats, _ in pages]
+        for stats in self.page_stats:
+            if stats["seconds"] > SLOW_PAGE_SECONDS:
+                logger.warning(f"Página {stats['page']} de {file_path} levou {stats['seconds']:.1f}s ({stats['method']})")
+        
+        return "\n".join(text for _, text in pages if text).strip()
 
     def _process_docx(self, file_path: str) -> str:
         """Extrai texto de arquivo DOCX"""
@@ -86,6 +86,11 @@ class EntityExtractor:
         
         return sorted(entities, key=lambda x: x.mentions, reverse=True)
 
+    def register_entities(self, entities: List[Entity]):
+        """Armazena entidades extraídas em outro processo (pool de processamento)"""
+        for entity in entities:
+            self.entities_db[entity.name] = entity
+
     def _extract_patterns(self, text: str, entity_counts: Counter, entity_contexts: defaultdict):
         """Extrai padrões específicos usando regex"""
         
@@ -0,0 +1,333 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+
+from fastapi.concurrency import run_in_threadpool
+
+from models.schemas import DocumentAnalysis, Entity, JobStage, JobStatus, TimelineEvent
+from services.pipeline import PipelineBusy, PipelinePool, extract_text, extract_entities, extract_events
+from services.upload_storage import StoredUpload, remove_upload
+from services.analysis_cache import AnalysisCache
+
+logger = logging.getLogger(__name__)
+
+# Etapas de um job, na ordem de execução
+JOB_STAGES = ('extract', 'entities', 'events')
+ACTIVE_STATES = ('queued', 'running')
+
+DEFAULT_JOBS_DB = os.environ.get('INVESTIGIA_JOBS_DB', os.path.join('data', 'jobs.db'))
+DEFAULT_JOBS_DIR = os.environ.get('INVESTIGIA_JOBS_DIR', os.path.join('uploads', 'jobs'))
+DEFAULT_MAX_PENDING = int(os.environ.get('INVESTIGIA_MAX_PENDING_JOBS', 100))
+
+
+class JobStore:
+    """Tabela de jobs em SQLite, com o resultado de cada etapa já concluída"""
+
+    COLUMNS = ('filename', 'content_type', 'file_path', 'sha256', 'size', 'status', 'stage', 'stages',
+               'text', 'entities', 'events', 'error', 'created_at', 'updated_at')
+
+    # Colunas acrescentadas depois da primeira versão da tabela
+    MIGRATIONS = {'sha256': 'TEXT', 'size': 'INTEGER'}
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or DEFAULT_JOBS_DB
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    content_type TEXT NOT NULL,
+                    file_path TEXT,
+                    sha256 TEXT,
+                    size INTEGER,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    stages TEXT NOT NULL,
+                    text TEXT,
+                    entities TEXT,
+                    events TEXT,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            existing = {row['name'] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for name, kind in self.MIGRATIONS.items():
+                if name not in existing:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+
+    def _row(self, row) -> Optional[Dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        job['stages'] = json.loads(job['stages'])
+        return job
+
+    def create(self, job_id: str, filename: str, content_type: str, file_path: str,
+               sha256: Optional[str] = None, size: Optional[int] = None) -> Dict:
+        now = datetime.now().isoformat()
+        stages = {name: {'status': 'pending'} for name in JOB_STAGES}
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, filename, content_type, file_path, sha256, size, status, stages, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, filename, content_type, file_path, sha256, size, json.dumps(stages), now, now)
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row)
+
+    def update(self, job_id: str, **fields):
+        """Atualiza colunas do job (stages pode ser passado como dicionário)."""
+        unknown = set(fields) - set(self.COLUMNS)
+        if unknown:
+            raise ValueError(f"Colunas desconhecidas: {', '.join(sorted(unknown))}")
+        if isinstance(fields.get('stages'), dict):
+            fields['stages'] = json.dumps(fields['stages'])
+        fields['updated_at'] = datetime.now().isoformat()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def list(self, statuses: Optional[Tuple[str, ...]] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Jobs mais recentes primeiro, opcionalmente filtrados por status."""
+        query = "SELECT * FROM jobs"
+        params = []
+        if statuses:
+            query += f" WHERE status IN ({', '.join('?' for _ in statuses)})"
+            params.extend(statuses)
+        query += " ORDER BY created_at DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._row(row) for row in rows]
+
+    def count(self, statuses: Tuple[str, ...]) -> int:
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT COUNT(*) FROM jobs WHERE status IN ({', '.join('?' for _ in statuses)})",
+                statuses
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _dump_models(items) -> str:
+    return json.dumps([item.model_dump(mode='json') for item in items], ensure_ascii=False)
+
+
+def _load_entities(job: Dict) -> List[Entity]:
+    return [Entity(**item) for item in json.loads(job['entities'] or '[]')]
+
+
+def _load_events(job: Dict) -> List[TimelineEvent]:
+    return [TimelineEvent(**item) for item in json.loads(job['events'] or '[]')]
+
+
+class IngestionJobs:
+    """
+    Processamento de documentos em segundo plano (jobs)
+
+    Cada job passa pelas etapas extract, entities e events no pool de
+    processos; o resultado de cada etapa é gravado no JobStore assim que
+    termina. Após um reinício, resume() retoma os jobs pendentes a partir
+    da primeira etapa não concluída. on_complete(entidades, eventos) é
+    chamado para cada job concluído (inclusive os já concluídos, em resume()).
+    Com um AnalysisCache, arquivos já analisados concluem sem passar pelo pool.
+    """
+
+    def __init__(self, store: JobStore, pool: PipelinePool,
+                 on_complete: Optional[Callable[[List[Entity], List[TimelineEvent]], None]] = None,
+                 jobs_dir: Optional[str] = None, max_pending: Optional[int] = None,
+                 cache: Optional[AnalysisCache] = None):
+        self.store = store
+        self.pool = pool
+        self.cache = cache
+        self.on_complete = on_complete
+        self.jobs_dir = jobs_dir or DEFAULT_JOBS_DIR
+        self.max_pending = DEFAULT_MAX_PENDING if max_pending is None else max_pending
+        self.tasks = {}
+        # Vagas reservadas por new_job() cujo arquivo ainda está sendo recebido
+        self.reserved = set()
+
+    def new_job(self) -> str:
+        """
+        Reserva a vaga de um novo job e retorna seu id (PipelineBusy se já há
+        jobs pendentes demais).
+
+        A vaga conta no limite desde já; na API ela é pedida por
+        AdmissionMiddleware antes de o corpo da requisição ser recebido. Ela
+        passa para a tabela em submit() ou é devolvida com release(). Como
+        em PipelinePool.acquire, a reserva só é feita pelo event loop, sem
+        pausa entre a contagem e a reserva.
+        """
+        if self.store.count(ACTIVE_STATES) + len(self.reserved) >= self.max_pending:
+            raise PipelineBusy(f"Muitos jobs pendentes (limite {self.max_pending})")
+        job_id = uuid.uuid4().hex
+        self.reserved.add(job_id)
+        return job_id
+
+    def release(self, job_id: str):
+        """Devolve a vaga de um job que não chegou a ser registrado (ex.: falha no upload)."""
+        self.reserved.discard(job_id)
+
+    def submit(self, job_id: str, filename: str, content_type: str, upload: StoredUpload) -> Dict:
+        """Registra o job para o arquivo já gravado em jobs_dir e agenda sua execução."""
+        try:
+            job = self.store.create(job_id, filename, content_type, upload.path, upload.sha256, upload.size)
+        finally:
+            self.release(job_id)
+        self._schedule(job_id)
+        return job
+
+    def _schedule(self, job_id: str):
+        task = asyncio.create_task(self._run(job_id))
+        self.tasks[job_id] = task
+        task.add_done_callback(lambda _: self.tasks.pop(job_id, None))
+
+    async def _run(self, job_id: str):
+        job = self.store.get(job_id)
+        stages = job['stages']
+        text = job['text']
+        entities = _load_entities(job)
+        events = _load_events(job)
+        current = None
+        try:
+            if await self._complete_from_cache(job, stages):
+                return
+            for name in JOB_STAGES:
+                if stages[name]['status'] == 'done':
+                    continue
+                current = name
+                await self.pool.reserve()
+                try:
+                    stages[name] = {'status': 'running', 'started_at': datetime.now().isoformat()}
+                    self.store.update(job_id, status='running', stage=name, stages=stages)
+                    if name == 'extract':
+                        text, page_stats = await self.pool.run(extract_text, job['file_path'], job['content_type'])
+                        if page_stats:
+                            stages[name]['pages'] = page_stats
+                        output = {'text': text}
+                    elif name == 'entities':
+                        entities = await self.pool.run(extract_entities, text)
+                        output = {'entities': _dump_models(entities)}
+                    else:
+                        events = await self.pool.run(extract_events, text, entities)
+                        output = {'events': _dump_models(events)}
+                finally:
+                    self.pool.release()
+                stages[name].update(status='done', finished_at=datetime.now().isoformat())
+                self.store.update(job_id, stages=stages, **output)
+                if name == 'extract':
+                    remove_upload(job['file_path'])
+
+            self.store.update(job_id, status='done', stage=None)
+            if self.cache is not None and job['sha256']:
+                await run_in_threadpool(self.cache.put, job['sha256'], text, entities, events)
+            if self.on_complete is not None:
+                self.on_complete(entities, events)
+        except asyncio.CancelledError:
+            # Encerramento do servidor: o job continua pendente e é retomado depois
+            raise
+        except Exception as e:
+            logger.error(f"Erro no job {job_id} (etapa {current}): {str(e)}")
+            if current is not None:
+                stages[current].update(status='error', finished_at=datetime.now().isoformat())
+            self.store.update(job_id, status='error', stages=stages, error=str(e))
+            remove_upload(job['file_path'])
+
+    async def _complete_from_cache(self, job: Dict, stages: Dict) -> bool:
+        """Conclui o job com a análise em cache do mesmo conteúdo, se houver."""
+        if self.cache is None or not job['sha256'] or stages['extract']['status'] == 'done':
+            return False
+        cached = await run_in_threadpool(self.cache.get, job['sha256'])
+        if cached is None:
+            return False
+        text, entities, events = cached
+        now = datetime.now().isoformat()
+        for name in JOB_STAGES:
+            stages[name] = {'status': 'done', 'started_at': now, 'finished_at': now}
+        self.store.update(job['id'], status='done', stage=None, stages=stages, text=text,
+                          entities=_dump_models(entities), events=_dump_models(events))
+        remove_upload(job['file_path'])
+        if self.on_complete is not None:
+            self.on_complete(entities, events)
+        return True
+
+    async def resume(self):
+        """Reaplica os resultados concluídos e retoma os jobs pendentes."""
+        if self.on_complete is not None:
+            for job in reversed(self.store.list(statuses=('done',))):
+                self.on_complete(_load_entities(job), _load_events(job))
+
+        for job in reversed(self.store.list(statuses=ACTIVE_STATES)):
+            if job['stages']['extract']['status'] != 'done' and not os.path.exists(job['file_path'] or ''):
+                self.store.update(job['id'], status='error', error="Arquivo do job não encontrado")
+                continue
+            logger.info(f"Retomando job {job['id']} ({job['filename']})")
+            self._schedule(job['id'])
+
+    async def shutdown(self):
+        """Interrompe os jobs em andamento (ficam pendentes no banco)."""
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def status(self, job_id: str, include_text: bool = False) -> Optional[JobStatus]:
+        job = self.store.get(job_id)
+        return None if job is None else self._status(job, include_text)
+
+    def list_jobs(self, limit: int = 50) -> List[JobStatus]:
+        return [self._status(job, include_result=False) for job in self.store.list(limit=limit)]
+
+    def _status(self, job: Dict, include_text: bool = False, include_result: bool = True) -> JobStatus:
+        stages = [JobStage(name=name, **job['stages'][name]) for name in JOB_STAGES]
+        result = None
+        if include_result and job['status'] == 'done':
+            entities = _load_entities(job)
+            events = _load_events(job)
+            result = DocumentAnalysis(
+                filename=job['filename'],
+                # O texto completo só é enviado quando pedido (include_text)
+                extracted_text=(job['text'] or '') if include_text else '',
+                entities=entities,
+                events=events,
+                summary=f"Processado {len(entities)} entidades e {len(events)} eventos",
+                processing_time=sum((stage.finished_at - stage.started_at).total_seconds()
+                                    for stage in stages if stage.started_at and stage.finished_at)
+            )
+        return JobStatus(
+            job_id=job['id'],
+            filename=job['filename'],
+            sha256=job['sha256'],
+            size=job['size'],
+            status=job['status'],
+            stage=job['stage'],
+            stages=stages,
+            created_at=job['created_at'],
+            updated_at=job['updated_at'],
+            error=job['error'],
+            text_length=len(job['text']) if job['text'] is not None else None,
+            result=result
+        )
@@ -0,0 +1,227 @@
+import asyncio
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+
+from fastapi.responses import JSONResponse
+
+from models.schemas import Entity, TimelineEvent
+
+logger = logging.getLogger(__name__)
+
+# Versão do pipeline de extração: mudar sempre que o texto, as entidades ou
+# os eventos extraídos de um mesmo arquivo puderem mudar (invalida o cache)
+PIPELINE_VERSION = '2'
+
+# Processos do pool e quantos documentos podem aguardar na fila além deles
+DEFAULT_WORKERS = int(os.environ.get('INVESTIGIA_PIPELINE_WORKERS', max(1, (os.cpu_count() or 2) - 1)))
+DEFAULT_QUEUE = int(os.environ.get('INVESTIGIA_PIPELINE_QUEUE', 4))
+
+# Serviços de cada processo do pool (o modelo spaCy é carregado uma vez por processo)
+_services = {}
+
+
+def pdf_workers_per_process(max_workers: int) -> int:
+    """
+    Processos de extração de páginas de PDF para cada processo do pool.
+
+    Os núcleos são divididos entre os dois níveis (pool x páginas), limitado
+    por INVESTIGIA_PDF_WORKERS; com o padrão de CPUs - 1 processos no pool a
+    extração de páginas é sequencial dentro de cada um.
+    """
+    from services.document_processor import PDF_WORKERS
+
+    return max(1, min(PDF_WORKERS, (os.cpu_count() or 1) // max(1, max_workers)))
+
+
+def _init_worker(pdf_workers: int = 1):
+    """Inicializa os serviços no processo do pool."""
+    from services.document_processor import DocumentProcessor
+    from services.entity_extractor import EntityExtractor
+    from services.timeline_builder import TimelineBuilder
+
+    _services['processor'] = DocumentProcessor(pdf_workers=pdf_workers)
+    _services['extractor'] = EntityExtractor()
+    _services['timeline'] = TimelineBuilder()
+
+
+def extract_text(file_path: str, content_type: str) -> Tuple[str, List[Dict]]:
+    """Etapa de extração de texto (executada no pool), com o tempo de cada página de PDF."""
+    processor = _services['processor']
+    text = processor.process_document(file_path, content_type)
+    return text, processor.page_stats
+
+
+def extract_entities(text: str) -> List[Entity]:
+    """Etapa de reconhecimento de entidades (executada no pool)."""
+    extractor = _services['extractor']
+    try:
+        return extractor.extract_entities(text)
+    finally:
+        # O estado acumulado fica no processo da API, não no pool
+        extractor.entities_db.clear()
+
+
+def extract_events(text: str, entities: List[Entity]) -> List[TimelineEvent]:
+    """Etapa de extração de eventos da timeline (executada no pool)."""
+    timeline = _services['timeline']
+    try:
+        return timeline.extract_events(text, entities)
+    finally:
+        timeline.events_db.clear()
+
+
+def analyze_document(file_path: str, content_type: str) -> Tuple[str, List[Entity], List[TimelineEvent], List[Dict]]:
+    """Texto, entidades, eventos e tempos por página de um documento, em uma única tarefa do pool."""
+    text, page_stats = extract_text(file_path, content_type)
+    entities = extract_entities(text)
+    return text, entities, extract_events(text, entities), page_stats
+
+
+class PipelineBusy(Exception):
+    """A fila do pool está cheia; o cliente deve tentar de novo mais tarde."""
+
+
+class PipelinePool:
+    """
+    Pool de processos para o processamento de documentos (PDF/OCR, spaCy, timeline)
+
+    O trabalho pesado sai do event loop, que continua atendendo /timeline,
+    /entities e /query. No máximo max_workers + max_queue documentos são
+    aceitos ao mesmo tempo; acima disso acquire() levanta PipelineBusy.
+    Tarefas em segundo plano usam reserve(), que espera um processo livre
+    em vez de recusar, sem ocupar a fila das requisições.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_queue: Optional[int] = None):
+        self.max_workers = max_workers or DEFAULT_WORKERS
+        self.max_queue = DEFAULT_QUEUE if max_queue is None else max_queue
+        self.in_flight = 0
+        self.executor = None
+        self._waiters = deque()
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def start(self):
+        if self.executor is None:
+            # 'spawn': os processos não herdam threads nem o estado do servidor
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(pdf_workers_per_process(self.max_workers),)
+            )
+        return self.executor
+
+    def shutdown(self, wait: bool = True):
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait, cancel_futures=True)
+            self.executor = None
+
+    def acquire(self):
+        """Reserva uma vaga (o contador só é alterado pelo event loop)."""
+        if self.in_flight >= self.capacity:
+            raise PipelineBusy(f"Fila de processamento cheia ({self.in_flight} documentos em andamento)")
+        self.in_flight += 1
+
+    async def reserve(self):
+        """Espera até haver um processo livre e reserva a vaga."""
+        while self.in_flight >= self.max_workers:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif waiter.done() and not waiter.cancelled():
+                    # Foi acordado e cancelado em seguida: passa a vez adiante
+                    self._wake_next()
+                raise
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight = max(0, self.in_flight - 1)
+        self._wake_next()
+
+    def _wake_next(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+
+    async def run(self, fn, *args):
+        """Executa fn(*args) no pool sem bloquear o event loop (vaga já reservada)."""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.start(), fn, *args)
+        except BrokenProcessPool:
+            # Um processo morreu (ex.: falta de memória): recria o pool na próxima tarefa
+            logger.error("Pool de processamento interrompido; será recriado")
+            self.shutdown(wait=False)
+            raise
+
+    async def submit(self, fn, *args):
+        """Reserva uma vaga, executa fn(*args) no pool e libera a vaga."""
+        self.acquire()
+        try:
+            return await self.run(fn, *args)
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            'workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'in_flight': self.in_flight,
+            'capacity': self.capacity
+        }
+
+
+class AdmissionMiddleware:
+    """
+    Middleware ASGI que reserva a vaga de processamento antes de receber o corpo
+
+    O Starlette grava todo o corpo multipart antes de o endpoint rodar, então
+    uma recusa por fila cheia feita no endpoint só acontece depois do upload
+    completo. Aqui, para POST em 'path', acquire() é chamado antes de ler o
+    corpo: PipelineBusy vira 429 (com Retry-After) sem receber o arquivo. O
+    valor retornado fica em request.state.<state_key> para o endpoint e é
+    devolvido com release(valor) ao fim da requisição, qualquer que seja o
+    resultado.
+    """
+
+    def __init__(self, app, path: str, acquire: Callable[[], Any], release: Callable[[Any], None],
+                 state_key: str = 'admission', retry_after: int = 5):
+        self.app = app
+        self.path = path
+        self.acquire = acquire
+        self.release = release
+        self.state_key = state_key
+        self.retry_after = retry_after
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] != 'POST' or scope['path'] != self.path:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            token = self.acquire()
+        except PipelineBusy as e:
+            response = JSONResponse(status_code=429, content={"detail": str(e)},
+                                    headers={"Retry-After": str(self.retry_after)})
+            await response(scope, receive, send)
+            return
+
+        scope.setdefault('state', {})[self.state_key] = token
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.release(token)
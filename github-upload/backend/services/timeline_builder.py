@@ -66,6 +66,11 @@ class TimelineBuilder:
         
         return sorted(events, key=lambda x: x.date)
 
+    def add_events(self, events: List[TimelineEvent]):
+        """Armazena eventos extraídos em outro processo (pool de processamento), sem repetir ids"""
+        known = {event.id for event in self.events_db}
+        self.events_db.extend(event for event in events if event.id not in known)
+
     def _extract_dates(self, text: str) -> List[Dict[str, Any]]:
         """Extrai datas do texto"""
         dates_found = []
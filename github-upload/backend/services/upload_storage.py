@@ -0,0 +1,143 @@
+import hashlib
+import os
+import tempfile
+from typing import Iterable, NamedTuple, Optional
+import logging
+
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_UPLOAD_DIR = os.environ.get('INVESTIGIA_UPLOAD_DIR', 'uploads')
+MAX_UPLOAD_BYTES = int(os.environ.get('INVESTIGIA_MAX_UPLOAD_MB', 2048)) * 1024 ** 2
+CHUNK_SIZE = 1024 ** 2
+# Folga para os cabeçalhos e delimitadores do multipart em volta do arquivo
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """O arquivo enviado passa do limite de tamanho."""
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Middleware ASGI que recusa (413) corpos de upload grandes demais
+
+    O Starlette grava todo o corpo multipart em um arquivo temporário antes
+    de o endpoint rodar, então o limite de save_upload sozinho só atua
+    depois do upload completo. Aqui o Content-Length é verificado antes de
+    ler o corpo e, sem ele (chunked), os bytes são contados enquanto chegam
+    e a leitura é interrompida ao passar de max_bytes + MULTIPART_OVERHEAD
+    (com HTTPException, que o FastAPI repassa em vez de tratar como corpo
+    inválido).
+    """
+
+    def __init__(self, app, paths: Iterable[str], max_bytes: Optional[int] = None):
+        self.app = app
+        self.paths = set(paths)
+        self.max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+
+    def _detail(self) -> str:
+        return f"Arquivo maior que o limite de {self.max_bytes // 1024 ** 2} MB"
+
+    def _too_large(self) -> JSONResponse:
+        return JSONResponse(status_code=413, content={"detail": self._detail()})
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] != 'POST' or scope['path'] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.max_bytes + MULTIPART_OVERHEAD
+        length = dict(scope['headers']).get(b'content-length')
+        if length is not None and length.isdigit() and int(length) > limit:
+            await self._too_large()(scope, receive, send)
+            return
+
+        received = 0
+        started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=self._detail())
+            return message
+
+        async def tracked_send(message):
+            nonlocal started
+            if message['type'] == 'http.response.start':
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except HTTPException as e:
+            if started or e.status_code != 413:
+                raise
+            await self._too_large()(scope, receive, send)
+
+
+class StoredUpload(NamedTuple):
+    """Arquivo gravado em disco: caminho único, tamanho em bytes e SHA-256 do conteúdo"""
+    path: str
+    size: int
+    sha256: str
+
+
+async def save_upload(file: UploadFile, directory: Optional[str] = None,
+                      max_bytes: Optional[int] = None, chunk_size: int = CHUNK_SIZE) -> StoredUpload:
+    """
+    Grava o upload em blocos em um caminho temporário único
+
+    O limite de tamanho é verificado durante a cópia e o hash é calculado
+    no mesmo passo; o arquivo nunca fica inteiro na memória. Em caso de
+    erro (inclusive UploadTooLarge) o arquivo parcial é removido.
+
+    Quando o endpoint roda, o Starlette já gravou o corpo inteiro em seu
+    próprio arquivo temporário: esta cópia é a segunda gravação, e o limite
+    daqui só vale para o arquivo em si. A recusa antecipada (antes de
+    receber o corpo) é feita por UploadSizeLimitMiddleware.
+    """
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLarge(f"Arquivo maior que o limite de {max_bytes // 1024 ** 2} MB")
+
+    directory = directory or DEFAULT_UPLOAD_DIR
+    os.makedirs(directory, exist_ok=True)
+    # A extensão original é mantida (o processador de planilhas depende dela)
+    extension = os.path.splitext(file.filename or '')[1].lower()
+    fd, path = tempfile.mkstemp(dir=directory, prefix='upload-', suffix=extension)
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Arquivo maior que o limite de {max_bytes // 1024 ** 2} MB")
+                digest.update(chunk)
+                await run_in_threadpool(out.write, chunk)
+    except BaseException:
+        remove_upload(path)
+        raise
+    return StoredUpload(path=path, size=size, sha256=digest.hexdigest())
+
+
+def remove_upload(path: Optional[str]):
+    """Remove o arquivo gravado, se ainda existir."""
+    try:
+        if path:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Não foi possível remover {path}: {str(e)}")
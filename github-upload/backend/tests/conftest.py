@@ -0,0 +1,11 @@
+"""
+Testes do backend: os módulos (services, models) são importados a partir
+do diretório backend, como quando a API roda com 'python main.py'
+"""
+
+import os
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND not in sys.path:
+    sys.path.insert(0, BACKEND)
@@ -0,0 +1,72 @@
+"""Cache de análises: acerto pelo hash, chave por versão e remoção LRU"""
+
+import os
+from datetime import datetime
+import pytest
+
+pytest.importorskip('fastapi')
+
+from models.schemas import Entity, TimelineEvent
+from services.analysis_cache import AnalysisCache
+
+ENTITIES = [Entity(name='Empresa X', type='ORG', confidence=0.8, mentions=2, context=['... Empresa X ...'])]
+EVENTS = [TimelineEvent(id='e1', date=datetime(2024, 5, 1), title='Pagamento', description='...',
+                        entities_involved=['Empresa X'], event_type='transaction', amount=1500.0,
+                        confidence=0.7, source_document='doc.pdf')]
+
+
+def sha(n):
+    return f"{n:064x}"
+
+
+def test_hit_returns_the_stored_analysis(tmp_path):
+    cache = AnalysisCache(str(tmp_path), version='1')
+    assert cache.get(sha(1)) is None
+    cache.put(sha(1), 'texto', ENTITIES, EVENTS)
+
+    text, entities, events = cache.get(sha(1))
+    assert (text, entities, events) == ('texto', ENTITIES, EVENTS)
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+    # Outra instância (reinício) encontra a entrada no disco
+    assert AnalysisCache(str(tmp_path), version='1').get(sha(1))[0] == 'texto'
+
+
+def test_entries_are_keyed_by_pipeline_version(tmp_path):
+    AnalysisCache(str(tmp_path), version='1').put(sha(1), 'antigo', ENTITIES, EVENTS)
+    newer = AnalysisCache(str(tmp_path), version='2')
+    assert newer.get(sha(1)) is None
+    newer.put(sha(1), 'novo', ENTITIES, EVENTS)
+    assert AnalysisCache(str(tmp_path), version='1').get(sha(1))[0] == 'antigo'
+    assert newer.get(sha(1))[0] == 'novo'
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    probe = AnalysisCache(str(tmp_path / 'probe'))
+    probe.put(sha(0), 'x' * 1000, ENTITIES, EVENTS)
+    size = probe.stats()['bytes']
+
+    cache = AnalysisCache(str(tmp_path / 'cache'), max_bytes=int(size * 2.5))
+    for n in (1, 2):
+        cache.put(sha(n), 'x' * 1000, ENTITIES, EVENTS)
+    assert cache.get(sha(1)) is not None  # 1 passa a ser o mais recente
+    cache.put(sha(3), 'x' * 1000, ENTITIES, EVENTS)
+
+    assert cache.get(sha(2)) is None
+    assert cache.get(sha(1)) is not None and cache.get(sha(3)) is not None
+    stats = cache.stats()
+    assert stats['entries'] == 2 and stats['evictions'] == 1 and stats['bytes'] <= cache.max_bytes
+
+    # Uma entrada maior que o cache inteiro não é gravada
+    cache.put(sha(4), 'x' * (size * 3), ENTITIES, EVENTS)
+    assert cache.get(sha(4)) is None and cache.stats()['entries'] == 2
+
+
+def test_corrupt_entry_is_discarded(tmp_path):
+    cache = AnalysisCache(str(tmp_path))
+    cache.put(sha(1), 'texto', ENTITIES, EVENTS)
+    path = cache._path(sha(1))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{incompleto')
+    assert cache.get(sha(1)) is None
+    assert not os.path.exists(path) and cache.stats()['entries'] == 0
@@ -0,0 +1,99 @@
+"""Extração de PDF por páginas: alternativa por página, ordem e volta à extração em sequência"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+for module in ('pdfplumber', 'PyPDF2', 'pytesseract', 'docx', 'PIL'):
+    pytest.importorskip(module)
+
+from services import document_processor
+from services.document_processor import DocumentProcessor, _extract_pdf_pages
+
+
+class FakePage:
+    def __init__(self, text):
+        self.text = text
+
+    def extract_text(self):
+        if isinstance(self.text, Exception):
+            raise self.text
+        return self.text
+
+    def to_image(self, resolution):
+        return type('Image', (), {'original': f"imagem {resolution}"})()
+
+
+class FakePlumber:
+    def __init__(self, texts):
+        self.pages = [FakePage(text) for text in texts]
+
+    def close(self):
+        pass
+
+
+class FakeReader:
+    def __init__(self, texts):
+        self.pages = [FakePage(text) for text in texts]
+
+
+def test_each_page_has_its_own_fallback(monkeypatch):
+    plumber = ['pagina 1', ValueError('fonte quebrada'), '', '']
+    pypdf2 = ['', 'pagina 2', '', '']
+    ocr = iter(['pagina 3', ''])
+    monkeypatch.setattr(document_processor.pdfplumber, 'open', lambda path: FakePlumber(plumber))
+    monkeypatch.setattr(document_processor.PyPDF2, 'PdfReader', lambda path: FakeReader(pypdf2))
+    monkeypatch.setattr(document_processor.pytesseract, 'image_to_string', lambda image, lang: next(ocr))
+
+    pages = _extract_pdf_pages('doc.pdf', 0, 4)
+    assert [text for _, text in pages] == ['pagina 1', 'pagina 2', 'pagina 3', '']
+    assert [stats['method'] for stats, _ in pages] == ['pdfplumber', 'pypdf2', 'ocr', 'empty']
+    assert [stats['page'] for stats, _ in pages] == [1, 2, 3, 4]
+
+
+def fake_pages(file_path, start, end, ocr=True):
+    # Blocos iniciais terminam por último: a ordem não pode depender da conclusão
+    time.sleep(0.02 * (10 - start // 2))
+    return [({'page': n + 1, 'method': 'pdfplumber', 'seconds': 0.0, 'characters': 2}, f"p{n + 1}")
+            for n in range(start, end)]
+
+
+@pytest.fixture
+def paged_pdf(monkeypatch):
+    monkeypatch.setattr(document_processor, '_count_pdf_pages', lambda path: 9)
+    monkeypatch.setattr(document_processor, '_extract_pdf_pages', fake_pages)
+    return DocumentProcessor(pdf_workers=4, pages_per_shard=2)
+
+
+def test_parallel_shards_keep_page_order(paged_pdf, monkeypatch):
+    with ThreadPoolExecutor(4) as executor:
+        monkeypatch.setattr(document_processor, '_get_pdf_executor', lambda workers: executor)
+        text = paged_pdf._process_pdf('doc.pdf')
+    assert text == '\n'.join(f"p{n}" for n in range(1, 10))
+    assert [stats['page'] for stats in paged_pdf.page_stats] == list(range(1, 10))
+
+
+@pytest.mark.parametrize('error', [RuntimeError('pool encerrado'), OSError('sem processos'),
+                                   TypeError('não serializável')])
+def test_any_executor_error_falls_back_to_sequential(paged_pdf, monkeypatch, error):
+    class FailingExecutor:
+        def submit(self, *args):
+            raise error
+
+    reset = []
+    monkeypatch.setattr(document_processor, '_get_pdf_executor', lambda workers: FailingExecutor())
+    monkeypatch.setattr(document_processor, '_reset_pdf_executor', reset.append)
+    assert paged_pdf._process_pdf('doc.pdf') == '\n'.join(f"p{n}" for n in range(1, 10))
+    assert reset == ([4] if isinstance(error, RuntimeError) else [])
+
+
+def test_pools_are_keyed_by_worker_count():
+    try:
+        two = document_processor._get_pdf_executor(2)
+        assert document_processor._get_pdf_executor(2) is two
+        three = document_processor._get_pdf_executor(3)
+        assert three is not two and three._max_workers == 3 and two._max_workers == 2
+    finally:
+        document_processor._reset_pdf_executor(2)
+        document_processor._reset_pdf_executor(3)
+    assert document_processor._pdf_executors == {}
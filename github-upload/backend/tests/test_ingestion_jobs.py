@@ -0,0 +1,155 @@
+"""Jobs de ingestão: etapas gravadas no SQLite e retomada após reinício"""
+
+import asyncio
+import os
+from datetime import datetime
+import pytest
+
+pytest.importorskip('fastapi')
+
+from models.schemas import Entity, TimelineEvent
+from services import pipeline
+from services.ingestion_jobs import IngestionJobs, JobStore
+from services.pipeline import PipelineBusy
+from services.upload_storage import StoredUpload
+
+
+class FakePool:
+    """Executa as etapas no próprio processo e registra quais rodaram."""
+
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+
+    async def reserve(self):
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+
+    async def run(self, fn, *args):
+        self.calls.append(fn.__name__)
+        if fn is pipeline.extract_text:
+            with open(args[0], encoding='utf-8') as f:
+                return f.read(), [{'page': 1, 'seconds': 0.01}]
+        if fn is pipeline.extract_entities:
+            return [Entity(name=word, type='ORG', confidence=0.9, mentions=1, context=[])
+                    for word in args[0].split()]
+        return [TimelineEvent(id='e1', date=datetime(2024, 1, 2), title='Evento', description=args[0],
+                              entities_involved=[e.name for e in args[1]], event_type='document',
+                              confidence=0.5, source_document='doc')]
+
+
+def upload(directory, text='Alfa Beta'):
+    path = os.path.join(directory, 'doc.txt')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return StoredUpload(path=path, size=len(text), sha256='0' * 64)
+
+
+async def wait(jobs):
+    while jobs.tasks:
+        await asyncio.gather(*list(jobs.tasks.values()))
+
+
+def test_stages_are_persisted(tmp_path):
+    completed = []
+
+    async def scenario():
+        store = JobStore(str(tmp_path / 'jobs.db'))
+        jobs = IngestionJobs(store, FakePool(), on_complete=lambda e, v: completed.append((e, v)),
+                             jobs_dir=str(tmp_path))
+        job_id = jobs.new_job()
+        stored = upload(str(tmp_path))
+        jobs.submit(job_id, 'doc.txt', 'text/plain', stored)
+        await wait(jobs)
+        store.close()
+        return job_id, stored
+
+    job_id, stored = asyncio.run(scenario())
+
+    # Nova conexão: tudo o que foi produzido está no banco
+    job = JobStore(str(tmp_path / 'jobs.db')).get(job_id)
+    assert job['status'] == 'done' and job['stage'] is None
+    assert [job['stages'][name]['status'] for name in ('extract', 'entities', 'events')] == ['done'] * 3
+    assert job['stages']['extract']['pages'] == [{'page': 1, 'seconds': 0.01}]
+    assert job['text'] == 'Alfa Beta'
+    assert '"Alfa"' in job['entities'] and '"e1"' in job['events']
+    assert not os.path.exists(stored.path)
+    assert [entity.name for entity in completed[0][0]] == ['Alfa', 'Beta']
+
+
+def test_resume_continues_from_the_first_unfinished_stage(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.db'))
+    now = datetime.now().isoformat()
+    # Interrompido depois da extração (arquivo já removido)
+    store.create('interrompido', 'a.txt', 'text/plain', str(tmp_path / 'removido.txt'))
+    store.update('interrompido', status='running', stage='entities', text='Gama Delta', stages={
+        'extract': {'status': 'done', 'started_at': now, 'finished_at': now},
+        'entities': {'status': 'running', 'started_at': now},
+        'events': {'status': 'pending'}
+    })
+    # Na fila, mas o arquivo sumiu antes da extração
+    store.create('sem_arquivo', 'b.txt', 'text/plain', str(tmp_path / 'nao_existe.txt'))
+
+    pool = FakePool()
+    completed = []
+    jobs = IngestionJobs(store, pool, on_complete=lambda e, v: completed.append(e), jobs_dir=str(tmp_path))
+
+    async def scenario():
+        await jobs.resume()
+        await wait(jobs)
+
+    asyncio.run(scenario())
+    assert pool.calls == ['extract_entities', 'extract_events']
+    job = store.get('interrompido')
+    assert job['status'] == 'done' and job['text'] == 'Gama Delta'
+    assert job['stages']['extract']['finished_at'] == now
+    assert store.get('sem_arquivo')['status'] == 'error'
+    assert [[entity.name for entity in entities] for entities in completed] == [['Gama', 'Delta']]
+
+    # Um novo reinício reaplica os resultados concluídos sem reprocessar
+    completed.clear()
+    asyncio.run(IngestionJobs(store, pool, on_complete=lambda e, v: completed.append(e)).resume())
+    assert len(pool.calls) == 2 and len(completed) == 1
+
+
+def test_reserved_jobs_count_towards_the_limit(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.db'))
+    jobs = IngestionJobs(store, FakePool(), jobs_dir=str(tmp_path), max_pending=2)
+    first = jobs.new_job()
+    jobs.new_job()
+    with pytest.raises(PipelineBusy):
+        jobs.new_job()
+    jobs.release(first)
+    jobs.new_job()
+    assert len(jobs.reserved) == 2
+
+
+def test_jobs_endpoint_is_admitted_before_the_upload(tmp_path):
+    from fastapi import FastAPI, File, Request, UploadFile
+    from fastapi.testclient import TestClient
+    from services.pipeline import AdmissionMiddleware
+
+    jobs = IngestionJobs(JobStore(str(tmp_path / 'jobs.db')), FakePool(), jobs_dir=str(tmp_path),
+                         max_pending=1)
+    seen = []
+    app = FastAPI()
+
+    @app.post("/jobs")
+    async def create(request: Request, file: UploadFile = File(...)):
+        seen.append((request.state.job_id in jobs.reserved, await file.read()))
+        return {"job_id": request.state.job_id}
+
+    app.add_middleware(AdmissionMiddleware, path="/jobs", acquire=jobs.new_job,
+                       release=jobs.release, state_key="job_id", retry_after=30)
+    client = TestClient(app)
+    files = {"file": ("a.txt", b"conteudo", "text/plain")}
+
+    assert client.post("/jobs", files=files).status_code == 200
+    assert seen == [(True, b"conteudo")] and not jobs.reserved
+
+    jobs.new_job()  # limite ocupado
+    response = client.post("/jobs", files=files)
+    assert response.status_code == 429 and response.headers['retry-after'] == '30'
+    assert len(seen) == 1
@@ -0,0 +1,88 @@
+"""Admissão no pool de processamento: 429 antes de receber o corpo"""
+
+import asyncio
+import pytest
+
+pytest.importorskip('fastapi')
+
+from fastapi import FastAPI, File, Request, UploadFile
+from fastapi.testclient import TestClient
+
+from services.pipeline import AdmissionMiddleware, PipelineBusy, PipelinePool
+
+
+def make_app(pool, seen):
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request, file: UploadFile = File(...)):
+        seen.append((request.state.pipeline_slot, pool.in_flight, await file.read()))
+        if file.filename == 'erro.txt':
+            raise RuntimeError("falha no processamento")
+        return {"ok": True}
+
+    @app.get("/upload")
+    async def info():
+        return {"in_flight": pool.in_flight}
+
+    app.add_middleware(AdmissionMiddleware, path="/upload", acquire=pool.acquire,
+                       release=lambda _: pool.release(), state_key="pipeline_slot")
+    return app
+
+
+def test_acquire_refuses_above_capacity():
+    pool = PipelinePool(max_workers=1, max_queue=1)
+    pool.acquire()
+    pool.acquire()
+    with pytest.raises(PipelineBusy):
+        pool.acquire()
+    pool.release()
+    pool.acquire()
+    assert pool.in_flight == 2
+
+
+def test_full_pool_answers_429_without_reading_the_body():
+    pool = PipelinePool(max_workers=1, max_queue=0)
+    pool.acquire()
+    seen = []
+    app = make_app(pool, seen)
+
+    reads = []
+    sent = []
+
+    async def receive():
+        reads.append(True)
+        return {'type': 'http.request', 'body': b'x' * 1024, 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'POST', 'path': '/upload', 'headers': [],
+             'query_string': b'', 'root_path': '', 'scheme': 'http', 'server': ('test', 80),
+             'client': ('test', 1), 'http_version': '1.1', 'raw_path': b'/upload'}
+    asyncio.run(app(scope, receive, send))
+
+    start = sent[0]
+    assert start['status'] == 429
+    assert (b'retry-after', b'5') in start['headers']
+    assert reads == [] and seen == []
+    assert pool.in_flight == 1
+
+
+def test_slot_is_held_during_the_request_and_released_after():
+    pool = PipelinePool(max_workers=1, max_queue=0)
+    seen = []
+    client = TestClient(make_app(pool, seen), raise_server_exceptions=False)
+
+    response = client.post("/upload", files={"file": ("a.txt", b"conteudo", "text/plain")})
+    assert response.status_code == 200
+    assert seen == [(None, 1, b"conteudo")]
+    assert pool.in_flight == 0
+
+    # Erro no endpoint também devolve a vaga
+    response = client.post("/upload", files={"file": ("erro.txt", b"x", "text/plain")})
+    assert response.status_code == 500
+    assert pool.in_flight == 0
+
+    # Outros métodos não reservam vaga
+    assert client.get("/upload").json() == {"in_flight": 0}
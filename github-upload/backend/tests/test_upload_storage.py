@@ -0,0 +1,108 @@
+"""Gravação dos uploads e recusa (413) de corpos grandes demais"""
+
+import asyncio
+import hashlib
+import io
+import os
+import pytest
+
+pytest.importorskip('fastapi')
+
+from fastapi import FastAPI, File, UploadFile
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.testclient import TestClient
+
+from services.upload_storage import (MULTIPART_OVERHEAD, UploadSizeLimitMiddleware, UploadTooLarge,
+                                     save_upload)
+
+ORIGIN = "http://localhost:3000"
+
+
+def test_save_upload_writes_hash_and_size(tmp_path):
+    content = os.urandom(300_000)
+    upload = UploadFile(io.BytesIO(content), filename='Relatorio.PDF')
+    stored = asyncio.run(save_upload(upload, directory=str(tmp_path), chunk_size=64 * 1024))
+
+    assert stored.path.endswith('.pdf') and os.path.dirname(stored.path) == str(tmp_path)
+    assert stored.size == len(content)
+    assert stored.sha256 == hashlib.sha256(content).hexdigest()
+    with open(stored.path, 'rb') as f:
+        assert f.read() == content
+
+
+def test_save_upload_removes_the_partial_file_above_the_limit(tmp_path):
+    upload = UploadFile(io.BytesIO(b'x' * 5000), filename='grande.txt')
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(save_upload(upload, directory=str(tmp_path), max_bytes=4096, chunk_size=1024))
+    assert os.listdir(tmp_path) == []
+
+    # Tamanho declarado já acima do limite: nada é gravado
+    upload = UploadFile(io.BytesIO(b'x' * 5000), filename='grande.txt', size=5000)
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(save_upload(upload, directory=str(tmp_path), max_bytes=4096))
+    assert os.listdir(tmp_path) == []
+
+
+def make_app(max_bytes, received):
+    """Mesma ordem de middlewares da API: CORS por fora do limite de tamanho."""
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        received.append(len(await file.read()))
+        return {"ok": True}
+
+    app.add_middleware(UploadSizeLimitMiddleware, paths=["/upload"], max_bytes=max_bytes)
+    app.add_middleware(CORSMiddleware, allow_origins=[ORIGIN], allow_methods=["*"], allow_headers=["*"])
+    return app
+
+
+def test_content_length_above_the_limit_gets_413_with_cors():
+    received = []
+    client = TestClient(make_app(1024, received))
+    headers = {"Origin": ORIGIN}
+
+    response = client.post("/upload", files={"file": ("a.txt", b"x" * 100, "text/plain")}, headers=headers)
+    assert response.status_code == 200 and received == [100]
+
+    body = b"x" * (1024 + MULTIPART_OVERHEAD + 1)
+    response = client.post("/upload", files={"file": ("a.txt", body, "text/plain")}, headers=headers)
+    assert response.status_code == 413
+    assert response.headers["access-control-allow-origin"] == ORIGIN
+    assert received == [100]
+
+
+def test_chunked_body_is_cut_when_it_passes_the_limit():
+    received = []
+    app = make_app(1024, received)
+    chunk = b"x" * 16 * 1024
+    total = 10 * len(chunk)
+    reads = []
+    sent = []
+
+    head = (b'--limite\r\nContent-Disposition: form-data; name="file"; filename="a.txt"\r\n'
+            b'Content-Type: text/plain\r\n\r\n')
+
+    async def receive():
+        body = chunk if reads else head + chunk
+        reads.append(len(body))
+        return {'type': 'http.request', 'body': body, 'more_body': sum(reads) < total}
+
+    async def send(message):
+        sent.append(message)
+
+    # Sem Content-Length (Transfer-Encoding: chunked)
+    scope = {'type': 'http', 'method': 'POST', 'path': '/upload', 'raw_path': b'/upload',
+             'query_string': b'', 'root_path': '', 'scheme': 'http', 'http_version': '1.1',
+             'server': ('test', 80), 'client': ('test', 1),
+             'headers': [(b'origin', ORIGIN.encode()),
+                         (b'content-type', b'multipart/form-data; boundary=limite'),
+                         (b'transfer-encoding', b'chunked')]}
+    asyncio.run(app(scope, receive, send))
+
+    start = sent[0]
+    assert start['status'] == 413
+    assert (b'access-control-allow-origin', ORIGIN.encode()) in start['headers']
+    # A leitura parou logo depois de passar do limite, sem consumir o corpo todo
+    assert sum(reads) <= 1024 + MULTIPART_OVERHEAD + len(head) + len(chunk)
+    assert received == []
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tarefas em segundo plano para a interface Streamlit
+Executa a investigação fora da thread do script, com progresso por etapa,
+cancelamento e resultados parciais visíveis enquanto a tarefa roda
+"""
+
+import threading
+import time
+import traceback
+
+JOB_STATES = ('running', 'done', 'cancelled', 'error')
+
+
+class BackgroundJob:
+    """
+    Executa fn(job) em uma thread daemon.
+
+    A função informa o andamento com job.stage(nome, **info), publica
+    resultados parciais com job.publish(nome, valor) e consulta
+    job.cancel_event (ou job.cancelled()) para interromper o trabalho.
+    A interface lê snapshot() a cada atualização da página.
+    """
+
+    def __init__(self, fn, name='investigação'):
+        self.name = name
+        self.status = 'running'
+        self.stages = {}
+        self.results = {}
+        self.value = None
+        self.error = None
+        self.started = time.time()
+        self.finished = None
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, args=(fn,), daemon=True)
+        self._thread.start()
+
+    def _run(self, fn):
+        try:
+            value = fn(self)
+            with self._lock:
+                self.value = value
+                self.status = 'cancelled' if self.cancel_event.is_set() else 'done'
+        except Exception as e:
+            traceback.print_exc()
+            with self._lock:
+                self.error = str(e)
+                self.status = 'error'
+        finally:
+            self.finished = time.time()
+
+    def stage(self, name, **info):
+        """Registra (ou atualiza) uma etapa, com horário e informações de progresso."""
+        with self._lock:
+            entry = self.stages.setdefault(name, {'started': time.time()})
+            entry.update(info, updated=time.time())
+
+    def publish(self, name, value):
+        """Disponibiliza um resultado parcial."""
+        with self._lock:
+            self.results[name] = value
+
+    def cancel(self):
+        """Pede o cancelamento; a função encerra na próxima verificação."""
+        self.cancel_event.set()
+
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    @property
+    def running(self):
+        return self.status == 'running'
+
+    def elapsed(self):
+        return (self.finished or time.time()) - self.started
+
+    def snapshot(self):
+        """Cópia consistente do estado: status, etapas, resultados parciais e erro."""
+        with self._lock:
+            return {
+                'status': self.status,
+                'stages': {name: dict(info) for name, info in self.stages.items()},
+                'results': dict(self.results),
+                'error': self.error,
+                'elapsed': self.elapsed()
+            }
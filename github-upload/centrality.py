@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Centralidades de intermediação e proximidade para redes grandes
+Modos exato e amostrado (k pivôs com semente), com execução opcional em
+vários processos e limite de erro reportado junto com os valores
+"""
+
+import math
+import multiprocessing
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import networkx as nx
+import numpy as np
+from graph_store import CSRGraph
+
+CENTRALITY_MODES = ('exact', 'sampled', 'skip')
+
+# Estado de cada processo de trabalho: adjacência anexada à memória compartilhada
+_worker_graph = None
+_worker_segments = []
+
+
+class ArrayAdjacency:
+    """
+    Vizinhos de saída em CSR (nós identificados por inteiros), com a mesma
+    interface de grafo usada por _bfs. No não direcionado a adjacência
+    de CSRGraph já traz as arestas nos dois sentidos.
+    """
+
+    def __init__(self, indptr, indices, directed):
+        self.indptr = indptr
+        self.indices = indices
+        self.directed = directed
+
+    def is_directed(self):
+        return self.directed
+
+    def successors(self, v):
+        return self.indices[self.indptr[v]:self.indptr[v + 1]].tolist()
+
+    neighbors = successors
+
+
+def sample_pivots(graph, k=None, seed=None):
+    """Nós de origem da estimativa (todos quando k é None ou >= número de nós)."""
+    nodes = list(graph.nodes())
+    if k is None or k >= len(nodes):
+        return nodes
+    return random.Random(seed).sample(nodes, k)
+
+
+def hoeffding_bound(n, k, confidence=0.95):
+    """
+    Erro máximo da média de k amostras em [0, 1], simultaneamente para os n
+    nós com a probabilidade 'confidence' (Hoeffding + união).
+    """
+    if k >= n:
+        return 0.0
+    delta = 1 - confidence
+    return math.sqrt(math.log(2 * n / delta) / (2 * k))
+
+
+def _bfs(graph, source):
+    """BFS de 'source': ordem de visita, predecessores, nº de caminhos mínimos e distâncias."""
+    order = []
+    preds = {source: []}
+    sigma = {source: 1}
+    dist = {source: 0}
+    queue = deque([source])
+    while queue:
+        v = queue.popleft()
+        order.append(v)
+        d = dist[v] + 1
+        for w in graph.successors(v) if graph.is_directed() else graph.neighbors(v):
+            if w not in dist:
+                dist[w] = d
+                sigma[w] = 0
+                preds[w] = []
+                queue.append(w)
+            if dist[w] == d:
+                sigma[w] += sigma[v]
+                preds[w].append(v)
+    return order, preds, sigma, dist
+
+
+def _betweenness_partial(graph, sources):
+    """Soma das dependências (Brandes) dos pares (s, t) com s em 'sources'."""
+    partial = {}
+    for s in sources:
+        order, preds, sigma, _ = _bfs(graph, s)
+        delta = dict.fromkeys(order, 0.0)
+        for w in reversed(order):
+            coeff = (1 + delta[w]) / sigma[w]
+            for v in preds[w]:
+                delta[v] += sigma[v] * coeff
+            if w != s:
+                partial[w] = partial.get(w, 0.0) + delta[w]
+    return partial
+
+
+def _closeness_partial(graph, sources):
+    """
+    Para cada nó v: (soma das distâncias s -> v, nº de origens que alcançam v,
+    maior distância observada).
+    """
+    partial = {}
+    for s in sources:
+        _, _, _, dist = _bfs(graph, s)
+        for v, d in dist.items():
+            if v != s:
+                total, reached, longest = partial.get(v, (0, 0, 0))
+                partial[v] = (total + d, reached + 1, max(longest, d))
+    return partial
+
+
+def _share_arrays(arrays):
+    """Copia os arrays para blocos de memória compartilhada (como em cycle_search)."""
+    segments = []
+    spec = {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[:] = array
+        segments.append(segment)
+        spec[name] = (segment.name, array.shape, array.dtype.str)
+    return segments, spec
+
+
+def _init_worker(spec, directed):
+    """Anexa o processo de trabalho à adjacência compartilhada (somente leitura)."""
+    global _worker_graph
+    arrays = {}
+    for name, (segment_name, shape, dtype) in spec.items():
+        segment = shared_memory.SharedMemory(name=segment_name)
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf)
+        array.flags.writeable = False
+        arrays[name] = array
+        _worker_segments.append(segment)
+    _worker_graph = ArrayAdjacency(arrays['indptr'], arrays['indices'], directed)
+
+
+def _run_partial(task):
+    kind, sources = task
+    if kind == 'betweenness':
+        return _betweenness_partial(_worker_graph, sources)
+    return _closeness_partial(_worker_graph, sources)
+
+
+def _partials(graph, kind, sources, workers=1):
+    """
+    Executa o cálculo parcial em lotes de origens e devolve a lista de resultados.
+
+    Em vários processos os trabalhadores recebem apenas a adjacência CSR
+    (CSRGraph) em memória compartilhada, com os nós como inteiros, e não o
+    grafo networkx. O pool usa 'spawn': a função é chamada das threads do
+    Streamlit, e um fork do processo com várias threads pode herdar travas
+    ocupadas.
+    """
+    if workers == 1 or len(sources) < 2:
+        fn = _betweenness_partial if kind == 'betweenness' else _closeness_partial
+        return [fn(graph, sources)]
+
+    store = CSRGraph.from_networkx(graph)
+    ids = [store.node_index[source] for source in sources]
+    n_chunks = min(len(ids), (workers or 4) * 4)
+    chunks = [ids[i::n_chunks] for i in range(n_chunks)]
+
+    segments, spec = _share_arrays({'indptr': store.out_indptr, 'indices': store.out_indices})
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker,
+                                 initargs=(spec, store.is_directed())) as executor:
+            partials = list(executor.map(_run_partial, [(kind, chunk) for chunk in chunks]))
+    finally:
+        for segment in segments:
+            segment.close()
+            segment.unlink()
+
+    nodes = store.nodes
+    return [{nodes[v]: value for v, value in partial.items()} for partial in partials]
+
+
+def betweenness_centrality(graph, mode='exact', k=None, seed=None, workers=1, confidence=0.95):
+    """
+    Centralidade de intermediação normalizada (sem peso, como no networkx).
+
+    Args:
+        graph: Grafo networkx
+        mode: 'exact' (todas as origens) ou 'sampled' (k pivôs sorteados com 'seed')
+        k: Número de pivôs no modo amostrado
+        seed: Semente do sorteio dos pivôs
+        workers: Processos usados (1 = sequencial, None = padrão do executor)
+        confidence: Confiança do limite de erro
+
+    Retorna (valores, limite_de_erro). No modo amostrado o estimador é não
+    viesado e o limite vale para todos os nós simultaneamente.
+    """
+    n = graph.number_of_nodes()
+    sources = sample_pivots(graph, k if mode == 'sampled' else None, seed)
+    if mode == 'exact' and workers == 1:
+        return nx.betweenness_centrality(graph), 0.0
+
+    values = dict.fromkeys(graph, 0.0)
+    for partial in _partials(graph, 'betweenness', sources, workers):
+        for node, value in partial.items():
+            values[node] += value
+
+    if n > 2:
+        scale = n / len(sources) / ((n - 1) * (n - 2))
+        for node in values:
+            values[node] *= scale
+
+    # Cada origem contribui com δ_s(v) / (n - 2) em [0, 1]; o valor é n/(n-1) vezes a média
+    bound = hoeffding_bound(n, len(sources), confidence) * n / (n - 1) if n > 2 else 0.0
+    return values, bound
+
+
+def closeness_centrality(graph, mode='exact', k=None, seed=None, workers=1, confidence=0.95):
+    """
+    Centralidade de proximidade (sem peso, com a correção de Wasserman-Faust
+    do networkx; em grafos direcionados usa as distâncias de chegada).
+
+    No modo amostrado a soma das distâncias até cada nó é estimada a partir
+    de k pivôs (Eppstein-Wang). Retorna (valores, limite_de_erro), onde o
+    limite é o erro máximo da distância média, em número de arestas.
+    """
+    n = graph.number_of_nodes()
+    sources = sample_pivots(graph, k if mode == 'sampled' else None, seed)
+    if mode == 'exact' and workers == 1:
+        return nx.closeness_centrality(graph), 0.0
+
+    totals = {}
+    for partial in _partials(graph, 'closeness', sources, workers):
+        for node, (total, reached, longest) in partial.items():
+            t, r, d = totals.get(node, (0, 0, 0))
+            totals[node] = (t + total, r + reached, max(d, longest))
+
+    values = dict.fromkeys(graph, 0.0)
+    source_set = set(sources)
+    for node, (total, reached, _) in totals.items():
+        # Origens válidas para 'node' (o próprio nó não conta)
+        pivots = len(sources) - (node in source_set)
+        if total > 0 and pivots > 0:
+            scale = (n - 1) / pivots
+            reached, total = reached * scale, total * scale
+            values[node] = reached / total * (reached / (n - 1))
+
+    # As distâncias ficam em [0, maior distância observada]
+    longest = max((d for _, _, d in totals.values()), default=0)
+    bound = hoeffding_bound(n, len(sources), confidence) * longest
+    return values, bound
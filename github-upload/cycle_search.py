@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Busca limitada de ciclos em redes de transações
+Enumera ciclos simples com comprimento máximo, poda de arestas de baixo valor
+e orçamento opcional de passos por nó inicial, sem materializar todos os ciclos
+"""
+
+import heapq
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+import numpy as np
+from graph_store import strongly_connected_labels
+
+# Intervalo (em arestas examinadas) entre verificações do evento de cancelamento
+CANCEL_CHECK_STEPS = 4096
+
+# Orçamento padrão de arestas examinadas por nó inicial (cerca de 0,25 s em
+# um núcleo); limita o pior caso de componentes muito densos
+DEFAULT_STEP_BUDGET = 250_000
+
+
+class CycleSearchResult(list):
+    """
+    Lista de (ciclo, valor) com a descrição da busca em 'search'.
+
+    'search' registra os limites usados (comprimento, top_k, orçamento de
+    passos) e se o resultado está incompleto: 'truncated' indica nós
+    iniciais cuja busca parou no orçamento; 'limited_by_top_k' indica que
+    havia mais ciclos acima do limiar do que os devolvidos; 'cancelled'
+    indica que a busca foi interrompida antes do fim.
+    """
+
+    def __init__(self, items=(), search=None):
+        super().__init__(items)
+        self.search = dict(search or {})
+
+    @property
+    def truncated(self):
+        return bool(self.search.get('truncated'))
+
+    @property
+    def cancelled(self):
+        return bool(self.search.get('cancelled'))
+
+
+class CycleGraph:
+    """
+    Adjacência compacta (CSR de saída e de entrada) do grafo podado.
+
+    Os nós são identificados por inteiros na ordem do grafo original e
+    'component' rotula o componente fortemente conectado de cada nó. Os
+    arrays são somente leitura durante a busca.
+    """
+
+    ARRAYS = ('out_indptr', 'out_indices', 'out_values', 'in_indptr', 'in_indices', 'component')
+
+    def __init__(self, nodes, out_indptr, out_indices, out_values,
+                 in_indptr, in_indices, component):
+        self.nodes = nodes
+        self.out_indptr = out_indptr
+        self.out_indices = out_indices
+        self.out_values = out_values
+        self.in_indptr = in_indptr
+        self.in_indices = in_indices
+        self.component = component
+
+    @classmethod
+    def from_networkx(cls, graph, weight='total_value', min_edge_value=0):
+        """Cria a adjacência descartando arestas com valor abaixo de min_edge_value."""
+        nodes = list(graph.nodes())
+        index = {node: i for i, node in enumerate(nodes)}
+
+        edges = [(index[u], index[v], float(data.get(weight, 0)))
+                 for u, v, data in graph.edges(data=True)
+                 if data.get(weight, 0) >= min_edge_value]
+        src = np.array([e[0] for e in edges], dtype=np.int64)
+        dst = np.array([e[1] for e in edges], dtype=np.int64)
+        values = np.array([e[2] for e in edges], dtype=float)
+        return cls.from_arrays(nodes, src, dst, values)
+
+    @classmethod
+    def from_store(cls, store, min_edge_value=0):
+        """Cria a adjacência a partir de um CSRGraph, sem passar pelo networkx."""
+        keep = store.edge_values >= min_edge_value
+        return cls.from_arrays(store.nodes, store.edge_source[keep], store.edge_target[keep],
+                               store.edge_values[keep])
+
+    @classmethod
+    def from_arrays(cls, nodes, src, dst, values):
+        """Monta CSR de saída/entrada e rotula os componentes fortemente conectados."""
+        # Componentes fortemente conectados do grafo já podado
+        component = strongly_connected_labels(len(nodes), src, dst)
+
+        out_indptr, out_order = cls._csr(src, dst, len(nodes))
+        in_indptr, in_order = cls._csr(dst, src, len(nodes))
+
+        return cls(nodes, out_indptr, dst[out_order], values[out_order],
+                   in_indptr, src[in_order], component)
+
+    @staticmethod
+    def _csr(rows, cols, n):
+        """Retorna (indptr, ordem) para agrupar as arestas por 'rows', ordenadas por 'cols'."""
+        order = np.lexsort((cols, rows))
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        return indptr, order
+
+    def start_nodes(self, min_length=1):
+        """
+        Nós que podem iniciar um ciclo (componentes com tamanho suficiente ou
+        laços), ordenados por componente e, dentro dele, pela ordem dos nós.
+        """
+        n = len(self.component)
+        sizes = np.bincount(self.component, minlength=1)
+        eligible = sizes[self.component] >= max(min_length, 2)
+        if min_length <= 1:
+            rows = np.repeat(np.arange(n), np.diff(self.out_indptr))
+            eligible[rows[rows == self.out_indices]] = True
+
+        starts = np.flatnonzero(eligible)
+        order = np.lexsort((starts, self.component[starts]))
+        return [int(node) for node in starts[order]]
+
+    def shards(self, min_length=1, shard_size=256):
+        """
+        Divide os nós iniciais em lotes contíguos para execução paralela.
+
+        Componentes pequenos são agrupados no mesmo lote e componentes
+        grandes são fatiados em lotes de até shard_size nós iniciais.
+        """
+        shards = []
+        current = []
+        for node in self.start_nodes(min_length):
+            current.append(node)
+            if len(current) >= shard_size:
+                shards.append(current)
+                current = []
+        if current:
+            shards.append(current)
+        return shards
+
+
+def _distances_to_start(cg, start, max_length):
+    """BFS reversa: menor número de arestas de cada nó elegível até 'start'."""
+    comp = cg.component[start]
+    dist = {start: 0}
+    frontier = [start]
+    depth = 0
+    while frontier and depth < max_length - 1:
+        depth += 1
+        next_frontier = []
+        for node in frontier:
+            for pred in cg.in_indices[cg.in_indptr[node]:cg.in_indptr[node + 1]]:
+                pred = int(pred)
+                if pred > start and pred not in dist and cg.component[pred] == comp:
+                    dist[pred] = depth
+                    next_frontier.append(pred)
+        frontier = next_frontier
+    return dist
+
+
+def cycles_from_start(cg, start, max_length=6, min_length=1, step_budget=None, stats=None,
+                      cancel=None):
+    """
+    Enumera os ciclos cujo menor nó (na ordem de 'cg.nodes') é 'start'.
+
+    Só visita nós maiores que 'start' dentro do mesmo componente, de modo que
+    cada ciclo é gerado uma única vez. Ramos que não conseguem voltar a
+    'start' dentro de max_length arestas são podados. Gera tuplas
+    (índices_do_ciclo, valor_total).
+
+    step_budget limita o número de arestas examinadas a partir de 'start'
+    (determinístico, não depende da velocidade da máquina); ao atingi-lo a
+    busca do nó para e stats['truncated'] é incrementado. 'cancel' é
+    verificado a cada CANCEL_CHECK_STEPS arestas (stats['cancelled']).
+    """
+    dist = _distances_to_start(cg, start, max_length)
+    indptr, indices, values = cg.out_indptr, cg.out_indices, cg.out_values
+
+    path = [start]
+    path_values = [0.0]
+    on_path = {start}
+    stack = [indptr[start]]
+    steps = 0
+
+    while stack:
+        node = path[-1]
+        pos = stack[-1]
+        if pos >= indptr[node + 1]:
+            stack.pop()
+            on_path.discard(path.pop())
+            path_values.pop()
+            continue
+        stack[-1] = pos + 1
+
+        steps += 1
+        if step_budget is not None and steps > step_budget:
+            if stats is not None:
+                stats['truncated'] = stats.get('truncated', 0) + 1
+            return
+        if cancel is not None and steps % CANCEL_CHECK_STEPS == 0 and cancel.is_set():
+            if stats is not None:
+                stats['cancelled'] = 1
+            return
+
+        succ = int(indices[pos])
+        value = path_values[-1] + values[pos]
+        if succ == start:
+            if min_length <= len(path) <= max_length:
+                if stats is not None:
+                    stats['cycles'] = stats.get('cycles', 0) + 1
+                yield tuple(path), float(value)
+            continue
+
+        # Poda: o sucessor precisa conseguir fechar o ciclo dentro do limite
+        d = dist.get(succ)
+        if d is None or succ in on_path or len(path) + d > max_length:
+            continue
+
+        path.append(succ)
+        path_values.append(value)
+        on_path.add(succ)
+        stack.append(indptr[succ])
+
+
+def iter_cycles(cg, max_length=6, min_length=1, step_budget=None, starts=None, stats=None,
+                cancel=None):
+    """
+    Gera todos os ciclos limitados do grafo, componente a componente.
+
+    Args:
+        cg: CycleGraph já podado
+        max_length: Número máximo de arestas do ciclo
+        min_length: Número mínimo de arestas do ciclo
+        step_budget: Máximo de arestas examinadas por nó inicial (None = sem limite)
+        starts: Nós iniciais a processar (padrão: todos os elegíveis)
+        stats: dict opcional preenchido com 'starts', 'cycles', 'truncated'
+            e 'cancelled'
+        cancel: Evento verificado durante a busca (ver cycles_from_start);
+            quando sinalizado a geração termina
+    """
+    if starts is None:
+        starts = cg.start_nodes(min_length)
+    for start in starts:
+        if cancel is not None and cancel.is_set():
+            if stats is not None:
+                stats['cancelled'] = 1
+            return
+        if stats is not None:
+            stats['starts'] = stats.get('starts', 0) + 1
+        yield from cycles_from_start(cg, start, max_length, min_length, step_budget, stats, cancel)
+
+
+def _top_items(cycles, k=None, min_total=None, stats=None):
+    """
+    Heap de tamanho k com itens (valor, ordem, ciclo), ordenados por valor decrescente.
+    stats['matches'] conta os ciclos acima de min_total (antes do corte em k).
+    """
+    heap = []
+    for seq, (cycle, total) in enumerate(cycles):
+        if min_total is not None and total <= min_total:
+            continue
+        if stats is not None:
+            stats['matches'] = stats.get('matches', 0) + 1
+        item = (total, -seq, cycle)
+        if k is None or len(heap) < k:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    return [(total, -neg_seq, cycle) for total, neg_seq, cycle in sorted(heap, reverse=True)]
+
+
+def top_cycles(cycles, k=None, min_total=None, stats=None):
+    """
+    Mantém apenas os k ciclos de maior valor usando um heap (memória O(k)).
+
+    Ciclos com valor total <= min_total são descartados. Empates são resolvidos
+    pela ordem de geração. Retorna lista ordenada por valor decrescente.
+    """
+    return [(cycle, total) for total, _, cycle in _top_items(cycles, k, min_total, stats)]
+
+
+# Estado de cada processo de trabalho: adjacência anexada à memória compartilhada
+# e evento de cancelamento compartilhado com o processo principal
+_worker_graph = None
+_worker_segments = []
+_worker_cancel = None
+
+
+def _share_arrays(cg):
+    """Copia os arrays da adjacência para blocos de memória compartilhada."""
+    segments = []
+    spec = {}
+    for name in CycleGraph.ARRAYS:
+        array = np.ascontiguousarray(getattr(cg, name))
+        segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[:] = array
+        segments.append(segment)
+        spec[name] = (segment.name, array.shape, array.dtype.str)
+    return segments, spec
+
+
+def _init_worker(spec, cancel=None):
+    """Anexa o processo de trabalho aos arrays compartilhados (somente leitura)."""
+    global _worker_graph, _worker_segments, _worker_cancel
+    _worker_cancel = cancel
+    arrays = {}
+    for name, (segment_name, shape, dtype) in spec.items():
+        segment = shared_memory.SharedMemory(name=segment_name)
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf)
+        array.flags.writeable = False
+        arrays[name] = array
+        _worker_segments.append(segment)
+    _worker_graph = CycleGraph(None, **arrays)
+
+
+def _search_shard(task):
+    """Executa a busca limitada em um lote de nós iniciais."""
+    shard_index, starts, max_length, min_length, step_budget, k, min_total = task
+    stats = {}
+    cycles = iter_cycles(_worker_graph, max_length, min_length, step_budget, starts, stats,
+                         _worker_cancel)
+    return shard_index, _top_items(cycles, k, min_total, stats), stats
+
+
+def parallel_top_cycles(cg, max_length=6, min_length=1, step_budget=None, k=None,
+                        min_total=None, workers=None, shard_size=256, stats=None, cancel=None):
+    """
+    Versão paralela de top_cycles(iter_cycles(...)) usando um pool de processos.
+
+    Os lotes de nós iniciais (ver CycleGraph.shards) são distribuídos entre
+    'workers' processos que leem a mesma adjacência em memória compartilhada.
+    Cada lote devolve seus k melhores ciclos e o resultado final é mesclado
+    com a mesma ordem da execução sequencial.
+
+    Quando 'cancel' é sinalizado os lotes não iniciados são descartados e
+    os que estão rodando param em poucos passos; a função só retorna
+    depois que o pool terminou (stats['cancelled'] fica marcado).
+
+    Os processos são criados com 'spawn': a função é chamada de threads
+    (run_detectors, servidor do Streamlit) e um fork do processo com várias
+    threads pode herdar travas ocupadas.
+    """
+    shards = cg.shards(min_length, shard_size)
+    if not shards:
+        return []
+    if len(shards) == 1 or workers == 1:
+        # Trabalho pequeno demais para compensar a criação do pool
+        cycles = iter_cycles(cg, max_length, min_length, step_budget, stats=stats, cancel=cancel)
+        return top_cycles(cycles, k, min_total, stats)
+
+    segments, spec = _share_arrays(cg)
+    context = multiprocessing.get_context('spawn')
+    stop = context.Event() if cancel is not None else None
+    try:
+        tasks = [(i, shard, max_length, min_length, step_budget, k, min_total)
+                 for i, shard in enumerate(shards)]
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(spec, stop)) as executor:
+            futures = [executor.submit(_search_shard, task) for task in tasks]
+            pending = set(futures)
+            while pending:
+                _, pending = wait(pending, timeout=0.5 if cancel is not None else None)
+                if pending and cancel.is_set():
+                    stop.set()
+                    for future in pending:
+                        future.cancel()
+                    if stats is not None:
+                        stats['cancelled'] = 1
+                    break
+        # Ao sair do 'with' os lotes em andamento já terminaram
+        results = [future.result() for future in futures if not future.cancelled()]
+    finally:
+        for segment in segments:
+            segment.close()
+            segment.unlink()
+
+    merged = []
+    for shard_index, items, shard_stats in results:
+        merged.extend((total, shard_index, seq, cycle) for total, seq, cycle in items)
+        if stats is not None:
+            for key, value in shard_stats.items():
+                stats[key] = stats.get(key, 0) + value
+
+    merged.sort(key=lambda item: (-item[0], item[1], item[2]))
+    if k is not None:
+        merged = merged[:k]
+    return [(cycle, total) for total, _, _, cycle in merged]
@@ -9,6 +9,23 @@ import openpyxl
 from datetime import datetime
 import streamlit as st
 import json
+from graph_store import CSRGraph, aggregate_edges
+from centrality import CENTRALITY_MODES, betweenness_centrality, closeness_centrality
+from communities import COMMUNITY_METHODS, CommunityDetector
+from layout import default_engine
+from rendering import edge_traces, webgl_network_figure
+from prepared_dataset import prepare_dataset
+from streaming import TransactionStream
+
+# Métricas de nó calculadas sob demanda, na ordem em que aparecem nos atributos
+NODE_METRICS = ('degree_centrality', 'betweenness_centrality', 'closeness_centrality',
+                'eigenvector_centrality', 'strength')
+
+# Agregações aceitas para os atributos adicionais das arestas
+EDGE_AGGREGATIONS = ('first', 'last', 'list', 'count')
+
+# Atributos gravados por uma métrica com nome diferente
+METRIC_ATTRIBUTES = {'in_strength': 'strength', 'out_strength': 'strength', 'total_strength': 'strength'}
 
 class GraphAnalyzer:
     """
@@ -16,31 +33,104 @@ class GraphAnalyzer:
     Permite carregar dados, criar grafos e visualizar conexões entre entidades.
     """
     
-    def __init__(self):
+    def __init__(self, backend='networkx', centrality_mode='exact', centrality_k=None,
+                 centrality_seed=None, centrality_workers=1):
+        """
+        Args:
+            backend: 'networkx' ou 'csr' (ver create_graph_from_data)
+            centrality_mode: Intermediação/proximidade 'exact', 'sampled'
+                (centrality_k pivôs sorteados com centrality_seed) ou 'skip'
+            centrality_workers: Processos usados nessas centralidades (1 = sequencial)
+        """
         self.data = None
-        self.graph = nx.Graph()
+        self.backend = backend
+        self.centrality_mode = centrality_mode
+        self.centrality_k = centrality_k
+        self.centrality_seed = centrality_seed
+        self.centrality_workers = centrality_workers
+        self.centrality_info = {}
+        self._version = 0
+        self._store_version = None
+        self._metrics_version = None
+        self._computed_metrics = set()
+        self._node_values = {}
+        self.community_detector = CommunityDetector()
+        self.community_info = {}
+        self._community_key = None
+        self._partition = {}
+        self.render_stats = {}
+        self.store = None
+        self._graph = nx.Graph()
         self.directed_graph = nx.DiGraph()
         self.node_attributes = {}
         self.edge_attributes = {}
         self.analysis_results = {}
+    
+    @property
+    def graph(self):
+        """
+        Grafo networkx da rede.
+        
+        Com o backend 'csr' o grafo é exportado do CSRGraph apenas na primeira
+        vez que é acessado (visualização ou algoritmos não portados).
+        """
+        if self._graph is None and self.store is not None:
+            self._graph = self._export_graph()
+        return self._graph
+    
+    @graph.setter
+    def graph(self, graph):
+        self._graph = graph
+        self.store = None
+        self._version += 1
+    
+    def _set_store(self, store):
+        """Passa a usar o CSRGraph (o grafo networkx será exportado sob demanda)."""
+        self.store = store
+        self._graph = None
+        self._version += 1
+        self._store_version = self._version
+    
+    def _graph_size(self):
+        """(nós, arestas) do grafo atual, sem exportar o CSRGraph."""
+        store = self._current_store()
+        graph = self._graph if store is None else store
+        return graph.number_of_nodes(), graph.number_of_edges()
+    
+    def _graph_version(self):
+        """
+        Identifica o grafo atual: muda quando ele é substituído ou quando nós
+        ou arestas são adicionados, invalidando as métricas em cache.
         
-    def load_excel_data(self, file_path, sheet_name=None):
+        Com o backend 'csr' a identidade é a do CSRGraph, que continua a mesma
+        depois que o grafo networkx é exportado.
+        """
+        store = self._current_store()
+        return (self._version, id(store if store is not None else self._graph)) + self._graph_size()
+    
+    def invalidate_metrics(self):
+        """Descarta as métricas em cache (após alterar o grafo manualmente)."""
+        self._version += 1
+        if self._graph is None:
+            # Nada foi exportado, então o CSRGraph ainda descreve a rede
+            self._store_version = self._version
+        
+    def load_excel_data(self, file_path, sheet_name=None, prepared_dir=None):
         """
         Carrega dados de uma planilha Excel.
         
         Args:
             file_path: Caminho para o arquivo Excel
             sheet_name: Nome da planilha (opcional)
+            prepared_dir: Diretório de conjuntos preparados (ver load_csv_data)
         """
         try:
-            if sheet_name:
-                self.data = pd.read_excel(file_path, sheet_name=sheet_name)
-            else:
-                self.data = pd.read_excel(file_path)
+            def read(source):
+                if sheet_name:
+                    return pd.read_excel(source, sheet_name=sheet_name)
+                return pd.read_excel(source)
             
-            # Limpar dados e converter tipos
-            self.data = self.data.dropna()
-            self._clean_data()
+            self.data = self._load_prepared(file_path, read, f"graph:excel:{sheet_name}", prepared_dir)
             
             print(f"Dados carregados com sucesso: {len(self.data)} linhas")
             print(f"Colunas: {list(self.data.columns)}")
@@ -50,17 +140,18 @@ class GraphAnalyzer:
             print(f"Erro ao carregar dados: {e}")
             return False
     
-    def load_csv_data(self, file_path):
+    def load_csv_data(self, file_path, prepared_dir=None):
         """
         Carrega dados de um arquivo CSV.
         
         Args:
             file_path: Caminho para o arquivo CSV
+            prepared_dir: Diretório de conjuntos preparados; se informado, o
+                arquivo é lido e limpo uma única vez e as próximas cargas do
+                mesmo conteúdo usam a cópia preparada em memory-map
         """
         try:
-            self.data = pd.read_csv(file_path)
-            self.data = self.data.dropna()
-            self._clean_data()
+            self.data = self._load_prepared(file_path, pd.read_csv, "graph:csv", prepared_dir)
             
             print(f"Dados carregados com sucesso: {len(self.data)} linhas")
             print(f"Colunas: {list(self.data.columns)}")
@@ -70,23 +161,74 @@ class GraphAnalyzer:
             print(f"Erro ao carregar dados: {e}")
             return False
     
-    def _clean_data(self):
-        """Limpa e padroniza os dados."""
+    def load_csv_streaming(self, file_path, source_col, target_col, weight_col=None,
+                           directed=False, chunksize=100000, read_options=None):
+        """
+        Cria o grafo a partir de um CSV lido em blocos (arquivos maiores que a memória).
+        
+        Cada bloco é limpo como em load_csv_data e somado às arestas
+        agregadas (streaming.TransactionStream); as linhas não ficam em
+        memória (self.data permanece None) e o grafo usa o backend 'csr'.
+        
+        Args:
+            file_path: Caminho para o arquivo CSV
+            source_col, target_col, weight_col, directed: Ver create_graph_from_data
+            chunksize: Linhas por bloco
+            read_options: Argumentos extras de pd.read_csv
+        """
+        try:
+            stream = TransactionStream(file_path, source_col, target_col, weight_col, date_col=None,
+                                       clean=lambda chunk: self._clean_data(chunk.dropna()),
+                                       chunksize=chunksize, directed=directed,
+                                       read_options=read_options, fill_value=1.0, strip=False)
+            stream.ingest()
+        except Exception as e:
+            print(f"Erro ao carregar dados: {e}")
+            return False
+        
+        edges = stream.edges()
+        self.data = None
+        self._set_store(CSRGraph(edges['nodes'], edges['source'], edges['target'],
+                                 edges['total_value'], edges['count'], directed=directed))
+        print(f"Dados carregados em blocos: {stream.rows} linhas")
+        print(f"Grafo criado com {self.store.number_of_nodes()} nós e {self.store.number_of_edges()} arestas")
+        return True
+    
+    def _load_prepared(self, file_path, read, variant, prepared_dir=None):
+        """Lê e limpa o arquivo, ou reaproveita o conjunto preparado em prepared_dir."""
+        def clean(data):
+            # Limpar dados e converter tipos
+            return self._clean_data(data.dropna())
+        
+        if prepared_dir is None:
+            return clean(read(file_path))
+        data, cached = prepare_dataset(file_path, read, clean, variant=variant,
+                                       prepared_dir=prepared_dir)
+        if cached:
+            print("Conjunto preparado reaproveitado")
+        return data
+    
+    def _clean_data(self, data=None):
+        """Limpa e padroniza os dados (de self.data ou do DataFrame informado)."""
+        target = self.data if data is None else data
+        
         # Converter valores monetários
-        for col in self.data.columns:
+        for col in target.columns:
             if any(keyword in col.lower() for keyword in ['valor', 'value', 'amount', 'quantia']):
-                if self.data[col].dtype == 'object':
+                if target[col].dtype == 'object':
                     # Remover símbolos de moeda e converter para float
-                    self.data[col] = self.data[col].astype(str).str.replace(r'[R$\s,.]', '', regex=True)
-                    self.data[col] = pd.to_numeric(self.data[col], errors='coerce')
+                    target[col] = target[col].astype(str).str.replace(r'[R$\s,.]', '', regex=True)
+                    target[col] = pd.to_numeric(target[col], errors='coerce')
         
         # Converter datas
-        for col in self.data.columns:
+        for col in target.columns:
             if any(keyword in col.lower() for keyword in ['data', 'date', 'quando']):
-                self.data[col] = pd.to_datetime(self.data[col], errors='coerce')
+                target[col] = pd.to_datetime(target[col], errors='coerce')
+        return target
     
     def create_graph_from_data(self, source_col, target_col, weight_col=None, 
-                             directed=False, additional_attrs=None):
+                             directed=False, additional_attrs=None, backend=None,
+                             attr_agg='first'):
         """
         Cria um grafo baseado nos dados carregados.
         
@@ -96,96 +238,289 @@ class GraphAnalyzer:
             weight_col: Nome da coluna com pesos das arestas (opcional)
             directed: Se o grafo é direcionado (True) ou não direcionado (False)
             additional_attrs: Lista de colunas adicionais para atributos dos nós/arestas
+            backend: 'networkx' ou 'csr' (arrays compactos em self.store;
+                self.graph é exportado sob demanda). Padrão: self.backend
+            attr_agg: Agregação dos atributos adicionais quando várias linhas
+                formam a mesma aresta: 'first', 'last', 'list' ou 'count', ou
+                um dict {coluna: agregação}
         """
         if self.data is None:
             print("Erro: Nenhum dado carregado")
             return False
         
+        edges, edge_data = self._aggregate_frame(source_col, target_col, weight_col,
+                                                 directed, additional_attrs, attr_agg)
+        
+        if (backend or self.backend) == 'csr':
+            self._set_store(CSRGraph(edges['nodes'], edges['source'], edges['target'],
+                                     edges['total_value'], edges['count'],
+                                     directed=directed, edge_data=edge_data))
+            print(f"Grafo criado com {self.store.number_of_nodes()} nós e {self.store.number_of_edges()} arestas")
+            return True
+        
         # Selecionar tipo de grafo
         if directed:
             self.graph = nx.DiGraph()
         else:
             self.graph = nx.Graph()
         
-        # Adicionar arestas
-        for _, row in self.data.iterrows():
-            source = str(row[source_col])
-            target = str(row[target_col])
-            
-            # Atributos da aresta
-            edge_attrs = {}
-            if weight_col and weight_col in self.data.columns:
-                edge_attrs['weight'] = float(row[weight_col]) if pd.notna(row[weight_col]) else 1.0
-            else:
-                edge_attrs['weight'] = 1.0
-            
-            # Adicionar atributos adicionais
-            if additional_attrs:
-                for attr in additional_attrs:
-                    if attr in self.data.columns:
-                        edge_attrs[attr] = row[attr]
-            
-            # Adicionar aresta
-            if self.graph.has_edge(source, target):
-                # Se a aresta já existe, somar os pesos
-                self.graph[source][target]['weight'] += edge_attrs['weight']
-            else:
-                self.graph.add_edge(source, target, **edge_attrs)
-        
-        # Calcular atributos dos nós
-        self._calculate_node_attributes()
+        # Uma aresta por par, na ordem e orientação da primeira linha
+        nodes = edges['nodes']
+        first_rows = edges['order'][edges['start']]
+        sources, targets = edges['row_source'][first_rows], edges['row_target'][first_rows]
+        columns = {name: values.tolist() for name, values in edge_data.items()}
+        weights = edges['total_value'].tolist()
+        
+        def attributes(e):
+            attrs = {'weight': weights[e]}
+            for name, values in columns.items():
+                attrs[name] = values[e]
+            return attrs
+        
+        self.graph.add_edges_from(
+            (nodes[u], nodes[v], attributes(e))
+            for e, (u, v) in enumerate(zip(sources.tolist(), targets.tolist()))
+        )
         
+        # Atributos dos nós são calculados sob demanda (ensure_node_metrics)
         print(f"Grafo criado com {self.graph.number_of_nodes()} nós e {self.graph.number_of_edges()} arestas")
         return True
     
-    def _calculate_node_attributes(self):
-        """Calcula atributos dos nós."""
-        # Centralidade
-        try:
-            degree_centrality = nx.degree_centrality(self.graph)
-            betweenness_centrality = nx.betweenness_centrality(self.graph)
-            closeness_centrality = nx.closeness_centrality(self.graph)
+    def _aggregate_frame(self, source_col, target_col, weight_col, directed, additional_attrs, attr_agg):
+        """
+        Agrupa as linhas por aresta (par canonizado no modo não direcionado).
+        
+        Pesos são somados (linhas sem peso valem 1) e cada atributo adicional é
+        agregado conforme attr_agg. Retorna (agregação de aggregate_edges,
+        {atributo: array alinhado por aresta}).
+        """
+        source_names = self.data[source_col].astype(str).to_numpy()
+        target_names = self.data[target_col].astype(str).to_numpy()
+        if weight_col and weight_col in self.data.columns:
+            weights = pd.to_numeric(self.data[weight_col], errors='coerce').fillna(1.0).to_numpy(dtype=float)
+        else:
+            weights = np.ones(len(self.data))
+        
+        edges = aggregate_edges(source_names, target_names, weights, directed)
+        
+        order, starts, counts = edges['order'], edges['start'], edges['count']
+        row_edge = None
+        edge_data = {}
+        for attr in additional_attrs or []:
+            if attr not in self.data.columns:
+                continue
+            agg = attr_agg.get(attr, 'first') if isinstance(attr_agg, dict) else attr_agg
+            if agg not in EDGE_AGGREGATIONS:
+                print(f"Agregação desconhecida '{agg}' para {attr}, usando 'first'")
+                agg = 'first'
             
-            if isinstance(self.graph, nx.Graph):
-                eigenvector_centrality = nx.eigenvector_centrality(self.graph, max_iter=1000)
+            column = self.data[attr]
+            if agg == 'first':
+                edge_data[attr] = column.to_numpy()[order[starts]]
+            elif agg == 'last':
+                edge_data[attr] = column.to_numpy()[order[starts + counts - 1]]
             else:
-                eigenvector_centrality = {}
-            
-            # Adicionar atributos aos nós
-            for node in self.graph.nodes():
-                self.graph.nodes[node]['degree_centrality'] = degree_centrality.get(node, 0)
-                self.graph.nodes[node]['betweenness_centrality'] = betweenness_centrality.get(node, 0)
-                self.graph.nodes[node]['closeness_centrality'] = closeness_centrality.get(node, 0)
-                self.graph.nodes[node]['eigenvector_centrality'] = eigenvector_centrality.get(node, 0)
-                
-                # Força do nó (soma dos pesos das arestas)
-                if isinstance(self.graph, nx.DiGraph):
-                    in_strength = sum([self.graph[u][node].get('weight', 1) for u in self.graph.predecessors(node)])
-                    out_strength = sum([self.graph[node][v].get('weight', 1) for v in self.graph.successors(node)])
-                    self.graph.nodes[node]['in_strength'] = in_strength
-                    self.graph.nodes[node]['out_strength'] = out_strength
-                    self.graph.nodes[node]['total_strength'] = in_strength + out_strength
+                if row_edge is None:
+                    row_edge = self._row_edges(edges)
+                if agg == 'count':
+                    edge_data[attr] = np.bincount(row_edge, weights=column.notna().to_numpy(),
+                                                  minlength=len(starts)).astype(np.int64)
                 else:
-                    strength = sum([self.graph[node][neighbor].get('weight', 1) for neighbor in self.graph.neighbors(node)])
-                    self.graph.nodes[node]['strength'] = strength
+                    lists = column.groupby(row_edge, sort=True).agg(list)
+                    edge_data[attr] = lists.to_numpy()
         
-        except Exception as e:
-            print(f"Erro ao calcular atributos dos nós: {e}")
+        return edges, edge_data
+    
+    @staticmethod
+    def _row_edges(edges):
+        """Id da aresta de cada linha do DataFrame."""
+        order, starts, counts = edges['order'], edges['start'], edges['count']
+        # Segmentos de 'order' em ordem de posição e a aresta correspondente a cada um
+        by_position = np.argsort(starts, kind='stable')
+        row_edge = np.empty(len(order), dtype=np.int64)
+        row_edge[order] = np.repeat(by_position, counts[by_position])
+        return row_edge
+    
+    def _export_graph(self):
+        """Exporta o CSRGraph para networkx, com as métricas e comunidades já calculadas."""
+        graph = self.store.to_networkx()
+        for attr, values in self._node_values.items():
+            nx.set_node_attributes(graph, values, attr)
+        if self._community_key is not None and self._community_key[0] == self._graph_version():
+            nx.set_node_attributes(graph, self._partition, 'community')
+        return graph
+    
+    def ensure_node_metrics(self, metrics=None):
+        """
+        Calcula as métricas de nó ainda ausentes e grava-as como atributos.
+        
+        Cada métrica é calculada uma única vez por versão do grafo; substituir
+        ou alterar o grafo invalida o cache. Com o backend 'csr' os valores
+        ficam em self._node_values até o grafo networkx ser exportado, e
+        métricas portadas (grau, força) não exportam o grafo.
+        
+        Args:
+            metrics: Métricas ou atributos desejados (padrão: todas de NODE_METRICS).
+                Nomes que não são métricas (ex.: 'community') são ignorados.
+        """
+        version = self._graph_version()
+        if self._metrics_version != version:
+            self._metrics_version = version
+            self._computed_metrics = set()
+            self._node_values = {}
+            self.centrality_info = {}
+        
+        wanted = NODE_METRICS if metrics is None else {METRIC_ATTRIBUTES.get(m, m) for m in metrics}
+        missing = [m for m in NODE_METRICS if m in wanted and m not in self._computed_metrics]
+        if not missing:
+            return
+        
+        for metric in missing:
+            try:
+                for attr, values in self._compute_metric(metric).items():
+                    nodes = self.store.nodes if self._graph is None else self._graph.nodes()
+                    values = {node: values.get(node, 0) for node in nodes}
+                    self._node_values[attr] = values
+                    if self._graph is not None:
+                        nx.set_node_attributes(self._graph, values, attr)
+            except Exception as e:
+                print(f"Erro ao calcular {metric}: {e}")
+            # Falhas também ficam em cache para não repetir cálculos caros
+            self._computed_metrics.add(metric)
+    
+    def _compute_metric(self, metric):
+        """Calcula uma métrica de NODE_METRICS; retorna {atributo: {nó: valor}}."""
+        store = self._current_store()
+        if metric == 'degree_centrality':
+            if store is not None:
+                n = store.number_of_nodes()
+                values = store.degree() / (n - 1) if n > 1 else np.ones(n)
+                return {metric: dict(zip(store.nodes, values.tolist()))}
+            return {metric: nx.degree_centrality(self.graph)}
+        
+        if metric in ('betweenness_centrality', 'closeness_centrality'):
+            return self._path_centrality(metric)
+        
+        if metric == 'eigenvector_centrality':
+            return {metric: nx.eigenvector_centrality(self.graph, max_iter=1000)}
+        
+        return self._node_strength()
     
-    def detect_communities(self, method='louvain'):
+    def _current_store(self):
+        """
+        CSRGraph, se ainda descrever a rede atual.
+        
+        O CSRGraph vale enquanto a versão registrada ao criá-lo for a atual;
+        invalidate_metrics() após alterar o grafo exportado o descarta. Uma
+        alteração não avisada no grafo exportado que mude o número de nós ou
+        de arestas também é detectada.
+        """
+        store = self.store
+        if store is None or self._store_version != self._version:
+            return None
+        if self._graph is not None and (store.number_of_nodes(), store.number_of_edges()) != \
+                (self._graph.number_of_nodes(), self._graph.number_of_edges()):
+            return None
+        return store
+    
+    def _node_strength(self):
+        """Força do nó (soma dos pesos das arestas)."""
+        store = self._current_store()
+        graph = None if store is not None else self.graph
+        if store is not None:
+            nodes = store.nodes
+            if store.is_directed():
+                in_strength, out_strength = store.in_strength(), store.out_strength()
+                strengths = {
+                    'in_strength': in_strength,
+                    'out_strength': out_strength,
+                    'total_strength': in_strength + out_strength
+                }
+            else:
+                # Como a soma sobre vizinhos do networkx, laços contam uma vez
+                loops = store.edge_source == store.edge_target
+                strengths = {'strength': store.strength() - np.bincount(
+                    store.edge_source[loops], weights=store.edge_values[loops],
+                    minlength=len(nodes))}
+            return {attr: dict(zip(nodes, values.tolist())) for attr, values in strengths.items()}
+        
+        if isinstance(graph, nx.DiGraph):
+            in_strength = {node: sum([graph[u][node].get('weight', 1) for u in graph.predecessors(node)])
+                           for node in graph.nodes()}
+            out_strength = {node: sum([graph[node][v].get('weight', 1) for v in graph.successors(node)])
+                            for node in graph.nodes()}
+            total_strength = {node: in_strength[node] + out_strength[node] for node in graph.nodes()}
+            return {'in_strength': in_strength, 'out_strength': out_strength,
+                    'total_strength': total_strength}
+        
+        strength = {node: sum([graph[node][neighbor].get('weight', 1) for neighbor in graph.neighbors(node)])
+                    for node in graph.nodes()}
+        return {'strength': strength}
+    
+    def _path_centrality(self, metric):
+        """
+        Intermediação ou proximidade no modo configurado (centrality_mode).
+        
+        Retorna {atributo: valores} (vazio no modo 'skip', sem exportar o
+        grafo) e registra o modo e os limites de erro em self.centrality_info.
+        """
+        mode = self.centrality_mode
+        if mode not in CENTRALITY_MODES:
+            print(f"Modo de centralidade desconhecido '{mode}', usando 'exact'")
+            mode = 'exact'
+        if mode == 'sampled' and not self.centrality_k:
+            print("Modo 'sampled' sem centrality_k, usando 'exact'")
+            mode = 'exact'
+        
+        self.centrality_info['mode'] = mode
+        if mode == 'skip':
+            return {}
+        
+        graph = self.graph
+        options = dict(mode=mode, k=self.centrality_k, seed=self.centrality_seed,
+                       workers=self.centrality_workers)
+        if metric == 'betweenness_centrality':
+            values, error = betweenness_centrality(graph, **options)
+            error_key = 'betweenness_error'
+        else:
+            values, error = closeness_centrality(graph, **options)
+            error_key = 'closeness_distance_error'
+        
+        if mode == 'sampled':
+            self.centrality_info.update({
+                'k': min(self.centrality_k, graph.number_of_nodes()),
+                'seed': self.centrality_seed,
+                'confidence': 0.95,
+                error_key: error
+            })
+        return {metric: values}
+    
+    def detect_communities(self, method='louvain', resolution=1.0, seed=None, warm_start=True):
         """
         Detecta comunidades no grafo.
         
         Args:
-            method: Método de detecção ('louvain', 'greedy', 'label_propagation')
+            method: Método de detecção ('louvain', 'leiden', 'greedy', 'label_propagation')
+            resolution: Resolução da modularidade ('louvain'/'leiden')
+            seed: Semente da ordem de visita dos nós ('louvain'/'leiden')
+            warm_start: Partir da partição anterior quando o grafo mudou pouco
+        
+        O resultado fica em cache para a versão atual do grafo; modularidade e
+        tempo de execução ficam em self.community_info.
         """
-        if self.graph.number_of_nodes() == 0:
+        if self._graph_size()[0] == 0:
             return {}
         
+        key = (self._graph_version(), method, resolution, seed)
+        if key == self._community_key:
+            return self._partition
+        
         try:
-            if method == 'louvain':
-                import community as community_louvain
-                partition = community_louvain.best_partition(self.graph)
+            self.community_info = {'method': method}
+            if method in COMMUNITY_METHODS:
+                result = self._detect_array_communities(method, resolution, seed, warm_start)
+                partition = result.pop('partition')
+                self.community_info = result
             elif method == 'greedy':
                 communities = nx.algorithms.community.greedy_modularity_communities(self.graph)
                 partition = {}
@@ -201,50 +536,82 @@ class GraphAnalyzer:
             else:
                 return {}
             
-            # Adicionar informação de comunidade aos nós
-            for node, community_id in partition.items():
-                self.graph.nodes[node]['community'] = community_id
+            # Adicionar informação de comunidade aos nós (ou na exportação, se ainda não houver grafo)
+            if self._graph is not None:
+                nx.set_node_attributes(self._graph, partition, 'community')
             
+            self._community_key = key
+            self._partition = partition
             return partition
         
         except Exception as e:
             print(f"Erro na detecção de comunidades: {e}")
             return {}
     
+    def _detect_array_communities(self, method, resolution, seed, warm_start):
+        """Louvain/Leiden do módulo communities sobre os arrays do grafo."""
+        store = self._current_store()
+        if store is None:
+            store = CSRGraph.from_networkx(self.graph, value_attr='weight')
+        # Arestas direcionadas são tratadas como não direcionadas
+        return self.community_detector.detect(store.nodes, store.edge_source, store.edge_target,
+                                              store.edge_values, method=method,
+                                              resolution=resolution, seed=seed,
+                                              warm_start=warm_start)
+    
     def analyze_graph(self):
-        """Realiza análise completa do grafo."""
-        if self.graph.number_of_nodes() == 0:
+        """
+        Realiza análise completa do grafo.
+        
+        Com o backend 'csr' contagens, densidade, componentes e grau vêm do
+        CSRGraph; o grafo networkx só é exportado para as centralidades de
+        caminho (exceto no modo 'skip').
+        """
+        nodes, edges = self._graph_size()
+        if nodes == 0:
             return {}
         
         analysis = {}
+        metrics = ['degree_centrality', 'betweenness_centrality', 'closeness_centrality']
+        self.ensure_node_metrics(metrics)
+        
+        # Métricas básicas e componentes conectados
+        store = self._current_store()
+        if store is not None:
+            labels = store.connected_labels()
+            sizes = np.bincount(labels).tolist()
+            density = store.density()
+        else:
+            graph = self.graph
+            if isinstance(graph, nx.DiGraph):
+                components = nx.weakly_connected_components(graph)
+            else:
+                components = nx.connected_components(graph)
+            sizes = [len(comp) for comp in components]
+            density = nx.density(graph)
         
-        # Métricas básicas
         analysis['basic_metrics'] = {
-            'nodes': self.graph.number_of_nodes(),
-            'edges': self.graph.number_of_edges(),
-            'density': nx.density(self.graph),
-            'is_connected': nx.is_connected(self.graph) if isinstance(self.graph, nx.Graph) else nx.is_weakly_connected(self.graph)
+            'nodes': nodes,
+            'edges': edges,
+            'density': density,
+            'is_connected': len(sizes) == 1
         }
         
-        # Componentes conectados
-        if isinstance(self.graph, nx.Graph):
-            components = list(nx.connected_components(self.graph))
-        else:
-            components = list(nx.weakly_connected_components(self.graph))
-        
         analysis['components'] = {
-            'count': len(components),
-            'sizes': [len(comp) for comp in components]
+            'count': len(sizes),
+            'sizes': sizes
         }
         
-        # Nós mais importantes
-        nodes_data = []
-        for node in self.graph.nodes():
-            node_data = {'node': node}
-            node_data.update(self.graph.nodes[node])
-            nodes_data.append(node_data)
+        # Modo das centralidades e limites de erro (modo amostrado)
+        if self.centrality_info:
+            analysis['centrality'] = dict(self.centrality_info)
         
-        nodes_df = pd.DataFrame(nodes_data)
+        # Nós mais importantes
+        node_order = store.nodes if store is not None else list(self.graph.nodes())
+        nodes_df = pd.DataFrame({'node': node_order})
+        for metric in metrics:
+            if metric in self._node_values:
+                nodes_df[metric] = [self._node_values[metric][node] for node in node_order]
         
         # Top nós por diferentes métricas
         analysis['top_nodes'] = {}
@@ -261,37 +628,54 @@ class GraphAnalyzer:
                 'count': len(community_sizes),
                 'sizes': dict(community_sizes)
             }
+            analysis['communities'].update(self.community_info)
         
         self.analysis_results = analysis
         return analysis
     
     def create_interactive_visualization(self, layout='spring', node_size_attr='degree_centrality',
                                        edge_width_attr='weight', color_attr='community',
-                                       title="Análise de Rede de Conexões"):
+                                       title="Análise de Rede de Conexões", render='svg',
+                                       level='auto', max_edges=5000, payload_budget=None):
         """
         Cria visualização interativa do grafo.
         
         Args:
-            layout: Tipo de layout ('spring', 'circular', 'random', 'shell')
+            layout: Tipo de layout ('spring', 'hierarchical', 'circular', 'random', 'shell');
+                'spring' e 'hierarchical' (comunidades primeiro) usam o motor do
+                módulo layout, com cache de posições por grafo
             node_size_attr: Atributo para tamanho dos nós
             edge_width_attr: Atributo para largura das arestas
             color_attr: Atributo para colorir os nós
             title: Título do gráfico
+            render: 'svg' (Scatter) ou 'webgl' (Scattergl com nível de detalhe,
+                ver rendering.webgl_network_figure)
+            level: Nível de detalhe do modo 'webgl' ('auto', 'detail', 'overview')
+            max_edges: Máximo de arestas desenhadas no modo 'webgl' (maiores pesos)
+            payload_budget: Tamanho máximo da figura em bytes no modo 'webgl'
+        
+        No modo 'webgl' o tamanho do payload e o que foi desenhado ficam em
+        self.render_stats.
         """
         if self.graph.number_of_nodes() == 0:
             return None
         
+        self.ensure_node_metrics([node_size_attr, color_attr])
+        
         # Calcular posições dos nós
-        if layout == 'spring':
-            pos = nx.spring_layout(self.graph, k=1, iterations=50)
-        elif layout == 'circular':
+        if layout == 'circular':
             pos = nx.circular_layout(self.graph)
         elif layout == 'random':
             pos = nx.random_layout(self.graph)
         elif layout == 'shell':
             pos = nx.shell_layout(self.graph)
         else:
-            pos = nx.spring_layout(self.graph)
+            pos = self._layout_positions(layout)
+        
+        if render == 'webgl':
+            fig = self._webgl_figure(pos, node_size_attr, edge_width_attr, color_attr,
+                                     level, max_edges, payload_budget)
+            return self._finish_figure(fig, title)
         
         # Preparar dados dos nós
         node_x = []
@@ -327,36 +711,16 @@ class GraphAnalyzer:
             else:
                 node_color.append(0)
         
-        # Preparar dados das arestas
-        edge_x = []
-        edge_y = []
-        edge_text = []
-        edge_width = []
-        
-        for edge in self.graph.edges():
-            x0, y0 = pos[edge[0]]
-            x1, y1 = pos[edge[1]]
-            edge_x.extend([x0, x1, None])
-            edge_y.extend([y0, y1, None])
-            
-            # Largura da aresta
-            if edge_width_attr in self.graph.edges[edge]:
-                width = self.graph.edges[edge][edge_width_attr]
-                edge_width.append(max(1, width / max([self.graph.edges[e].get(edge_width_attr, 1) for e in self.graph.edges()]) * 5))
-            else:
-                edge_width.append(1)
+        # Preparar dados das arestas: pesos extraídos e normalizados uma única vez
+        sources, targets, values = self._edge_arrays(edge_width_attr)
+        xy = np.column_stack([node_x, node_y]) if node_x else np.zeros((0, 2))
         
         # Criar gráfico
         fig = go.Figure()
         
-        # Adicionar arestas
-        fig.add_trace(go.Scatter(
-            x=edge_x, y=edge_y,
-            line=dict(width=2, color='rgba(125, 125, 125, 0.5)'),
-            hoverinfo='none',
-            mode='lines',
-            name='Conexões'
-        ))
+        # Adicionar arestas (um trace por classe de largura)
+        for trace in edge_traces(xy, sources, targets, values):
+            fig.add_trace(trace)
         
         # Adicionar nós
         fig.add_trace(go.Scatter(
@@ -376,7 +740,10 @@ class GraphAnalyzer:
             name='Entidades'
         ))
         
-        # Configurar layout
+        return self._finish_figure(fig, title)
+    
+    def _finish_figure(self, fig, title):
+        """Layout comum das visualizações da rede."""
         fig.update_layout(
             title=title,
             showlegend=False,
@@ -399,10 +766,70 @@ class GraphAnalyzer:
         
         return fig
     
+    def _edge_arrays(self, edge_attr):
+        """
+        (origens, destinos, valores) das arestas como arrays, com os nós na
+        ordem de self.graph.nodes(); valores ausentes ou não numéricos são NaN.
+        """
+        graph = self.graph
+        index = {node: i for i, node in enumerate(graph.nodes())}
+        edges = list(graph.edges(data=True))
+        sources = np.array([index[u] for u, _, _ in edges], dtype=np.int64)
+        targets = np.array([index[v] for _, v, _ in edges], dtype=np.int64)
+        values = pd.to_numeric(pd.Series([data.get(edge_attr) for _, _, data in edges], dtype=object),
+                               errors='coerce').to_numpy(dtype=float)
+        return sources, targets, values
+    
+    def _webgl_figure(self, pos, node_size_attr, edge_width_attr, color_attr,
+                      level, max_edges, payload_budget):
+        """Figura Scattergl: atributos numéricos vão para o hover via customdata."""
+        graph = self.graph
+        nodes = list(graph.nodes())
+        xy = np.array([pos[node] for node in nodes], dtype=float).reshape(-1, 2)
+        
+        sources, targets, values = self._edge_arrays(edge_width_attr)
+        values = np.nan_to_num(values, nan=1.0)
+        
+        attrs = pd.DataFrame([data for _, data in graph.nodes(data=True)], index=range(len(nodes)))
+        numeric = attrs.select_dtypes(include='number').fillna(0)
+        sizes = 20 + numeric[node_size_attr] * 30 if node_size_attr in numeric else None
+        colors = numeric[color_attr] if color_attr in numeric else np.zeros(len(nodes))
+        
+        labels = None
+        if level == 'overview' or (level == 'auto' and len(nodes) > 5000) or payload_budget:
+            partition = self.detect_communities()
+            if len(partition) == len(nodes):
+                labels = np.array([partition[node] for node in nodes])
+        
+        fig, self.render_stats = webgl_network_figure(
+            nodes, xy, sources, targets, values, sizes, colors,
+            custom={name: numeric[name].to_numpy() for name in numeric.columns},
+            labels=labels, level=level, max_edges=max_edges, payload_budget=payload_budget,
+            colorscale='Viridis', colorbar_title=color_attr, edge_color='rgba(125, 125, 125, 0.5)'
+        )
+        return fig
+    
+    def _layout_positions(self, layout):
+        """Layout de força ('spring') ou hierárquico por comunidades do motor compartilhado."""
+        store = self._current_store()
+        if store is None:
+            store = CSRGraph.from_networkx(self.graph)
+        
+        labels = None
+        if layout == 'hierarchical':
+            partition = self.detect_communities()
+            if len(partition) == store.number_of_nodes():
+                labels = np.array([partition[node] for node in store.nodes])
+        
+        method = 'hierarchical' if labels is not None else 'force'
+        return default_engine.layout(store.nodes, store.edge_source, store.edge_target,
+                                     method=method, iterations=50, labels=labels)
+    
     def create_metrics_dashboard(self):
         """Cria dashboard com métricas do grafo."""
         if not self.analysis_results:
             self.analyze_graph()
+        self.ensure_node_metrics(['betweenness_centrality'])
         
         # Criar subplots
         fig = make_subplots(
@@ -474,6 +901,8 @@ class GraphAnalyzer:
         if self.graph.number_of_nodes() == 0:
             return
         
+        self.ensure_node_metrics()
+        
         # Exportar dados dos nós
         nodes_data = []
         for node in self.graph.nodes():
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Armazenamento compacto de grafos em arrays (CSR/CSC)
+Alternativa ao networkx para redes grandes: nós interned como inteiros,
+adjacência de saída e de entrada em arrays com valores e contagens paralelos
+"""
+
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+
+def aggregate_edges(sources, targets, values, directed=True):
+    """
+    Agrega transações por par (origem, destino) em uma única passada.
+
+    Em grafos não direcionados o par é canonizado (menor código primeiro)
+    antes do agrupamento. Retorna um dict de arrays alinhados por aresta:
+    'source'/'target' (códigos em 'nodes'), 'total_value', 'count' e
+    'start', onde order[start:start + count] são as posições das linhas da
+    aresta, além de 'row_source'/'row_target' (códigos de cada linha, sem
+    canonizar). Nós e arestas vêm na ordem de primeira aparição.
+    """
+    sources = np.asarray(sources, dtype=object)
+    targets = np.asarray(targets, dtype=object)
+    values = np.asarray(values, dtype=float)
+
+    # Intercalar origem/destino preserva a ordem de primeira aparição dos nós
+    codes, nodes = pd.factorize(np.column_stack([sources, targets]).ravel())
+    codes = codes.reshape(-1, 2)
+    row_source = codes[:, 0].astype(np.int64)
+    row_target = codes[:, 1].astype(np.int64)
+    src_codes, tgt_codes = row_source, row_target
+    if not directed:
+        src_codes, tgt_codes = np.minimum(src_codes, tgt_codes), np.maximum(src_codes, tgt_codes)
+
+    keys = src_codes * max(len(nodes), 1) + tgt_codes
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+
+    if len(keys):
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        totals = np.add.reduceat(values[order], starts)
+    else:
+        starts = np.array([], dtype=np.int64)
+        totals = np.array([], dtype=float)
+    counts = np.diff(np.r_[starts, len(keys)]).astype(np.int64)
+
+    # Ordenar arestas pela primeira transação (ordenação estável => order[start] é a menor posição)
+    first_seen = np.argsort(order[starts], kind='stable')
+    starts = starts[first_seen]
+
+    return {
+        'nodes': list(nodes),
+        'source': src_codes[order[starts]],
+        'target': tgt_codes[order[starts]],
+        'total_value': totals[first_seen],
+        'count': counts[first_seen],
+        'start': starts,
+        'order': order,
+        'row_source': row_source,
+        'row_target': row_target
+    }
+
+
+def strongly_connected_labels(n, sources, targets):
+    """Rótulo do componente fortemente conectado de cada nó (scipy quando disponível)."""
+    try:
+        from scipy.sparse import csr_matrix
+        from scipy.sparse.csgraph import connected_components
+    except ImportError:
+        graph = nx.DiGraph()
+        graph.add_nodes_from(range(n))
+        graph.add_edges_from(zip(sources.tolist(), targets.tolist()))
+        labels = np.empty(n, dtype=np.int64)
+        for c, members in enumerate(nx.strongly_connected_components(graph)):
+            labels[list(members)] = c
+        return labels
+
+    matrix = csr_matrix((np.ones(len(sources), dtype=np.int8), (sources, targets)), shape=(n, n))
+    _, labels = connected_components(matrix, directed=True, connection='strong')
+    return labels.astype(np.int64)
+
+
+class CSRGraph:
+    """
+    Grafo imutável em arrays, com nós identificados por inteiros.
+
+    - nodes / node_index: tabela de nomes <-> ids
+    - edge_source, edge_target, edge_values, edge_counts: uma entrada por aresta
+    - out_indptr/out_indices (CSR) e in_indptr/in_indices (CSC), com arrays
+      paralelos de valores, contagens e id da aresta (out_edges/in_edges)
+    - node_data / edge_data: atributos extras em arrays alinhados por id
+
+    Em grafos não direcionados cada aresta aparece nas duas direções da
+    adjacência e a adjacência de entrada coincide com a de saída.
+    """
+
+    def __init__(self, nodes, sources, targets, values=None, counts=None,
+                 directed=True, node_data=None, edge_data=None):
+        self.nodes = list(nodes)
+        self.node_index = {node: i for i, node in enumerate(self.nodes)}
+        self.directed = directed
+
+        n_edges = len(sources)
+        self.edge_source = np.asarray(sources, dtype=np.int64)
+        self.edge_target = np.asarray(targets, dtype=np.int64)
+        self.edge_values = (np.ones(n_edges) if values is None
+                            else np.asarray(values, dtype=float))
+        self.edge_counts = (np.ones(n_edges, dtype=np.int64) if counts is None
+                            else np.asarray(counts, dtype=np.int64))
+        self.node_data = dict(node_data or {})
+        self.edge_data = dict(edge_data or {})
+
+        edge_ids = np.arange(n_edges, dtype=np.int64)
+        rows, cols = self.edge_source, self.edge_target
+        if not directed:
+            # Arestas nos dois sentidos (laços apenas uma vez)
+            loops = rows == cols
+            rows = np.r_[rows, self.edge_target[~loops]]
+            cols = np.r_[cols, self.edge_source[~loops]]
+            edge_ids = np.r_[edge_ids, edge_ids[~loops]]
+
+        self.out_indptr, self.out_indices, self.out_edges = self._compress(rows, cols, edge_ids)
+        if directed:
+            self.in_indptr, self.in_indices, self.in_edges = self._compress(cols, rows, edge_ids)
+        else:
+            self.in_indptr, self.in_indices, self.in_edges = self.out_indptr, self.out_indices, self.out_edges
+
+        self.out_values = self.edge_values[self.out_edges]
+        self.out_counts = self.edge_counts[self.out_edges]
+        self.in_values = self.edge_values[self.in_edges]
+        self.in_counts = self.edge_counts[self.in_edges]
+
+    def _compress(self, rows, cols, edge_ids):
+        """Ordena por (linha, coluna) e devolve (indptr, colunas, ids das arestas)."""
+        n = len(self.nodes)
+        order = np.lexsort((cols, rows))
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        return indptr, cols[order], edge_ids[order]
+
+    @classmethod
+    def from_frame(cls, data, source_col, target_col, value_col=None, directed=True):
+        """
+        Agrega um DataFrame de transações em um grafo (uma aresta por par).
+
+        Retorna (grafo, agregação), onde a agregação é o resultado de
+        aggregate_edges (útil para recuperar as linhas de cada aresta).
+        """
+        sources = data[source_col].astype(str).str.strip().to_numpy()
+        targets = data[target_col].astype(str).str.strip().to_numpy()
+        if value_col is not None and value_col in data.columns:
+            values = pd.to_numeric(data[value_col], errors='coerce').fillna(0).to_numpy(dtype=float)
+        else:
+            values = np.ones(len(data))
+
+        edges = aggregate_edges(sources, targets, values, directed)
+        graph = cls(edges['nodes'], edges['source'], edges['target'],
+                    edges['total_value'], edges['count'], directed=directed)
+        return graph, edges
+
+    @classmethod
+    def from_networkx(cls, graph, value_attr='weight', count_attr=None):
+        """Converte um grafo networkx (atributos de aresta viram arrays)."""
+        nodes = list(graph.nodes())
+        index = {node: i for i, node in enumerate(nodes)}
+        edges = list(graph.edges(data=True))
+        sources = np.array([index[u] for u, _, _ in edges], dtype=np.int64)
+        targets = np.array([index[v] for _, v, _ in edges], dtype=np.int64)
+        values = np.array([data.get(value_attr, 1) for _, _, data in edges], dtype=float)
+        counts = None
+        if count_attr is not None:
+            counts = np.array([data.get(count_attr, 1) for _, _, data in edges], dtype=np.int64)
+        return cls(nodes, sources, targets, values, counts, directed=graph.is_directed())
+
+    def number_of_nodes(self):
+        return len(self.nodes)
+
+    def number_of_edges(self):
+        return len(self.edge_source)
+
+    def is_directed(self):
+        return self.directed
+
+    def density(self):
+        """Densidade com a mesma definição do networkx."""
+        n = self.number_of_nodes()
+        if n <= 1:
+            return 0.0
+        possible = n * (n - 1) if self.directed else n * (n - 1) / 2
+        return self.number_of_edges() / possible
+
+    def node_id(self, node):
+        return self.node_index[node]
+
+    def successors(self, node):
+        i = self.node_index[node]
+        return [self.nodes[j] for j in self.out_indices[self.out_indptr[i]:self.out_indptr[i + 1]]]
+
+    def predecessors(self, node):
+        i = self.node_index[node]
+        return [self.nodes[j] for j in self.in_indices[self.in_indptr[i]:self.in_indptr[i + 1]]]
+
+    def out_degree(self):
+        return np.diff(self.out_indptr)
+
+    def in_degree(self):
+        return np.diff(self.in_indptr)
+
+    def degree(self):
+        """Grau por nó (no não direcionado, laços contam duas vezes, como no networkx)."""
+        if self.directed:
+            return self.out_degree() + self.in_degree()
+        loops = self.edge_source[self.edge_source == self.edge_target]
+        return self.out_degree() + np.bincount(loops, minlength=len(self.nodes))
+
+    def out_strength(self):
+        """Soma dos valores das arestas de saída de cada nó."""
+        return np.bincount(self.edge_source, weights=self.edge_values, minlength=len(self.nodes))
+
+    def in_strength(self):
+        """Soma dos valores das arestas de entrada de cada nó."""
+        return np.bincount(self.edge_target, weights=self.edge_values, minlength=len(self.nodes))
+
+    def strength(self):
+        """Soma dos valores das arestas incidentes (no não direcionado, laços contam duas vezes)."""
+        return self.out_strength() + self.in_strength()
+
+    def edge_id(self, u, v):
+        """Id da aresta u -> v (ou None), por busca binária na linha de u."""
+        i, j = self.node_index.get(u), self.node_index.get(v)
+        if i is None or j is None:
+            return None
+        start, end = self.out_indptr[i], self.out_indptr[i + 1]
+        pos = start + np.searchsorted(self.out_indices[start:end], j)
+        if pos < end and self.out_indices[pos] == j:
+            return int(self.out_edges[pos])
+        return None
+
+    def has_edge(self, u, v):
+        return self.edge_id(u, v) is not None
+
+    def edges(self):
+        """Itera (origem, destino, valor, contagem) na ordem das arestas."""
+        for s, t, value, count in zip(self.edge_source.tolist(), self.edge_target.tolist(),
+                                      self.edge_values.tolist(), self.edge_counts.tolist()):
+            yield self.nodes[s], self.nodes[t], value, count
+
+    def strongly_connected_labels(self, edge_mask=None):
+        """Componentes fortemente conectados, opcionalmente só com as arestas de edge_mask."""
+        sources, targets = self.edge_source, self.edge_target
+        if edge_mask is not None:
+            sources, targets = sources[edge_mask], targets[edge_mask]
+        if not self.directed:
+            sources, targets = np.r_[sources, targets], np.r_[targets, sources]
+        return strongly_connected_labels(len(self.nodes), sources, targets)
+
+    def connected_labels(self):
+        """Componentes conectados (fracamente, no direcionado), numerados pelo primeiro nó."""
+        sources, targets = self.edge_source, self.edge_target
+        return strongly_connected_labels(len(self.nodes), np.r_[sources, targets],
+                                         np.r_[targets, sources])
+
+    def to_networkx(self, value_attr='weight', count_attr=None, edge_attrs=None):
+        """
+        Exporta para networkx (para visualização ou algoritmos ainda não portados).
+
+        Atributos de node_data e edge_data são copiados; edge_attrs, se
+        informado, é uma função (id_da_aresta) -> dict com atributos extras.
+        """
+        graph = nx.DiGraph() if self.directed else nx.Graph()
+
+        node_columns = {name: np.asarray(values).tolist() for name, values in self.node_data.items()}
+        graph.add_nodes_from(
+            (node, {name: values[i] for name, values in node_columns.items()})
+            for i, node in enumerate(self.nodes)
+        )
+
+        edge_columns = {name: np.asarray(values).tolist() for name, values in self.edge_data.items()}
+        values = self.edge_values.tolist()
+        counts = self.edge_counts.tolist()
+
+        def attributes(e):
+            attrs = {value_attr: values[e]}
+            if count_attr is not None:
+                attrs[count_attr] = counts[e]
+            for name, column in edge_columns.items():
+                attrs[name] = column[e]
+            if edge_attrs is not None:
+                attrs.update(edge_attrs(e))
+            return attrs
+
+        graph.add_edges_from(
+            (self.nodes[s], self.nodes[t], attributes(e))
+            for e, (s, t) in enumerate(zip(self.edge_source.tolist(), self.edge_target.tolist()))
+        )
+        return graph
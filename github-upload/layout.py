@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Layout de redes grandes para as visualizações
+Força dirigida (Fruchterman-Reingold) com repulsão aproximada por grade
+hierárquica (Barnes-Hut), layout hierárquico por comunidades e cache de
+posições com refinamento incremental
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+LAYOUT_METHODS = ('force', 'hierarchical')
+
+# Nós processados por bloco no campo distante (limita a memória)
+_BLOCK = 32768
+
+
+def _far_field(pos, unit, k2, depth, disp):
+    """
+    Repulsão de células bem separadas, nível a nível: cada nó interage com os
+    centroides das células filhas das vizinhas da célula-pai que não são
+    vizinhas da sua própria célula (lista de interação de 27 células).
+    """
+    n = len(pos)
+    steps = np.arange(-2, 4)
+    for level in range(2, depth + 1):
+        g = 2 ** level
+        cells = np.minimum((unit * g).astype(np.int64), g - 1)
+        cid = cells[:, 0] * g + cells[:, 1]
+        counts = np.bincount(cid, minlength=g * g).astype(float)
+        sum_x = np.bincount(cid, weights=pos[:, 0], minlength=g * g)
+        sum_y = np.bincount(cid, weights=pos[:, 1], minlength=g * g)
+        occupied = counts > 0
+        cx = np.where(occupied, sum_x / np.maximum(counts, 1), 0)
+        cy = np.where(occupied, sum_y / np.maximum(counts, 1), 0)
+
+        for lo in range(0, n, _BLOCK):
+            block = slice(lo, lo + _BLOCK)
+            cell = cells[block]
+            parity = cell % 2
+            dx = (steps[None, :] - parity[:, :1])[:, :, None]
+            dy = (steps[None, :] - parity[:, 1:])[:, None, :]
+            dx, dy = np.broadcast_arrays(dx, dy)
+            tx = cell[:, 0, None, None] + dx
+            ty = cell[:, 1, None, None] + dy
+            valid = ((np.maximum(np.abs(dx), np.abs(dy)) > 1)
+                     & (tx >= 0) & (tx < g) & (ty >= 0) & (ty < g))
+            target = np.where(valid, tx * g + ty, 0)
+            mass = np.where(valid, counts[target], 0)
+
+            delta_x = pos[block, 0, None, None] - cx[target]
+            delta_y = pos[block, 1, None, None] - cy[target]
+            dist2 = np.maximum(delta_x ** 2 + delta_y ** 2, 1e-12)
+            scale = k2 * mass / dist2
+            disp[block, 0] += (scale * delta_x).sum(axis=(1, 2))
+            disp[block, 1] += (scale * delta_y).sum(axis=(1, 2))
+
+
+def _near_field(pos, unit, k2, depth, disp):
+    """Repulsão exata entre nós da mesma célula ou de células vizinhas no nível mais fino."""
+    g = 2 ** depth
+    cells = np.minimum((unit * g).astype(np.int64), g - 1)
+    cid = cells[:, 0] * g + cells[:, 1]
+    order = np.argsort(cid, kind='stable')
+    starts = np.searchsorted(cid[order], np.arange(g * g))
+    ends = np.searchsorted(cid[order], np.arange(g * g), side='right')
+
+    for ox in (-1, 0, 1):
+        for oy in (-1, 0, 1):
+            tx, ty = cells[:, 0] + ox, cells[:, 1] + oy
+            valid = np.flatnonzero((tx >= 0) & (tx < g) & (ty >= 0) & (ty < g))
+            target = tx[valid] * g + ty[valid]
+            sizes = ends[target] - starts[target]
+            if not sizes.sum():
+                continue
+            i = np.repeat(valid, sizes)
+            offset = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+            j = order[np.repeat(starts[target], sizes) + offset]
+            keep = i != j
+            i, j = i[keep], j[keep]
+
+            delta = pos[i] - pos[j]
+            dist2 = np.maximum((delta ** 2).sum(axis=1), 1e-12)
+            force = delta * (k2 / dist2)[:, None]
+            disp[:, 0] += np.bincount(i, weights=force[:, 0], minlength=len(pos))
+            disp[:, 1] += np.bincount(i, weights=force[:, 1], minlength=len(pos))
+
+
+def force_layout(n, sources, targets, weights=None, iterations=50, seed=None,
+                 initial=None, temperature=0.1, leaf_size=8):
+    """
+    Layout de força dirigida em O(n log n) por iteração.
+
+    Args:
+        n: Número de nós (ids 0..n-1)
+        sources, targets: Arrays das arestas
+        weights: Pesos da atração (padrão 1)
+        iterations: Número de iterações
+        seed: Semente das posições iniciais aleatórias
+        initial: Posições iniciais (n x 2), opcional
+        temperature: Deslocamento máximo inicial (fração da área)
+        leaf_size: Nós por célula no nível mais fino da grade
+
+    Retorna array (n x 2) com posições centradas e escaladas para [-1, 1].
+    """
+    rng = np.random.default_rng(seed)
+    if n == 0:
+        return np.zeros((0, 2))
+    pos = rng.random((n, 2)) if initial is None else np.array(initial, dtype=float)
+    if n == 1:
+        return np.zeros((1, 2))
+
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    keep = sources != targets
+    sources, targets = sources[keep], targets[keep]
+    weights = np.ones(len(sources)) if weights is None else np.asarray(weights, dtype=float)[keep]
+
+    k = np.sqrt(1.0 / n)
+    k2 = k * k
+    depth = max(1, int(np.ceil(np.log(max(n / leaf_size, 1)) / np.log(4))))
+    t = temperature * max(np.ptp(pos, axis=0).max(), 1e-9)
+    dt = t / (iterations + 1)
+
+    for _ in range(iterations):
+        disp = np.zeros((n, 2))
+        low = pos.min(axis=0)
+        span = max(np.ptp(pos, axis=0).max(), 1e-9)
+        unit = np.minimum((pos - low) / span, 1 - 1e-9)
+        _far_field(pos, unit, k2, depth, disp)
+        _near_field(pos, unit, k2, depth, disp)
+
+        # Atração ao longo das arestas
+        delta = pos[sources] - pos[targets]
+        dist = np.sqrt((delta ** 2).sum(axis=1))
+        force = delta * (dist * weights / k)[:, None]
+        for axis in (0, 1):
+            disp[:, axis] += (np.bincount(targets, weights=force[:, axis], minlength=n)
+                              - np.bincount(sources, weights=force[:, axis], minlength=n))
+
+        length = np.maximum(np.sqrt((disp ** 2).sum(axis=1)), 1e-9)
+        pos += disp * (np.minimum(length, t) / length)[:, None]
+        t -= dt
+
+    return rescale(pos)
+
+
+def rescale(pos, scale=1.0):
+    """Centraliza as posições e escala a maior coordenada para 'scale' (como o networkx)."""
+    pos = pos - pos.mean(axis=0)
+    lim = np.abs(pos).max()
+    return pos * (scale / lim) if lim > 0 else pos
+
+
+def hierarchical_layout(n, sources, targets, labels, weights=None, iterations=50, seed=None):
+    """
+    Layout em dois níveis: primeiro o grafo das comunidades (labels), depois
+    os membros de cada comunidade ao redor do seu centro, em um raio
+    proporcional à raiz do tamanho da comunidade.
+    """
+    rng = np.random.default_rng(seed)
+    labels = np.asarray(labels, dtype=np.int64)
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    weights = np.ones(len(sources)) if weights is None else np.asarray(weights, dtype=float)
+    if n == 0:
+        return np.zeros((0, 2))
+
+    n_comms = int(labels.max()) + 1
+    sizes = np.bincount(labels, minlength=n_comms)
+
+    # Comunidades: arestas entre comunidades somadas
+    src, dst = labels[sources], labels[targets]
+    between = src != dst
+    keys, inverse = np.unique(np.minimum(src, dst)[between] * n_comms
+                              + np.maximum(src, dst)[between], return_inverse=True)
+    comm_weights = np.bincount(inverse, weights=weights[between], minlength=len(keys))
+    centers = force_layout(n_comms, keys // n_comms, keys % n_comms,
+                           comm_weights / max(comm_weights.max(initial=0), 1e-9),
+                           iterations, seed)
+    radius = 0.5 * np.sqrt(sizes / n) if n_comms > 1 else np.ones(n_comms)
+
+    # Membros: layout local de cada comunidade
+    pos = np.zeros((n, 2))
+    order = np.argsort(labels, kind='stable')
+    bounds = np.r_[0, np.cumsum(sizes)]
+    internal = ~between
+    edge_comm = src[internal]
+    edge_order = np.argsort(edge_comm, kind='stable')
+    edge_bounds = np.r_[0, np.cumsum(np.bincount(edge_comm, minlength=n_comms))]
+    local_index = np.empty(n, dtype=np.int64)
+
+    for c in range(n_comms):
+        members = order[bounds[c]:bounds[c + 1]]
+        if len(members) <= 2:
+            local = rng.uniform(-1, 1, (len(members), 2)) if len(members) == 2 else np.zeros((1, 2))
+        else:
+            local_index[members] = np.arange(len(members))
+            edges = edge_order[edge_bounds[c]:edge_bounds[c + 1]]
+            local = force_layout(len(members), local_index[sources[internal][edges]],
+                                 local_index[targets[internal][edges]],
+                                 iterations=iterations, seed=rng.integers(1 << 31))
+        pos[members] = centers[c] + local * radius[c]
+
+    return rescale(pos)
+
+
+def graph_hash(nodes, sources, targets, *params):
+    """Hash da estrutura do grafo (nós, arestas) e dos parâmetros do layout."""
+    digest = hashlib.sha1()
+    digest.update('\x1f'.join(map(str, nodes)).encode('utf-8'))
+    digest.update(np.ascontiguousarray(sources, dtype=np.int64).tobytes())
+    digest.update(np.ascontiguousarray(targets, dtype=np.int64).tobytes())
+    digest.update(repr(params).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class LayoutEngine:
+    """
+    Calcula layouts com cache por hash do grafo.
+
+    Um grafo já visto devolve as posições em cache. O layout é apenas
+    refinado (nós novos começam junto aos vizinhos e rodam poucas iterações
+    com temperatura baixa) quando o último layout do mesmo método usou a
+    mesma semente e o grafo atual o estende: pelo menos refine_threshold dos
+    nós atuais já tinham posição e das arestas anteriores continuam presentes.
+    O estado fica sob uma trava, pois o motor é compartilhado pelas sessões.
+    """
+
+    def __init__(self, max_entries=8, refine_threshold=0.5, refine_iterations=15):
+        self.max_entries = max_entries
+        self.refine_threshold = refine_threshold
+        self.refine_iterations = refine_iterations
+        self.cache = OrderedDict()
+        self.last = {}
+        self._lock = threading.Lock()
+
+    def layout(self, nodes, sources, targets, method='force', iterations=50, seed=None,
+               labels=None, weights=None):
+        """
+        Retorna {nó: array([x, y])} para os nós informados.
+
+        Args:
+            nodes: Nomes dos ids 0..n-1
+            sources, targets: Arrays das arestas
+            method: 'force' ou 'hierarchical' (exige labels, comunidade de cada nó)
+            iterations: Iterações do layout completo
+            seed: Semente das posições iniciais
+            labels: Comunidade de cada nó (método 'hierarchical')
+            weights: Pesos da atração (padrão 1)
+        """
+        nodes = list(nodes)
+        key = graph_hash(nodes, sources, targets, method, iterations, seed,
+                         None if labels is None else np.asarray(labels).tolist())
+        with self._lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+            previous = self.last.get(method)
+
+        n = len(nodes)
+        if previous is not None and self._extends(previous, nodes, sources, targets, seed):
+            coords = self._initial_positions(nodes, sources, targets, previous['positions'], seed)
+            coords = force_layout(n, sources, targets, weights, self.refine_iterations, seed,
+                                  initial=coords, temperature=0.02)
+        elif method == 'hierarchical' and labels is not None:
+            coords = hierarchical_layout(n, sources, targets, labels, weights, iterations, seed)
+        else:
+            coords = force_layout(n, sources, targets, weights, iterations, seed)
+
+        positions = dict(zip(nodes, coords))
+        with self._lock:
+            self.cache[key] = positions
+            if len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+            self.last[method] = {
+                'key': key, 'seed': seed, 'nodes': nodes, 'positions': positions,
+                'sources': np.asarray(sources, dtype=np.int64),
+                'targets': np.asarray(targets, dtype=np.int64)
+            }
+        return positions
+
+    def _extends(self, previous, nodes, sources, targets, seed):
+        """Se o grafo atual é uma extensão do último layout (mesma semente, nós e arestas mantidos)."""
+        n = len(nodes)
+        if previous['seed'] != seed or not n:
+            return False
+        index = {node: i for i, node in enumerate(nodes)}
+        mapping = np.array([index.get(node, -1) for node in previous['nodes']], dtype=np.int64)
+        if (mapping >= 0).sum() / n < self.refine_threshold:
+            return False
+        if not len(previous['sources']):
+            return True
+
+        # Arestas anteriores (sem orientação) que continuam no grafo atual
+        old_s, old_t = mapping[previous['sources']], mapping[previous['targets']]
+        kept = (old_s >= 0) & (old_t >= 0)
+        old_keys = np.minimum(old_s, old_t)[kept] * n + np.maximum(old_s, old_t)[kept]
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        new_keys = np.minimum(sources, targets) * n + np.maximum(sources, targets)
+        preserved = np.isin(old_keys, new_keys).sum()
+        return preserved / len(previous['sources']) >= self.refine_threshold
+
+    @staticmethod
+    def _initial_positions(nodes, sources, targets, previous, seed):
+        """Posições anteriores; nós novos vão para a média dos vizinhos já posicionados."""
+        rng = np.random.default_rng(seed)
+        n = len(nodes)
+        coords = np.zeros((n, 2))
+        placed = np.zeros(n, dtype=bool)
+        for i, node in enumerate(nodes):
+            if node in previous:
+                coords[i] = previous[node]
+                placed[i] = True
+
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        rows = np.r_[sources, targets]
+        cols = np.r_[targets, sources]
+        useful = placed[cols] & ~placed[rows]
+        counts = np.bincount(rows[useful], minlength=n)
+        for axis in (0, 1):
+            sums = np.bincount(rows[useful], weights=coords[cols[useful], axis], minlength=n)
+            coords[:, axis] = np.where(counts > 0, sums / np.maximum(counts, 1), coords[:, axis])
+
+        lonely = ~placed & (counts == 0)
+        coords[lonely] = rng.uniform(-1, 1, (lonely.sum(), 2))
+        jitter = ~placed
+        coords[jitter] += rng.normal(0, 0.01, (jitter.sum(), 2))
+        return coords
+
+
+# Motor compartilhado pelo processo (sobrevive às reexecuções do Streamlit e
+# é usado por todas as sessões; o estado interno é protegido por trava)
+default_engine = LayoutEngine()
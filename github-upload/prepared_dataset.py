@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Conjuntos de dados preparados (limpos e tipados) em disco
+Cada coluna é gravada como um arquivo .npy, com nomes de entidades em
+códigos categóricos, em um diretório identificado pelo hash do arquivo de
+origem; a leitura usa memory-map (sem cópia das colunas numéricas e de data)
+e nunca usa pickle (um arquivo alterado no cache não executa código)
+
+Os arquivos não são criptografados: o diretório do cache deve ter o mesmo
+controle de acesso que os dados originais. O espaço total é limitado e os
+conjuntos usados há mais tempo são removidos primeiro.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = 2
+
+# Tipos aceitos nas colunas de objetos (gravados em JSON)
+_JSON_SCALARS = (str, int, float, bool)
+
+# Diretório padrão dos conjuntos preparados e espaço máximo ocupado por eles
+# (podem ser trocados pelas variáveis de ambiente)
+DEFAULT_PREPARED_DIR = os.environ.get('INVESTIGIA_PREPARED_DIR', os.path.join('.cache', 'prepared'))
+DEFAULT_PREPARED_MB = int(os.environ.get('INVESTIGIA_PREPARED_MB', 2048))
+
+
+def source_hash(source, chunk_size=1 << 20):
+    """SHA-256 do conteúdo de um arquivo (caminho), de bytes ou de um objeto com read()."""
+    digest = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+    elif isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+    else:
+        position = source.tell()
+        for chunk in iter(lambda: source.read(chunk_size), b''):
+            digest.update(chunk)
+        source.seek(position)
+    return digest.hexdigest()
+
+
+def dataset_path(key, variant='', prepared_dir=None):
+    """Diretório do conjunto preparado para o hash 'key' e a variante de limpeza."""
+    name = key if not variant else f"{key}-{hashlib.sha1(variant.encode('utf-8')).hexdigest()[:12]}"
+    return os.path.join(prepared_dir or DEFAULT_PREPARED_DIR, name)
+
+
+def _json_scalar(value):
+    """Valor de uma coluna de objetos como escalar JSON (TypeError se não houver)."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if not isinstance(value, _JSON_SCALARS):
+        raise TypeError(f"valor do tipo {type(value).__name__} não pode ser gravado sem pickle")
+    return value
+
+
+def _write_column(series, stem, write):
+    """Grava uma coluna (ou o índice) e retorna sua entrada do meta.json."""
+    entry = {'dtype': str(series.dtype)}
+    if pd.api.types.is_datetime64_any_dtype(series):
+        tz = getattr(series.dt, 'tz', None)
+        values = (series.dt.tz_convert('UTC').dt.tz_localize(None) if tz else series).to_numpy()
+        entry.update(kind='datetime', unit=str(values.dtype), tz=str(tz) if tz else None,
+                     file=write(f"{stem}.npy", values.view(np.int64)))
+    elif pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        entry.update(kind='numeric',
+                     file=write(f"{stem}.npy", np.ascontiguousarray(series.to_numpy())))
+    elif all(isinstance(v, str) for v in pd.unique(series.dropna())):
+        codes, categories = pd.factorize(series)
+        entry.update(kind='categorical',
+                     file=write(f"{stem}.npy", codes.astype(np.int32)),
+                     categories=write(f"{stem}.categories.npy", np.asarray(categories, dtype=str)))
+    else:
+        # Objetos mistos (texto, números, booleanos): códigos e valores em JSON
+        codes, categories = pd.factorize(series)
+        entry.update(kind='object',
+                     file=write(f"{stem}.npy", codes.astype(np.int32)),
+                     values=[_json_scalar(v) for v in categories])
+    return entry
+
+
+def save_prepared(data, path):
+    """
+    Grava o DataFrame em 'path' (um .npy por coluna e meta.json).
+
+    Colunas numéricas e booleanas são gravadas como estão; datas como
+    inteiros (com a unidade em meta.json); texto como códigos int32 e a
+    tabela de categorias em unicode de largura fixa. Colunas de objetos
+    mistos vão como códigos e valores em JSON; valores que não sejam texto,
+    número ou booleano levantam TypeError. O índice, quando não é o padrão
+    0..n-1, é gravado como uma coluna; MultiIndex levanta TypeError.
+    A gravação é atômica: o diretório só aparece completo.
+    """
+    index = data.index
+    if isinstance(index, pd.MultiIndex):
+        raise TypeError("MultiIndex não é suportado no conjunto preparado")
+
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix='.tmp-')
+
+    def write(name, values):
+        np.save(os.path.join(staging, name), values, allow_pickle=False)
+        return name
+
+    try:
+        columns = []
+        for i, name in enumerate(data.columns):
+            entry = _write_column(data.iloc[:, i], str(i), write)
+            entry['name'] = str(name)
+            columns.append(entry)
+
+        index_entry = None
+        if not index.equals(pd.RangeIndex(len(data))) or index.name is not None:
+            index_entry = _write_column(index.to_series(), 'index', write)
+            index_entry['name'] = index.name
+
+        meta = {'version': FORMAT_VERSION, 'rows': len(data), 'columns': columns, 'index': index_entry}
+        with open(os.path.join(staging, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(staging, path)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return path
+
+
+def load_prepared(path, categorical=False):
+    """
+    Lê um conjunto preparado com memory-map (cópia apenas nas páginas alteradas).
+
+    Args:
+        path: Diretório gravado por save_prepared
+        categorical: Mantém as colunas de texto como pd.Categorical; por
+            padrão elas voltam a ser texto (uma indexação das categorias)
+
+    Retorna o DataFrame, ou None se o diretório não existir ou for de
+    outra versão do formato.
+    """
+    meta_path = os.path.join(path, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('version') != FORMAT_VERSION:
+        return None
+
+    columns = {entry['name']: _read_column(path, entry, categorical) for entry in meta['columns']}
+    if meta.get('index'):
+        entry = meta['index']
+        index = pd.Index(_read_column(path, entry, False), name=entry['name'])
+    else:
+        index = pd.RangeIndex(meta['rows'])
+    return pd.DataFrame(columns, index=index, copy=False)
+
+
+def _read_column(path, entry, categorical):
+    """Valores de uma coluna gravada por _write_column."""
+    def read(name):
+        # 'c' = copy-on-write: leitura sem cópia e escritas ficam só na memória
+        return np.load(os.path.join(path, name), mmap_mode='c', allow_pickle=False)
+
+    kind = entry['kind']
+    if kind == 'datetime':
+        values = read(entry['file']).view(entry['unit'])
+        if entry.get('tz'):
+            values = pd.DatetimeIndex(values).tz_localize('UTC').tz_convert(entry['tz'])
+        return values
+    if kind == 'numeric':
+        return read(entry['file'])
+    if kind == 'categorical':
+        codes = read(entry['file'])
+        categories = np.asarray(read(entry['categories']), dtype=object)
+        if categorical:
+            return pd.Categorical.from_codes(codes, categories)
+    else:
+        codes = read(entry['file'])
+        categories = np.empty(len(entry['values']), dtype=object)
+        categories[:] = entry['values']
+    # Código -1 (ausente) seleciona o NaN acrescentado ao fim
+    return np.append(categories, np.nan)[codes]
+
+
+def _dataset_size(path):
+    """Bytes ocupados pelos arquivos de um conjunto preparado."""
+    total = 0
+    for entry in os.scandir(path):
+        if entry.is_file():
+            total += entry.stat().st_size
+    return total
+
+
+def evict_prepared(prepared_dir=None, max_bytes=None, keep=None):
+    """
+    Remove os conjuntos usados há mais tempo até o total caber em max_bytes.
+
+    O último uso é o horário de modificação do meta.json (atualizado a cada
+    leitura por prepare_dataset); 'keep' nunca é removido. Retorna o número
+    de conjuntos removidos.
+    """
+    directory = prepared_dir or DEFAULT_PREPARED_DIR
+    max_bytes = DEFAULT_PREPARED_MB * 1024 ** 2 if max_bytes is None else max_bytes
+    if not os.path.isdir(directory):
+        return 0
+
+    entries = []
+    total = 0
+    for entry in os.scandir(directory):
+        if not entry.is_dir() or entry.name.startswith('.tmp-'):
+            continue
+        try:
+            used = os.stat(os.path.join(entry.path, 'meta.json')).st_mtime
+            size = _dataset_size(entry.path)
+        except OSError:
+            continue
+        entries.append((used, entry.path, size))
+        total += size
+
+    removed = 0
+    keep = os.path.abspath(keep) if keep else None
+    for _, path, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if os.path.abspath(path) == keep:
+            continue
+        # Leituras em andamento (memory-map) continuam válidas após a remoção no Linux
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+def prepare_dataset(source, read, clean=None, variant='', prepared_dir=None, key=None,
+                    max_bytes=None):
+    """
+    DataFrame preparado para 'source', usando o cache em disco quando existe.
+
+    Args:
+        source: Caminho, bytes ou arquivo aberto (o hash identifica o cache)
+        read: Função source -> DataFrame bruto (ex.: pd.read_excel)
+        clean: Função DataFrame -> DataFrame limpo e tipado (opcional)
+        variant: Identifica a leitura/limpeza (ex.: planilha e analisador),
+            para que preparos diferentes do mesmo arquivo não se misturem
+        prepared_dir: Diretório do cache (padrão DEFAULT_PREPARED_DIR)
+        key: Hash do conteúdo já calculado (evita ler o arquivo de novo)
+        max_bytes: Espaço máximo do cache (padrão DEFAULT_PREPARED_MB); um
+            conjunto maior que isso não é gravado
+
+    Retorna (DataFrame, se veio do cache).
+    """
+    max_bytes = DEFAULT_PREPARED_MB * 1024 ** 2 if max_bytes is None else max_bytes
+    path = dataset_path(key or source_hash(source), variant, prepared_dir)
+    data = load_prepared(path)
+    if data is not None:
+        try:
+            os.utime(os.path.join(path, 'meta.json'))
+        except OSError:
+            pass
+        return data, True
+
+    data = read(source)
+    if clean is not None:
+        data = clean(data)
+    try:
+        save_prepared(data, path)
+        if _dataset_size(path) > max_bytes:
+            shutil.rmtree(path, ignore_errors=True)
+            return data, False
+        evict_prepared(os.path.dirname(path), max_bytes, keep=path)
+        # Mesmos tipos na primeira leitura e nas seguintes
+        return load_prepared(path), False
+    except Exception as e:
+        print(f"⚠️ Não foi possível gravar o conjunto preparado: {e}")
+        return data, False
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Renderização de redes grandes com WebGL (Scattergl)
+Nível de detalhe: comunidades agregadas em super-nós na visão geral, limite
+de arestas por peso, hover gerado no navegador e tamanho do payload medido
+"""
+
+import numpy as np
+import plotly.graph_objects as go
+
+RENDER_LEVELS = ('auto', 'detail', 'overview')
+
+
+def _top_edges(values, max_edges):
+    """Índices das max_edges arestas de maior valor (todas quando cabem no limite)."""
+    if max_edges is None or len(values) <= max_edges:
+        return np.arange(len(values))
+    if max_edges <= 0:
+        return np.array([], dtype=np.int64)
+    keep = np.argpartition(-values, max_edges - 1)[:max_edges]
+    return np.sort(keep)
+
+
+def width_buckets(values, n_buckets=5, min_width=1.0, max_width=5.0):
+    """
+    Classes de largura das arestas, calculadas de uma vez.
+
+    A largura de cada aresta é max(min_width, valor / maior valor * max_width)
+    e é arredondada para a mais próxima de n_buckets larguras igualmente
+    espaçadas. Valores ausentes (NaN) recebem min_width e entram no maior
+    valor como 1, como no original (get(atributo, 1)).
+    Retorna (classe de cada aresta, largura de cada classe).
+    """
+    values = np.asarray(values, dtype=float)
+    widths = np.full(len(values), min_width)
+    valid = ~np.isnan(values)
+    top = np.where(valid, values, 1.0).max(initial=0.0)
+    if top > 0:
+        widths[valid] = np.maximum(min_width, values[valid] / top * max_width)
+
+    # Classes igualmente espaçadas entre min_width e max_width (largura mais próxima)
+    span = max(max_width - min_width, 1e-9)
+    steps = max(n_buckets - 1, 1)
+    classes = np.clip(np.rint((widths - min_width) / span * steps).astype(np.int64), 0, n_buckets - 1)
+    return classes, np.linspace(min_width, max_width, n_buckets)
+
+
+def edge_traces(xy, sources, targets, values, trace=go.Scatter, color='rgba(125, 125, 125, 0.5)',
+                n_buckets=5, name='Conexões'):
+    """Um trace de linhas por classe de largura (ver width_buckets)."""
+    classes, widths = width_buckets(values, n_buckets)
+    traces = []
+    for c, width in enumerate(widths):
+        members = np.flatnonzero(classes == c)
+        if not len(members):
+            continue
+        edge_x, edge_y = edge_segments(xy, sources[members], targets[members])
+        traces.append(trace(
+            x=edge_x, y=edge_y,
+            mode='lines',
+            line=dict(width=float(width), color=color),
+            hoverinfo='skip',
+            name=name
+        ))
+    return traces
+
+
+def edge_segments(xy, sources, targets):
+    """Coordenadas das arestas para um único trace de linhas (NaN separa os segmentos)."""
+    gap = np.full(len(sources), np.nan)
+    x = np.column_stack([xy[sources, 0], xy[targets, 0], gap]).ravel()
+    y = np.column_stack([xy[sources, 1], xy[targets, 1], gap]).ravel()
+    return x, y
+
+
+def _hovertemplate(title, columns, formats):
+    """Template de hover avaliado no navegador a partir de customdata."""
+    lines = [f"<b>{title}</b>"]
+    for i, name in enumerate(columns):
+        lines.append(f"{name}: %{{customdata[{i}]:{formats.get(name, ',.3f')}}}")
+    return '<br>'.join(lines) + '<extra></extra>'
+
+
+def _overview(nodes, xy, sources, targets, values, sizes, colors, custom, labels):
+    """Agrega os nós por comunidade (super-nós) e as arestas entre comunidades."""
+    labels = np.asarray(labels, dtype=np.int64)
+    n_comms = int(labels.max()) + 1
+    counts = np.bincount(labels, minlength=n_comms).astype(float)
+    present = counts > 0
+
+    def mean(values):
+        return np.bincount(labels, weights=values, minlength=n_comms) / np.maximum(counts, 1)
+
+    comm_xy = np.column_stack([mean(xy[:, 0]), mean(xy[:, 1])])
+    comm_colors = mean(colors) if colors is not None else None
+    comm_custom = {'Membros': counts}
+    for name, column in custom.items():
+        comm_custom[name] = np.bincount(labels, weights=column, minlength=n_comms)
+    comm_sizes = 10 + 40 * np.sqrt(counts / counts.max())
+
+    src, dst = labels[sources], labels[targets]
+    between = src != dst
+    keys, inverse = np.unique(np.minimum(src, dst)[between] * n_comms
+                              + np.maximum(src, dst)[between], return_inverse=True)
+    comm_values = np.bincount(inverse, weights=values[between], minlength=len(keys))
+
+    ids = np.flatnonzero(present)
+    remap = np.full(n_comms, -1, dtype=np.int64)
+    remap[ids] = np.arange(len(ids))
+    names = [f"Comunidade {c}" for c in ids]
+    return (names, comm_xy[ids], remap[keys // n_comms], remap[keys % n_comms], comm_values,
+            comm_sizes[ids], None if comm_colors is None else comm_colors[ids],
+            {name: column[ids] for name, column in comm_custom.items()})
+
+
+def webgl_network_figure(nodes, xy, sources, targets, edge_values=None, sizes=None, colors=None,
+                         custom=None, custom_formats=None, labels=None, level='auto',
+                         max_nodes=5000, max_edges=5000, payload_budget=None,
+                         colorscale='Viridis', colorbar_title=None, edge_color='rgba(125, 125, 125, 0.3)'):
+    """
+    Monta a figura da rede com traces Scattergl (arestas em classes de largura).
+
+    Args:
+        nodes: Nomes dos nós (ids 0..n-1)
+        xy: Posições (n x 2)
+        sources, targets: Arrays das arestas
+        edge_values: Valor de cada aresta (ordena o corte de arestas)
+        sizes, colors: Tamanho e cor de cada nó
+        custom: {coluna: array por nó} exibido no hover (sem HTML por nó)
+        custom_formats: Formato d3 de cada coluna do hover (padrão ',.3f')
+        labels: Comunidade de cada nó (permite a visão geral)
+        level: 'detail', 'overview' (super-nós por comunidade) ou 'auto'
+            (visão geral quando há mais de max_nodes nós e comunidades)
+        max_edges: Número máximo de arestas desenhadas (as de maior valor)
+        payload_budget: Tamanho máximo do JSON da figura, em bytes; acima
+            dele passa-se à visão geral (se houver labels) e o limite de
+            arestas é reduzido pela metade até caber
+
+    Retorna (figura, estatísticas com nível, nós/arestas desenhados e payload_bytes).
+    """
+    xy = np.asarray(xy, dtype=float)
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    values = np.ones(len(sources)) if edge_values is None else np.asarray(edge_values, dtype=float)
+    sizes = np.full(len(nodes), 10.0) if sizes is None else np.asarray(sizes, dtype=float)
+    custom = {name: np.asarray(column, dtype=float) for name, column in (custom or {}).items()}
+    custom_formats = dict(custom_formats or {})
+
+    if level == 'auto':
+        level = 'overview' if labels is not None and len(nodes) > max_nodes else 'detail'
+    if level == 'overview' and labels is None:
+        level = 'detail'
+
+    while True:
+        fig, stats = _build(nodes, xy, sources, targets, values, sizes, colors, custom,
+                            custom_formats, labels, level, max_edges, colorscale,
+                            colorbar_title, edge_color)
+        stats['payload_bytes'] = len(fig.to_json())
+        stats['payload_budget'] = payload_budget
+        if payload_budget is None or stats['payload_bytes'] <= payload_budget:
+            break
+        # Primeiro agrega em comunidades, depois corta arestas pela metade
+        if level == 'detail' and labels is not None:
+            level = 'overview'
+        elif stats['edges_rendered'] > 0:
+            max_edges = stats['edges_rendered'] // 2
+        else:
+            break
+
+    stats['within_budget'] = payload_budget is None or stats['payload_bytes'] <= payload_budget
+    return fig, stats
+
+
+def _build(nodes, xy, sources, targets, values, sizes, colors, custom, custom_formats,
+           labels, level, max_edges, colorscale, colorbar_title, edge_color):
+    """Uma tentativa de montagem da figura (ver webgl_network_figure)."""
+    edges_total = len(sources)
+    title = '%{text}'
+    if level == 'overview':
+        (nodes, xy, sources, targets, values, sizes, colors,
+         custom) = _overview(nodes, xy, sources, targets, values, sizes, colors, custom, labels)
+        custom_formats = dict(custom_formats, Membros=',d')
+
+    keep = _top_edges(values, max_edges)
+
+    fig = go.Figure()
+    for trace in edge_traces(xy, sources[keep], targets[keep], values[keep], go.Scattergl, edge_color):
+        fig.add_trace(trace)
+
+    columns = list(custom)
+    marker = dict(size=sizes, line=dict(width=1, color='white'))
+    if colors is not None:
+        marker.update(color=np.asarray(colors, dtype=float), colorscale=colorscale,
+                      colorbar=dict(title=colorbar_title))
+    fig.add_trace(go.Scattergl(
+        x=xy[:, 0], y=xy[:, 1],
+        mode='markers',
+        text=[str(node) for node in nodes],
+        customdata=np.column_stack([custom[name] for name in columns]) if columns else None,
+        hovertemplate=_hovertemplate(title, columns, custom_formats),
+        marker=marker,
+        name='Entidades'
+    ))
+
+    stats = {
+        'level': level,
+        'nodes_rendered': len(nodes),
+        'edges_rendered': len(keep),
+        'edges_total': edges_total
+    }
+    return fig, stats
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Cache LRU de resultados intermediários da investigação
+Entradas identificadas pelo hash do arquivo e pelos parâmetros de cada etapa,
+com limite de número de entradas e de memória estimada
+"""
+
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+# Bytes aproximados por nó e por aresta de um grafo networkx com atributos
+# (medidos com tracemalloc); percorrer os dicionários do grafo seria caro
+GRAPH_NODE_BYTES = 768
+GRAPH_EDGE_BYTES = 640
+
+
+def content_hash(content):
+    """SHA-256 do conteúdo (bytes) de um arquivo."""
+    return hashlib.sha256(content).hexdigest()
+
+
+def estimate_size(obj):
+    """
+    Memória aproximada de um objeto em bytes.
+
+    DataFrames e arrays usam o tamanho real dos dados; grafos networkx são
+    estimados pelo número de nós e arestas; contêineres e objetos comuns são
+    percorridos sem recursão, contando cada objeto uma única vez. Quando o
+    tamanho já é conhecido (ex.: payload de uma figura), passe-o a
+    ResultCache.put em vez de estimá-lo.
+    """
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+
+        if isinstance(item, (pd.DataFrame, pd.Series, pd.Index)):
+            usage = item.memory_usage(deep=True)
+            total += int(usage.sum() if isinstance(usage, pd.Series) else usage)
+        elif isinstance(item, np.ndarray):
+            total += item.nbytes
+        elif isinstance(item, (str, bytes, int, float, bool)) or item is None:
+            total += sys.getsizeof(item)
+        elif isinstance(item, nx.Graph):
+            total += (GRAPH_NODE_BYTES * item.number_of_nodes() +
+                      GRAPH_EDGE_BYTES * item.number_of_edges())
+        elif hasattr(item, 'to_plotly_json'):
+            # Figura plotly: tamanho do JSON enviado ao navegador
+            total += len(item.to_json())
+        elif isinstance(item, dict):
+            total += sys.getsizeof(item)
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            total += sys.getsizeof(item)
+            stack.extend(item)
+        else:
+            total += sys.getsizeof(item)
+            if hasattr(item, '__dict__'):
+                stack.append(vars(item))
+            for name in getattr(type(item), '__slots__', ()):
+                if hasattr(item, name):
+                    stack.append(getattr(item, name))
+    return total
+
+
+class ResultCache:
+    """
+    Cache LRU com limite de memória.
+
+    Cada entrada guarda o valor e seu tamanho estimado; ao passar de
+    max_entries ou max_bytes as entradas menos usadas recentemente são
+    descartadas. Valores maiores que max_bytes não são guardados. As
+    operações são protegidas por um lock (o cache é compartilhado com
+    tarefas em segundo plano).
+    """
+
+    def __init__(self, max_bytes=512 * 1024 ** 2, max_entries=64):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        """Valor em cache (marcado como usado recentemente) ou default."""
+        with self._lock:
+            if key not in self.entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key][0]
+
+    def put(self, key, value, size=None):
+        """Guarda o valor (size em bytes; estimado quando não informado)."""
+        size = estimate_size(value) if size is None else size
+        with self._lock:
+            self.discard(key)
+            if size > self.max_bytes:
+                return value
+
+            self.entries[key] = (value, size)
+            self.total_bytes += size
+            while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted
+                self.evictions += 1
+        return value
+
+    def get_or_compute(self, key, compute, size=None):
+        """Valor em cache ou compute(), guardado em seguida."""
+        with self._lock:
+            if key in self.entries:
+                return self.get(key)
+            self.misses += 1
+        return self.put(key, compute(), size)
+
+    def discard(self, key):
+        """Remove a entrada, se existir."""
+        with self._lock:
+            if key in self.entries:
+                _, size = self.entries.pop(key)
+                self.total_bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        """Entradas, memória usada e contadores de acertos, faltas e descartes."""
+        with self._lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
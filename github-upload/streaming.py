@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Ingestão de CSV em blocos para arquivos maiores que a memória
+Cada bloco é limpo e resumido em agregados incrementais (arestas, contadores
+por entidade e por dia, esboço de quantis); as linhas não ficam em memória e
+os detectores que precisam delas releem o arquivo bloco a bloco
+"""
+
+import math
+import numpy as np
+import pandas as pd
+
+# Horários considerados noturnos e dias de fim de semana (análise temporal)
+NIGHT_HOURS = (22, 23, 0, 1, 2, 3, 4, 5)
+WEEKEND_DAYS = (5, 6)
+
+
+class QuantileSketch:
+    """
+    Esboço de quantis com erro relativo limitado (DDSketch).
+
+    Cada valor cai no balde ceil(log_gamma(|x|)), com
+    gamma = (1 + accuracy) / (1 - accuracy); o quantil devolvido difere do
+    exato por no máximo 'accuracy' (relativo). Esboços podem ser somados.
+    """
+
+    def __init__(self, accuracy=0.01):
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zeros = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _add(self, buckets, magnitudes):
+        keys, counts = np.unique(np.ceil(np.log(magnitudes) / self.log_gamma).astype(np.int64),
+                                 return_counts=True)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            buckets[key] = buckets.get(key, 0) + count
+
+    def update(self, values):
+        """Acrescenta um array de valores (NaN é ignorado)."""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self._add(self.positive, values[values > 0])
+        self._add(self.negative, -values[values < 0])
+        self.zeros += int((values == 0).sum())
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other):
+        """Soma outro esboço com a mesma precisão."""
+        for mine, theirs in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in theirs.items():
+                mine[key] = mine.get(key, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _table(self):
+        """Valores representativos dos baldes em ordem crescente e contagens acumuladas."""
+        neg = sorted(self.negative, reverse=True)
+        pos = sorted(self.positive)
+        scale = 2 / (self.gamma + 1)
+        values = ([-scale * self.gamma ** k for k in neg] + ([0.0] if self.zeros else [])
+                  + [scale * self.gamma ** k for k in pos])
+        counts = ([self.negative[k] for k in neg] + ([self.zeros] if self.zeros else [])
+                  + [self.positive[k] for k in pos])
+        return np.array(values), np.cumsum(counts)
+
+    def quantile(self, q):
+        """Quantil(es) q em [0, 1] (posição q * (n - 1), como o np.percentile)."""
+        if self.count == 0:
+            return np.nan if np.isscalar(q) else np.full(len(q), np.nan)
+        values, cumulative = self._table()
+        ranks = np.asarray(q, dtype=float) * (self.count - 1)
+        result = np.clip(values[np.searchsorted(cumulative, ranks, side='right')], self.min, self.max)
+        return float(result) if np.isscalar(q) else result
+
+    def rank(self, x):
+        """Fração aproximada dos valores estritamente menores que x."""
+        if self.count == 0:
+            return np.zeros(np.shape(x))
+        values, cumulative = self._table()
+        below = np.searchsorted(values, np.asarray(x, dtype=float), side='left')
+        return np.where(below > 0, cumulative[np.maximum(below - 1, 0)], 0) / self.count
+
+
+def _reduce(keys, first, sums):
+    """Soma por chave (e primeira posição de cada chave), ordenado por chave."""
+    if not len(keys):
+        return keys, first, sums
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return (keys[starts], np.minimum.reduceat(first[order], starts),
+            {name: np.add.reduceat(values[order], starts) for name, values in sums.items()})
+
+
+class KeyedSums:
+    """
+    Somas por chave inteira acumuladas bloco a bloco.
+
+    Cada bloco é reduzido localmente e guardado como parte; as partes são
+    consolidadas quando passam do dobro do tamanho já consolidado, o que
+    mantém a memória proporcional ao número de chaves, não de linhas.
+    """
+
+    def __init__(self, fields, min_pending=1 << 20):
+        self.fields = tuple(fields)
+        self.min_pending = min_pending
+        self.parts = []
+        self.consolidated = 0
+        self.pending = 0
+
+    def add(self, keys, first, **sums):
+        keys, first, sums = _reduce(np.asarray(keys, dtype=np.int64), np.asarray(first, dtype=np.int64),
+                                    {name: np.asarray(sums[name]) for name in self.fields})
+        self.parts.append((keys, first, sums))
+        self.pending += len(keys)
+        if self.pending > max(2 * self.consolidated, self.min_pending):
+            self.consolidate()
+
+    def consolidate(self):
+        if len(self.parts) > 1:
+            keys = np.concatenate([part[0] for part in self.parts])
+            first = np.concatenate([part[1] for part in self.parts])
+            sums = {name: np.concatenate([part[2][name] for part in self.parts]) for name in self.fields}
+            self.parts = [_reduce(keys, first, sums)]
+        self.consolidated = len(self.parts[0][0]) if self.parts else 0
+        self.pending = 0
+
+    def result(self):
+        """(chaves, primeira posição, {campo: somas}), ordenado por chave."""
+        self.consolidate()
+        if not self.parts:
+            empty = np.array([], dtype=np.int64)
+            return empty, empty, {name: np.array([]) for name in self.fields}
+        return self.parts[0]
+
+
+class TransactionStream:
+    """
+    Lê um CSV de transações em blocos, limpando cada bloco com 'clean'.
+
+    ingest() faz uma passada e mantém apenas agregados:
+    - arestas (origem, destino): valor total, contagem e primeira linha
+    - grupos (pessoa, dia): contagem, soma e soma dos quadrados dos valores
+    - esboço de quantis dos valores e contadores de fim de semana/noite
+    Os nós são internados na ordem de primeira aparição, como em
+    graph_store.aggregate_edges. chunks() relê o arquivo para os detectores
+    que precisam das linhas (ex.: listar outliers).
+
+    Sem value_col cada transação vale 1; valores ausentes valem fill_value.
+    Com strip=True os nomes dos nós têm espaços das pontas removidos (como
+    no AdvancedFraudAnalyzer). A pessoa dos grupos diários vem de person_col
+    (padrão, ou se a coluna não existir: source_col) com os valores como
+    estão, sem strip, igual ao groupby da detecção em memória; valores
+    ausentes não formam grupo.
+    """
+
+    def __init__(self, path, source_col='nome', target_col='empresa', value_col='valor',
+                 date_col='data', clean=None, chunksize=100000, directed=True,
+                 read_options=None, accuracy=0.01, fill_value=0.0, strip=True, person_col=None):
+        self.path = path
+        self.source_col = source_col
+        self.target_col = target_col
+        self.value_col = value_col
+        self.date_col = date_col
+        self.clean = clean
+        self.chunksize = chunksize
+        self.directed = directed
+        self.read_options = dict(read_options or {})
+        self.fill_value = fill_value
+        self.strip = strip
+        self.person_col = person_col or source_col
+
+        self.node_index = {}
+        self.person_index = {}
+        self.rows = 0
+        self.total_value = 0.0
+        self.columns = []
+        self.has_dates = False
+        self.sketch = QuantileSketch(accuracy)
+        self.temporal = {'weekend': [0, 0.0], 'night': [0, 0.0]}
+        self.edge_sums = KeyedSums(('total_value', 'count'))
+        self.day_sums = KeyedSums(('count', 'sum', 'sumsq'))
+
+    @property
+    def nodes(self):
+        return list(self.node_index)
+
+    @property
+    def persons(self):
+        return list(self.person_index)
+
+    def chunks(self):
+        """Blocos limpos do arquivo (nova leitura a cada chamada)."""
+        for chunk in pd.read_csv(self.path, chunksize=self.chunksize, **self.read_options):
+            if self.clean is not None:
+                chunk = self.clean(chunk)
+            if len(chunk):
+                yield chunk
+
+    def _names(self, column):
+        names = pd.Series(column).astype(str)
+        return (names.str.strip() if self.strip else names).to_numpy()
+
+    def values(self, chunk):
+        """Valores das transações do bloco (1 quando não há coluna de valor)."""
+        if self.value_col is None or self.value_col not in chunk.columns:
+            return np.ones(len(chunk))
+        return (pd.to_numeric(chunk[self.value_col], errors='coerce')
+                .fillna(self.fill_value).to_numpy(dtype=float))
+
+    def node_ids(self, names):
+        """Ids dos nomes (limpos como na ingestão); -1 para nomes desconhecidos."""
+        return pd.Series(self._names(names)).map(self.node_index).fillna(-1).to_numpy(dtype=np.int64)
+
+    def person_ids(self, column):
+        """Ids das pessoas (valores brutos de person_col); -1 para ausentes ou desconhecidas."""
+        return pd.Series(column).map(self.person_index).fillna(-1).to_numpy(dtype=np.int64)
+
+    def day_numbers(self, chunk):
+        """(dia desde 1970 por linha, linhas com data válida); sem data, tudo no dia 0."""
+        if not self.has_dates:
+            return np.zeros(len(chunk), dtype=np.int64), np.ones(len(chunk), dtype=bool)
+        dates = chunk[self.date_col].to_numpy(dtype='datetime64[ns]')
+        valid = ~np.isnat(dates)
+        return dates.astype('datetime64[D]').astype(np.int64), valid
+
+    def ingest(self, progress=None):
+        """Primeira passada: agrega todos os blocos. progress(linhas) é chamado por bloco."""
+        for chunk in self.chunks():
+            self._ingest_chunk(chunk)
+            if progress is not None:
+                progress(self.rows)
+        return self
+
+    def _ingest_chunk(self, chunk):
+        if not self.columns:
+            self.columns = list(chunk.columns)
+            self.has_dates = (self.date_col in chunk.columns and
+                              pd.api.types.is_datetime64_any_dtype(chunk[self.date_col]))
+            if self.person_col not in chunk.columns:
+                self.person_col = self.source_col
+        positions = np.arange(self.rows, self.rows + len(chunk), dtype=np.int64)
+        self.rows += len(chunk)
+
+        values = self.values(chunk)
+        self.total_value += float(values.sum())
+        self.sketch.update(values)
+
+        # Internar nós na ordem de primeira aparição (origem/destino intercalados)
+        sources = self._names(chunk[self.source_col])
+        targets = self._names(chunk[self.target_col])
+        codes, uniques = pd.factorize(np.column_stack([sources, targets]).ravel())
+        index = self.node_index
+        ids = np.array([index.setdefault(name, len(index)) for name in uniques], dtype=np.int64)
+        pairs = ids[codes].reshape(-1, 2)
+        src, dst = pairs[:, 0], pairs[:, 1]
+        if not self.directed:
+            src, dst = np.minimum(src, dst), np.maximum(src, dst)
+        self.edge_sums.add((src << 32) | dst, positions, total_value=values,
+                           count=np.ones(len(values), dtype=np.int64))
+
+        # Grupos (pessoa, dia) da detecção de estruturação
+        codes, uniques = pd.factorize(chunk[self.person_col])
+        people = self.person_index
+        person_ids = np.array([people.setdefault(p, len(people)) for p in uniques], dtype=np.int64)
+        persons = np.append(person_ids, -1)[codes]
+        days, valid = self.day_numbers(chunk)
+        valid &= persons >= 0
+        self.day_sums.add((persons[valid] << 32) | (days[valid] + (1 << 31)), positions[valid],
+                          count=np.ones(int(valid.sum()), dtype=np.int64),
+                          sum=values[valid], sumsq=values[valid] ** 2)
+
+        if self.has_dates:
+            dates = chunk[self.date_col]
+            for name, mask in (('weekend', dates.dt.dayofweek.isin(WEEKEND_DAYS).to_numpy()),
+                               ('night', dates.dt.hour.isin(NIGHT_HOURS).to_numpy())):
+                self.temporal[name][0] += int(mask.sum())
+                self.temporal[name][1] += float(values[mask].sum())
+
+    def edges(self):
+        """Arestas agregadas no formato de graph_store.aggregate_edges (ordem de primeira aparição)."""
+        keys, first, sums = self.edge_sums.result()
+        order = np.argsort(first, kind='stable')
+        return {
+            'nodes': self.nodes,
+            'source': keys[order] >> 32,
+            'target': keys[order] & 0xFFFFFFFF,
+            'total_value': sums['total_value'][order].astype(float),
+            'count': sums['count'][order].astype(np.int64),
+            'first_row': first[order]
+        }
+
+    def day_groups(self):
+        """Grupos (pessoa, dia): id da pessoa, dia, contagem, soma, soma dos quadrados e primeira linha."""
+        keys, first, sums = self.day_sums.result()
+        return {
+            'person': keys >> 32,
+            'day': (keys & 0xFFFFFFFF) - (1 << 31),
+            'count': sums['count'].astype(np.int64),
+            'sum': sums['sum'].astype(float),
+            'sumsq': sums['sumsq'].astype(float),
+            'first_row': first
+        }
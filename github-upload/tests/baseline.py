@@ -0,0 +1,248 @@
+"""
+Referência: detectores da versão original (commit cb9770a) do
+AdvancedFraudAnalyzer, com a mesma lógica linha a linha (iterrows,
+nx.simple_cycles, filtros por pessoa e por dia), usados para fixar a saída
+das versões otimizadas, e as comparações com essa referência
+"""
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+
+ALERT_THRESHOLD = 10000
+
+
+def load_data(path):
+    """Leitura e limpeza de load_data/_clean_financial_data/_parse_dates."""
+    data = pd.read_csv(path)
+    data.columns = [col.strip().lower().replace(' ', '_') for col in data.columns]
+
+    value_cols = [col for col in data.columns if any(x in col for x in ['valor', 'value', 'amount', 'quantia'])]
+    for col in value_cols:
+        if data[col].dtype == 'object':
+            data[col] = data[col].astype(str).str.replace(r'[R$\s]', '', regex=True)
+            data[col] = data[col].str.replace(',', '.')
+            data[col] = pd.to_numeric(data[col], errors='coerce')
+    data = data.dropna(subset=value_cols)
+
+    date_cols = [col for col in data.columns if any(x in col for x in ['data', 'date', 'quando'])]
+    for col in date_cols:
+        data[col] = pd.to_datetime(data[col], errors='coerce')
+    return data
+
+
+def build_transaction_network(data, source_col='nome', target_col='empresa', value_col='valor'):
+    """Rede de build_transaction_network, com as métricas de _calculate_node_metrics."""
+    graph = nx.DiGraph()
+    for _, row in data.iterrows():
+        source = str(row[source_col]).strip()
+        target = str(row[target_col]).strip()
+        value = float(row[value_col]) if pd.notna(row[value_col]) else 0
+        if graph.has_edge(source, target):
+            graph[source][target]['total_value'] += value
+            graph[source][target]['transaction_count'] += 1
+        else:
+            graph.add_edge(source, target, total_value=value, transaction_count=1)
+
+    for node in graph.nodes():
+        in_flow = sum([graph[source][node]['total_value'] for source in graph.predecessors(node)])
+        out_flow = sum([graph[node][target]['total_value'] for target in graph.successors(node)])
+        in_transactions = sum([graph[source][node]['transaction_count'] for source in graph.predecessors(node)])
+        out_transactions = sum([graph[node][target]['transaction_count'] for target in graph.successors(node)])
+        in_degree = graph.in_degree(node)
+        out_degree = graph.out_degree(node)
+        graph.nodes[node].update({
+            'in_flow': in_flow,
+            'out_flow': out_flow,
+            'total_flow': in_flow + out_flow,
+            'net_flow': in_flow - out_flow,
+            'in_transactions': in_transactions,
+            'out_transactions': out_transactions,
+            'total_transactions': in_transactions + out_transactions,
+            'in_degree': in_degree,
+            'out_degree': out_degree,
+            'total_degree': in_degree + out_degree
+        })
+    return graph
+
+
+def detect_structuring_patterns(data, threshold=10000, tolerance=0.1):
+    data = data.copy()
+    if 'data' in data.columns:
+        data['date_group'] = data['data'].dt.date
+    else:
+        data['date_group'] = 'sem_data'
+
+    alerts = []
+    for person in data['nome'].unique():
+        person_data = data[data['nome'] == person]
+        for date_group in person_data['date_group'].unique():
+            day_transactions = person_data[person_data['date_group'] == date_group]
+            if len(day_transactions) >= 3:
+                values = day_transactions['valor'].tolist()
+                total_value = sum(values)
+                avg_value = np.mean(values)
+                std_value = np.std(values)
+                if avg_value > 0 and (std_value / avg_value) < tolerance and total_value > threshold:
+                    alerts.append({
+                        'person': person,
+                        'date': date_group,
+                        'transaction_count': len(values),
+                        'individual_values': values,
+                        'total_value': total_value,
+                        'avg_value': avg_value,
+                        'std_value': std_value,
+                        'coefficient_variation': std_value / avg_value,
+                        'risk_level': 'ALTO' if total_value > threshold * 2 else 'MÉDIO'
+                    })
+    return alerts
+
+
+def detect_circular_transactions(graph, min_cycle_length=3, alert_threshold=ALERT_THRESHOLD):
+    patterns = []
+    for cycle in nx.simple_cycles(graph):
+        if len(cycle) < min_cycle_length:
+            continue
+        total_value = 0
+        cycle_transactions = []
+        for i in range(len(cycle)):
+            source, target = cycle[i], cycle[(i + 1) % len(cycle)]
+            edge_value = graph[source][target]['total_value']
+            total_value += edge_value
+            cycle_transactions.append({
+                'from': source,
+                'to': target,
+                'value': edge_value,
+                'transactions': graph[source][target]['transaction_count']
+            })
+        if total_value > alert_threshold:
+            patterns.append({
+                'cycle': cycle,
+                'cycle_length': len(cycle),
+                'total_value': total_value,
+                'avg_value': total_value / len(cycle),
+                'transactions': cycle_transactions,
+                'risk_level': 'CRÍTICO' if total_value > alert_threshold * 5 else 'ALTO'
+            })
+    patterns.sort(key=lambda x: x['total_value'], reverse=True)
+    return patterns
+
+
+def _calculate_risk_level(score):
+    if score > 100:
+        return 'CRÍTICO'
+    elif score > 50:
+        return 'ALTO'
+    elif score > 20:
+        return 'MÉDIO'
+    return 'BAIXO'
+
+
+def identify_hub_entities(graph, top_n=10):
+    hubs = []
+    for node in graph.nodes():
+        node_data = graph.nodes[node]
+        centrality_score = (
+            node_data.get('total_degree', 0) * 0.3 +
+            node_data.get('total_flow', 0) / 100000 * 0.4 +
+            node_data.get('total_transactions', 0) * 0.3
+        )
+        hubs.append({
+            'entity': node,
+            'total_connections': node_data.get('total_degree', 0),
+            'in_connections': node_data.get('in_degree', 0),
+            'out_connections': node_data.get('out_degree', 0),
+            'total_flow': node_data.get('total_flow', 0),
+            'in_flow': node_data.get('in_flow', 0),
+            'out_flow': node_data.get('out_flow', 0),
+            'net_flow': node_data.get('net_flow', 0),
+            'total_transactions': node_data.get('total_transactions', 0),
+            'centrality_score': centrality_score,
+            'risk_level': _calculate_risk_level(centrality_score)
+        })
+    hubs.sort(key=lambda x: x['centrality_score'], reverse=True)
+    return hubs[:top_n]
+
+
+def detect_unusual_patterns(data):
+    patterns = []
+    values = data['valor'].values
+    q1, q3 = np.percentile(values, [25, 75])
+    outlier_threshold = q3 + 1.5 * (q3 - q1)
+
+    for _, transaction in data[data['valor'] > outlier_threshold].iterrows():
+        percentile = (transaction['valor'] > values).mean() * 100
+        patterns.append({
+            'type': 'high_value_outlier',
+            'person': transaction['nome'],
+            'company': transaction['empresa'],
+            'value': transaction['valor'],
+            'date': transaction.get('data', 'N/A'),
+            'percentile': percentile,
+            'description': f"Transação {transaction['valor']:.2f} é outlier (acima do percentil {percentile:.1f}%)"
+        })
+
+    person_frequency = data['nome'].value_counts()
+    high_frequency_persons = person_frequency[person_frequency > person_frequency.quantile(0.9)]
+    for person, count in high_frequency_persons.items():
+        person_data = data[data['nome'] == person]
+        patterns.append({
+            'type': 'high_frequency',
+            'person': person,
+            'transaction_count': count,
+            'average_value': person_data['valor'].mean(),
+            'total_value': person_data['valor'].sum(),
+            'companies': person_data['empresa'].nunique(),
+            'description': f"{person} tem {count} transações (acima do normal)"
+        })
+    return patterns
+
+
+def analyze_temporal_patterns(data):
+    if 'data' not in data.columns:
+        return []
+    day_of_week = data['data'].dt.dayofweek
+    hour = data['data'].dt.hour
+    weekend = data[day_of_week.isin([5, 6])]
+    night = data[hour.isin([22, 23, 0, 1, 2, 3, 4, 5])]
+
+    analysis = []
+    if len(weekend) > 0:
+        analysis.append({
+            'pattern': 'weekend_activity',
+            'count': len(weekend),
+            'total_value': weekend['valor'].sum(),
+            'avg_value': weekend['valor'].mean(),
+            'description': f"{len(weekend)} transações em fins de semana"
+        })
+    if len(night) > 0:
+        analysis.append({
+            'pattern': 'night_activity',
+            'count': len(night),
+            'total_value': night['valor'].sum(),
+            'avg_value': night['valor'].mean(),
+            'description': f"{len(night)} transações noturnas"
+        })
+    return analysis
+
+
+def canonical(cycle):
+    """Rotação do ciclo que começa no menor nó (ciclos iguais comparam iguais)."""
+    cycle = list(cycle)
+    i = cycle.index(min(cycle))
+    return tuple(cycle[i:] + cycle[:i])
+
+
+def assert_records_equal(found, expected):
+    """Mesma sequência de dicts; números comparados com tolerância."""
+    assert len(found) == len(expected)
+    for got, want in zip(found, expected):
+        assert got.keys() == want.keys()
+        for key, value in want.items():
+            if isinstance(value, float):
+                assert got[key] == pytest.approx(value), key
+            elif isinstance(value, list) and value and isinstance(value[0], float):
+                assert got[key] == pytest.approx(value), key
+            else:
+                assert got[key] == value, key
@@ -0,0 +1,92 @@
+"""
+Fixtures compartilhadas: conjunto sintético fixo de transações
+Os módulos da raiz (github-upload) são importados diretamente
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# Entidades do conjunto: pessoas e empresas compartilham o mesmo espaço de
+# nomes para que a rede tenha ciclos
+ENTITIES = [f"Entidade {i:02d}" for i in range(14)]
+
+
+def make_transactions(seed=7, n_rows=240):
+    """
+    Transações sintéticas reprodutíveis (colunas como no arquivo original).
+
+    Os pares vêm de um conjunto fixo de conexões (rede esparsa, com
+    ciclos), os valores de uma lognormal com alguns outliers, e há grupos
+    de valores quase iguais no mesmo dia (estruturação).
+    """
+    rng = np.random.default_rng(seed)
+    n = len(ENTITIES)
+    pairs = set()
+    while len(pairs) < 34:
+        u, v = rng.integers(0, n, size=2)
+        if u != v:
+            pairs.add((int(u), int(v)))
+    pairs = sorted(pairs)
+
+    start = pd.Timestamp('2024-01-01')
+    rows = []
+    for _ in range(n_rows):
+        u, v = pairs[rng.integers(len(pairs))]
+        value = float(np.round(rng.lognormal(8.2, 0.9), 2))
+        if rng.random() < 0.03:
+            value *= 20
+        when = start + pd.Timedelta(minutes=int(rng.integers(0, 60 * 24 * 45)))
+        rows.append((ENTITIES[u], ENTITIES[v], value, when))
+
+    # Fracionamento: várias transações parecidas da mesma pessoa no mesmo dia
+    for pair, day, base, count in ((1, 3, 4200.0, 4), (12, 10, 9800.0, 3), (25, 20, 1500.0, 5)):
+        u, v = pairs[pair]
+        when = start + pd.Timedelta(days=day, hours=10)
+        for j in range(count):
+            rows.append((ENTITIES[u], ENTITIES[v], base + j * 10, when + pd.Timedelta(minutes=j)))
+
+    order = rng.permutation(len(rows))
+    frame = pd.DataFrame([rows[i] for i in order], columns=['Nome', 'Empresa', 'Valor', 'Data'])
+    frame['Data'] = frame['Data'].dt.strftime('%Y-%m-%d %H:%M:%S')
+    return frame
+
+
+@pytest.fixture(scope='session')
+def transactions():
+    """DataFrame bruto (antes da limpeza) do conjunto sintético."""
+    return make_transactions()
+
+
+@pytest.fixture
+def transactions_csv(transactions, tmp_path):
+    """O conjunto sintético gravado em CSV."""
+    path = tmp_path / 'transacoes.csv'
+    transactions.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def reference(transactions_csv):
+    """Dados e rede da versão original (ver baseline.py)."""
+    import baseline
+
+    data = baseline.load_data(transactions_csv)
+    return data, baseline.build_transaction_network(data)
+
+
+@pytest.fixture(params=['networkx', 'csr'])
+def analyzer(request, transactions_csv):
+    """AdvancedFraudAnalyzer com a rede construída, em cada backend."""
+    from advanced_fraud_analyzer import AdvancedFraudAnalyzer
+
+    analyzer = AdvancedFraudAnalyzer()
+    assert analyzer.load_data(transactions_csv)
+    assert analyzer.build_transaction_network(backend=request.param)
+    return analyzer
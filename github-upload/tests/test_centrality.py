@@ -0,0 +1,57 @@
+"""Centralidades exata, amostrada e em vários processos comparadas com o networkx"""
+
+import networkx as nx
+import pytest
+
+import centrality
+from centrality import betweenness_centrality, closeness_centrality
+
+GRAPHS = {
+    'undirected': lambda: nx.gnm_random_graph(40, 90, seed=2),
+    'directed': lambda: nx.gnm_random_graph(40, 120, seed=2, directed=True)
+}
+
+
+@pytest.fixture(params=sorted(GRAPHS))
+def graph(request):
+    graph = GRAPHS[request.param]()
+    return nx.relabel_nodes(graph, {i: f"e{i}" for i in graph})
+
+
+def test_parallel_exact_matches_networkx(graph, monkeypatch):
+    contexts = []
+    executor = centrality.ProcessPoolExecutor
+
+    def recording_executor(*args, **kwargs):
+        contexts.append((kwargs['mp_context'].get_start_method(), kwargs['initargs']))
+        return executor(*args, **kwargs)
+
+    monkeypatch.setattr(centrality, 'ProcessPoolExecutor', recording_executor)
+    values, error = betweenness_centrality(graph, workers=2)
+    assert error == 0.0
+    assert values == pytest.approx(nx.betweenness_centrality(graph))
+    values, _ = closeness_centrality(graph, workers=2)
+    assert values == pytest.approx(nx.closeness_centrality(graph))
+
+    # Pool 'spawn' e apenas a descrição dos arrays compartilhados nos argumentos
+    assert [method for method, _ in contexts] == ['spawn', 'spawn']
+    for _, (spec, directed) in contexts:
+        assert set(spec) == {'indptr', 'indices'} and directed == graph.is_directed()
+
+
+def test_sampled_with_all_pivots_is_exact(graph):
+    n = graph.number_of_nodes()
+    values, error = betweenness_centrality(graph, mode='sampled', k=n, seed=1)
+    assert error == 0.0
+    assert values == pytest.approx(nx.betweenness_centrality(graph))
+    values, _ = closeness_centrality(graph, mode='sampled', k=n, seed=1)
+    assert values == pytest.approx(nx.closeness_centrality(graph))
+
+
+def test_sampled_estimate_is_within_the_reported_bound(graph):
+    exact = nx.betweenness_centrality(graph)
+    values, error = betweenness_centrality(graph, mode='sampled', k=20, seed=3)
+    assert 0 < error
+    assert max(abs(values[node] - exact[node]) for node in graph) <= error
+    # Mesma semente, mesma estimativa (em um ou vários processos)
+    assert betweenness_centrality(graph, mode='sampled', k=20, seed=3, workers=2)[0] == pytest.approx(values)
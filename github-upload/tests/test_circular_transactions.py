@@ -0,0 +1,59 @@
+"""detect_circular_transactions comparado com a versão original (nx.simple_cycles)"""
+
+import pytest
+
+import baseline
+from advanced_fraud_analyzer import AdvancedFraudAnalyzer
+from baseline import canonical
+from cycle_search import DEFAULT_STEP_BUDGET
+
+# Sem limites: mesmo resultado da versão original
+UNBOUNDED = dict(max_cycle_length=None, top_k=None, node_step_budget=None)
+
+
+def test_unbounded_search_matches_baseline(analyzer, reference):
+    _, graph = reference
+    expected = baseline.detect_circular_transactions(graph)
+    assert expected, "o conjunto sintético deve ter ciclos acima do limiar"
+    found = analyzer.detect_circular_transactions(**UNBOUNDED)
+
+    assert not found.truncated and not found.cancelled
+    assert [c['total_value'] for c in found] == pytest.approx([c['total_value'] for c in expected])
+    by_cycle = {canonical(c['cycle']): c for c in expected}
+    assert len(by_cycle) == len(found)
+    for alert in found:
+        want = by_cycle[canonical(alert['cycle'])]
+        assert alert['total_value'] == pytest.approx(want['total_value'])
+        assert alert['cycle_length'] == want['cycle_length']
+        assert alert['risk_level'] == want['risk_level']
+        edges = {(t['from'], t['to']): (t['value'], t['transactions']) for t in alert['transactions']}
+        assert edges == {(t['from'], t['to']): (pytest.approx(t['value']), t['transactions'])
+                         for t in want['transactions']}
+
+
+def test_default_bounds_keep_the_largest(analyzer, reference):
+    _, graph = reference
+    expected = [c for c in baseline.detect_circular_transactions(graph) if c['cycle_length'] <= 6]
+    found = analyzer.detect_circular_transactions(top_k=5)
+    assert [c['total_value'] for c in found] == pytest.approx([c['total_value'] for c in expected[:5]])
+    assert found.search['node_step_budget'] == DEFAULT_STEP_BUDGET
+    assert found.search['cycles_above_threshold'] == len(expected)
+    assert found.search['limited_by_top_k'] == (len(expected) > 5)
+    assert not found.truncated
+
+
+def test_step_budget_truncation_is_reported(analyzer):
+    found = analyzer.detect_circular_transactions(max_cycle_length=None, top_k=None, node_step_budget=3)
+    assert found.truncated and found.search['truncated_starts'] > 0
+    assert 'TRUNCADA' in AdvancedFraudAnalyzer._describe_cycle_search(found.search)
+    assert len(found) < len(analyzer.detect_circular_transactions(**UNBOUNDED))
+
+
+def test_backends_agree(transactions_csv):
+    results = []
+    for backend in ('networkx', 'csr'):
+        analyzer = AdvancedFraudAnalyzer()
+        analyzer.load_data(transactions_csv)
+        analyzer.build_transaction_network(backend=backend)
+        results.append(analyzer.detect_circular_transactions(**UNBOUNDED))
+    assert results[0] == results[1]
@@ -0,0 +1,126 @@
+"""Busca limitada de ciclos comparada com nx.simple_cycles"""
+
+import threading
+import networkx as nx
+import numpy as np
+import pytest
+
+from baseline import canonical
+import cycle_search
+from cycle_search import CycleGraph, iter_cycles, parallel_top_cycles, top_cycles
+
+
+def random_graph(seed=3, n=12, m=40):
+    rng = np.random.default_rng(seed)
+    graph = nx.DiGraph()
+    graph.add_nodes_from(range(n))
+    while graph.number_of_edges() < m:
+        u, v = (int(x) for x in rng.integers(0, n, size=2))
+        if u != v:
+            graph.add_edge(u, v, total_value=float(rng.integers(1, 100)))
+    return graph
+
+
+def reference_cycles(graph, min_length=1, max_length=None, min_edge_value=0):
+    """{ciclo canônico: valor total} a partir de nx.simple_cycles no grafo podado."""
+    pruned = nx.DiGraph()
+    pruned.add_nodes_from(graph)
+    pruned.add_edges_from((u, v, d) for u, v, d in graph.edges(data=True)
+                          if d['total_value'] >= min_edge_value)
+    found = {}
+    for cycle in nx.simple_cycles(pruned):
+        if len(cycle) < min_length or (max_length is not None and len(cycle) > max_length):
+            continue
+        total = sum(pruned[cycle[i]][cycle[(i + 1) % len(cycle)]]['total_value']
+                    for i in range(len(cycle)))
+        found[canonical(cycle)] = total
+    return found
+
+
+def search(cg, **kwargs):
+    return {canonical(cg.nodes[i] for i in cycle): total
+            for cycle, total in iter_cycles(cg, **kwargs)}
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_unbounded_search_matches_simple_cycles(seed):
+    graph = random_graph(seed)
+    cg = CycleGraph.from_networkx(graph)
+    assert search(cg, max_length=graph.number_of_nodes()) == pytest.approx(reference_cycles(graph))
+
+
+@pytest.mark.parametrize('min_length,max_length,min_edge_value', [(3, 4, 0), (2, 6, 30), (1, 3, 0)])
+def test_bounds_and_pruning_match_filtered_simple_cycles(min_length, max_length, min_edge_value):
+    graph = random_graph()
+    graph.add_edge(5, 5, total_value=7.0)  # laço: ciclo de comprimento 1
+    cg = CycleGraph.from_networkx(graph, min_edge_value=min_edge_value)
+    expected = reference_cycles(graph, min_length, max_length, min_edge_value)
+    assert search(cg, max_length=max_length, min_length=min_length) == pytest.approx(expected)
+
+
+def test_each_cycle_is_generated_once():
+    cg = CycleGraph.from_networkx(random_graph())
+    cycles = [canonical(cycle) for cycle, _ in iter_cycles(cg, max_length=12)]
+    assert len(cycles) == len(set(cycles))
+
+
+def test_top_cycles_keeps_the_k_largest():
+    graph = random_graph()
+    cg = CycleGraph.from_networkx(graph)
+    expected = sorted(reference_cycles(graph, min_length=3).values(), reverse=True)
+    stats = {}
+    found = top_cycles(iter_cycles(cg, max_length=12, min_length=3), k=10, min_total=150, stats=stats)
+    assert [total for _, total in found] == pytest.approx([t for t in expected if t > 150][:10])
+    assert stats['matches'] == sum(1 for t in expected if t > 150)
+
+
+def test_parallel_search_matches_sequential():
+    cg = CycleGraph.from_networkx(random_graph(n=16, m=48))
+    sequential = top_cycles(iter_cycles(cg, max_length=5, min_length=2), k=25, min_total=100)
+    stats = {}
+    parallel = parallel_top_cycles(cg, max_length=5, min_length=2, k=25, min_total=100,
+                                   workers=2, shard_size=3, stats=stats)
+    assert parallel == sequential
+    assert stats['starts'] == len(cg.start_nodes(2))
+
+
+def test_parallel_search_from_a_thread_uses_spawn(monkeypatch):
+    contexts = []
+    executor = cycle_search.ProcessPoolExecutor
+
+    def recording_executor(*args, **kwargs):
+        contexts.append(kwargs.get('mp_context'))
+        return executor(*args, **kwargs)
+
+    monkeypatch.setattr(cycle_search, 'ProcessPoolExecutor', recording_executor)
+    cg = CycleGraph.from_networkx(random_graph(n=16, m=48))
+    cancel = threading.Event()
+    found = []
+    # Como em run_detectors: chamada a partir de uma thread, com evento de cancelamento
+    thread = threading.Thread(target=lambda: found.append(parallel_top_cycles(
+        cg, max_length=5, min_length=2, k=25, workers=2, shard_size=4, cancel=cancel)))
+    thread.start()
+    thread.join(timeout=120)
+    assert not thread.is_alive()
+    assert [c.get_start_method() for c in contexts] == ['spawn']
+    assert found[0] == top_cycles(iter_cycles(cg, max_length=5, min_length=2), k=25)
+
+
+def test_step_budget_is_deterministic_and_reported():
+    cg = CycleGraph.from_networkx(random_graph())
+    runs = []
+    for _ in range(2):
+        stats = {}
+        runs.append((list(iter_cycles(cg, max_length=12, step_budget=20, stats=stats)), stats))
+    assert runs[0] == runs[1]
+    assert runs[0][1]['truncated'] > 0
+    assert len(runs[0][0]) < len(reference_cycles(random_graph()))
+
+
+def test_cancel_stops_the_search():
+    cg = CycleGraph.from_networkx(random_graph())
+    cancel = threading.Event()
+    cancel.set()
+    stats = {}
+    assert list(iter_cycles(cg, max_length=12, stats=stats, cancel=cancel)) == []
+    assert stats['cancelled'] == 1
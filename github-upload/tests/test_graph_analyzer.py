@@ -0,0 +1,98 @@
+"""GraphAnalyzer: backend 'csr' comparado com o networkx"""
+
+import networkx as nx
+import pytest
+
+from graph_analyzer import GraphAnalyzer
+
+METRICS = ('degree_centrality', 'betweenness_centrality', 'closeness_centrality')
+
+
+def build(transactions_csv, backend, directed=False, **options):
+    analyzer = GraphAnalyzer(backend=backend, **options)
+    assert analyzer.load_csv_data(transactions_csv)
+    assert analyzer.create_graph_from_data('Nome', 'Empresa', 'Valor', directed=directed)
+    return analyzer
+
+
+def top_values(analysis, metric):
+    return [(row['node'], row[metric]) for row in analysis['top_nodes'][metric]]
+
+
+@pytest.mark.parametrize('directed', [False, True])
+def test_backends_agree(transactions_csv, directed):
+    nx_analysis = build(transactions_csv, 'networkx', directed).analyze_graph()
+    csr_analysis = build(transactions_csv, 'csr', directed).analyze_graph()
+
+    assert csr_analysis['basic_metrics'] == pytest.approx(nx_analysis['basic_metrics'])
+    assert csr_analysis['components']['count'] == nx_analysis['components']['count']
+    assert sorted(csr_analysis['components']['sizes']) == sorted(nx_analysis['components']['sizes'])
+    for metric in METRICS:
+        assert dict(top_values(csr_analysis, metric)) == pytest.approx(dict(top_values(nx_analysis, metric)))
+
+
+def test_csr_graph_matches_networkx_graph(transactions_csv):
+    nx_graph = build(transactions_csv, 'networkx').graph
+    exported = build(transactions_csv, 'csr').graph
+    assert set(exported.nodes()) == set(nx_graph.nodes())
+    assert {frozenset((u, v)): d['weight'] for u, v, d in exported.edges(data=True)} == \
+        pytest.approx({frozenset((u, v)): d['weight'] for u, v, d in nx_graph.edges(data=True)})
+
+
+def test_skip_mode_keeps_csr_off_networkx(transactions_csv):
+    analyzer = build(transactions_csv, 'csr', centrality_mode='skip')
+    analysis = analyzer.analyze_graph()
+    assert analyzer._graph is None
+    assert analysis['basic_metrics']['nodes'] == analyzer.store.number_of_nodes()
+    assert 'degree_centrality' in analysis['top_nodes']
+    assert 'betweenness_centrality' not in analysis['top_nodes']
+
+
+def reference_graph(transactions, directed):
+    """Grafo montado linha a linha, como na versão original."""
+    graph = nx.DiGraph() if directed else nx.Graph()
+    for source, target, value in zip(transactions['Nome'], transactions['Empresa'], transactions['Valor']):
+        if graph.has_edge(source, target):
+            graph[source][target]['weight'] += value
+        else:
+            graph.add_edge(source, target, weight=value)
+    return graph
+
+
+@pytest.mark.parametrize('backend', ['networkx', 'csr'])
+@pytest.mark.parametrize('directed', [False, True])
+def test_lazy_metrics_match_networkx(transactions, transactions_csv, backend, directed):
+    graph = reference_graph(transactions, directed)
+    analyzer = build(transactions_csv, backend, directed)
+    analyzer.ensure_node_metrics(list(METRICS) + ['strength'])
+    computed = {
+        'degree_centrality': nx.degree_centrality(graph),
+        'betweenness_centrality': nx.betweenness_centrality(graph),
+        'closeness_centrality': nx.closeness_centrality(graph)
+    }
+    for metric, values in computed.items():
+        assert analyzer._node_values[metric] == pytest.approx(values), metric
+    if directed:
+        assert analyzer._node_values['total_strength'] == pytest.approx(
+            {node: graph.in_degree(node, weight='weight') + graph.out_degree(node, weight='weight')
+             for node in graph})
+    else:
+        assert analyzer._node_values['strength'] == pytest.approx(dict(graph.degree(weight='weight')))
+
+
+def test_metrics_are_computed_once_per_graph_version(transactions_csv, monkeypatch):
+    analyzer = build(transactions_csv, 'networkx')
+    calls = []
+    compute = analyzer._compute_metric
+    monkeypatch.setattr(analyzer, '_compute_metric', lambda metric: calls.append(metric) or compute(metric))
+
+    analyzer.ensure_node_metrics(['degree_centrality'])
+    analyzer.ensure_node_metrics(['degree_centrality', 'closeness_centrality'])
+    analyzer.analyze_graph()
+    assert calls == ['degree_centrality', 'closeness_centrality', 'betweenness_centrality']
+
+    # Alterar o grafo invalida o cache
+    analyzer.graph.add_edge('Nova', 'Entidade 00', weight=1.0)
+    analyzer.ensure_node_metrics(['degree_centrality'])
+    assert calls[-1] == 'degree_centrality' and len(calls) == 4
+    assert 'Nova' in analyzer._node_values['degree_centrality']
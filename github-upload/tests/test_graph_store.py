@@ -0,0 +1,62 @@
+"""CSRGraph comparado com o grafo networkx equivalente"""
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from graph_store import CSRGraph
+
+
+def random_graph(directed, seed=5, n=30, m=70):
+    rng = np.random.default_rng(seed)
+    graph = nx.DiGraph() if directed else nx.Graph()
+    graph.add_nodes_from(f"n{i}" for i in range(n))  # inclui nós isolados
+    while graph.number_of_edges() < m:
+        u, v = (f"n{int(x)}" for x in rng.integers(0, n, size=2))
+        graph.add_edge(u, v, weight=float(rng.integers(1, 50)))
+    return graph
+
+
+@pytest.mark.parametrize('directed', [True, False])
+def test_structure_matches_networkx(directed):
+    graph = random_graph(directed)
+    store = CSRGraph.from_networkx(graph)
+    nodes = list(graph.nodes())
+
+    assert store.nodes == nodes
+    assert store.number_of_edges() == graph.number_of_edges()
+    assert store.density() == pytest.approx(nx.density(graph))
+    assert store.degree().tolist() == [graph.degree(node) for node in nodes]
+    assert store.strength().tolist() == pytest.approx([graph.degree(node, weight='weight') for node in nodes])
+    for u, v in graph.edges():
+        assert store.has_edge(u, v) and (directed or store.has_edge(v, u))
+    for node in nodes:
+        expected = graph.successors(node) if directed else graph.neighbors(node)
+        assert sorted(store.successors(node)) == sorted(expected)
+
+
+@pytest.mark.parametrize('directed', [True, False])
+def test_components_match_networkx(directed):
+    graph = random_graph(directed, m=25)
+    store = CSRGraph.from_networkx(graph)
+    nodes = list(graph.nodes())
+
+    def partition(labels):
+        groups = {}
+        for node, label in zip(nodes, labels):
+            groups.setdefault(label, set()).add(node)
+        return sorted(map(sorted, groups.values()))
+
+    weak = nx.weakly_connected_components(graph) if directed else nx.connected_components(graph)
+    assert partition(store.connected_labels()) == sorted(map(sorted, weak))
+    if directed:
+        strong = nx.strongly_connected_components(graph)
+        assert partition(store.strongly_connected_labels()) == sorted(map(sorted, strong))
+
+
+def test_round_trip_to_networkx():
+    graph = random_graph(True)
+    exported = CSRGraph.from_networkx(graph).to_networkx()
+    assert list(exported.nodes()) == list(graph.nodes())
+    assert {(u, v): d['weight'] for u, v, d in exported.edges(data=True)} == \
+        {(u, v): d['weight'] for u, v, d in graph.edges(data=True)}
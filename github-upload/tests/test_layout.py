@@ -0,0 +1,88 @@
+"""LayoutEngine: cache por hash do grafo e decisão de refinamento"""
+
+import threading
+import numpy as np
+import pytest
+
+import layout
+from layout import LayoutEngine
+
+
+def ring(n, extra=()):
+    """Anel de n nós (ids 0..n-1) com arestas extras opcionais."""
+    sources = list(range(n)) + [u for u, _ in extra]
+    targets = [(i + 1) % n for i in range(n)] + [v for _, v in extra]
+    return [f"N{i}" for i in range(n)], np.array(sources), np.array(targets)
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Registra se cada chamada de force_layout partiu de posições anteriores."""
+    recorded = []
+    original = layout.force_layout
+
+    def spy(*args, initial=None, **kwargs):
+        recorded.append(initial is not None)
+        return original(*args, initial=initial, **kwargs)
+
+    monkeypatch.setattr(layout, 'force_layout', spy)
+    return recorded
+
+
+def test_same_graph_is_served_from_cache(calls):
+    engine = LayoutEngine()
+    nodes, sources, targets = ring(20)
+    first = engine.layout(nodes, sources, targets, iterations=5, seed=1)
+    assert engine.layout(nodes, sources, targets, iterations=5, seed=1) is first
+    assert calls == [False]
+
+
+def test_extended_graph_is_refined(calls):
+    engine = LayoutEngine()
+    nodes, sources, targets = ring(20)
+    engine.layout(nodes, sources, targets, iterations=5, seed=1)
+    nodes, sources, targets = ring(22)
+    positions = engine.layout(nodes, sources, targets, iterations=5, seed=1)
+    assert calls == [False, True]
+    assert set(positions) == set(nodes)
+
+
+def test_other_seed_gets_a_full_layout(calls):
+    engine = LayoutEngine()
+    nodes, sources, targets = ring(20)
+    engine.layout(nodes, sources, targets, iterations=5, seed=1)
+    engine.layout(nodes, sources, targets, iterations=5, seed=2)
+    assert calls == [False, False]
+
+
+def test_rewired_graph_with_same_names_gets_a_full_layout(calls):
+    engine = LayoutEngine()
+    nodes, sources, targets = ring(20)
+    engine.layout(nodes, sources, targets, iterations=5, seed=1)
+    # Mesmos nomes, arestas totalmente diferentes (salto de 7 no anel)
+    rewired = (np.arange(20) * 7) % 20
+    engine.layout(nodes, rewired, np.roll(rewired, -1), iterations=5, seed=1)
+    assert calls == [False, False]
+
+
+def test_shared_engine_is_thread_safe():
+    engine = LayoutEngine(max_entries=4)
+    graphs = [ring(10 + i) for i in range(12)]
+    errors = []
+
+    def work(offset):
+        try:
+            for i in range(len(graphs)):
+                nodes, sources, targets = graphs[(i + offset) % len(graphs)]
+                positions = engine.layout(nodes, sources, targets, iterations=3, seed=0)
+                assert set(positions) == set(nodes)
+        except Exception as exc:  # pragma: no cover - relatado abaixo
+            errors.append(exc)
+
+    threads = [threading.Thread(target=work, args=(k,)) for k in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(engine.cache) <= engine.max_entries
@@ -0,0 +1,46 @@
+"""Métricas dos nós: hubs e atualização incremental comparados com a reconstrução"""
+
+import pandas as pd
+import pytest
+
+import baseline
+from advanced_fraud_analyzer import AdvancedFraudAnalyzer
+from baseline import assert_records_equal
+
+
+def test_hubs_match_baseline(analyzer, reference):
+    _, graph = reference
+    for top_n in (3, 10, 50):
+        assert_records_equal(analyzer.identify_hub_entities(top_n=top_n),
+                             baseline.identify_hub_entities(graph, top_n=top_n))
+
+
+@pytest.mark.parametrize('backend', ['networkx', 'csr'])
+def test_append_transactions_matches_a_full_rebuild(transactions, backend):
+    full = AdvancedFraudAnalyzer()
+    full.load_data(transactions.copy())
+    full.build_transaction_network(backend=backend)
+
+    incremental = AdvancedFraudAnalyzer()
+    incremental.load_data(transactions.iloc[:150].copy())
+    incremental.build_transaction_network(backend=backend)
+    for start, stop in ((150, 200), (200, None)):
+        extra = transactions.iloc[start:stop].copy()
+        assert incremental.append_transactions(extra) == len(extra)
+    # Entidade nova, que ainda não estava na rede
+    novo = pd.DataFrame([('Nova Entidade', transactions['Empresa'].iloc[0], 123.0, '2024-02-01 12:00')],
+                        columns=transactions.columns)
+    incremental.append_transactions(novo)
+    full.load_data(pd.concat([transactions, novo], ignore_index=True))
+    full.build_transaction_network(backend=backend)
+
+    pd.testing.assert_frame_equal(incremental._node_metrics_frame().sort_index(),
+                                  full._node_metrics_frame().sort_index(), check_dtype=False)
+    assert_records_equal(incremental.identify_hub_entities(), full.identify_hub_entities())
+    if backend == 'networkx':
+        for u, v, edge in full.graph.edges(data=True):
+            other = incremental.graph[u][v]
+            assert other['total_value'] == pytest.approx(edge['total_value'])
+            assert other['transaction_count'] == edge['transaction_count']
+            assert sorted(t['value'] for t in other['transactions']) == \
+                pytest.approx(sorted(t['value'] for t in edge['transactions']))
@@ -0,0 +1,102 @@
+"""Conjuntos preparados em disco: mesma leitura da carga direta, formato sem pickle e limite de espaço"""
+
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+from advanced_fraud_analyzer import AdvancedFraudAnalyzer
+from prepared_dataset import _dataset_size, dataset_path, prepare_dataset, source_hash
+
+
+def test_prepared_load_matches_direct_load(transactions_csv, tmp_path):
+    direct = AdvancedFraudAnalyzer()
+    direct.load_data(transactions_csv)
+
+    for _ in range(2):  # gravação e reaproveitamento
+        prepared = AdvancedFraudAnalyzer()
+        assert prepared.load_data(transactions_csv, prepared_dir=str(tmp_path / 'prepared'))
+        pd.testing.assert_frame_equal(prepared.data.reset_index(drop=True),
+                                      direct.data.reset_index(drop=True), check_dtype=False,
+                                      check_categorical=False)
+
+
+def test_cache_hit_and_eviction(transactions, tmp_path):
+    directory = str(tmp_path / 'prepared')
+    frames = [transactions.iloc[i * 60:(i + 1) * 60].reset_index(drop=True) for i in range(3)]
+    read = lambda source: frames[int(source.decode())]
+
+    data, cached = prepare_dataset(b'0', read, prepared_dir=directory)
+    assert not cached
+    data, cached = prepare_dataset(b'0', read, prepared_dir=directory)
+    assert cached
+    pd.testing.assert_frame_equal(data, frames[0], check_dtype=False, check_categorical=False)
+
+    cap = int(_dataset_size(dataset_path(source_hash(b'0'), prepared_dir=directory)) * 2.5)
+    prepare_dataset(b'1', read, prepared_dir=directory, max_bytes=cap)
+    for name, used in ((b'0', 1000), (b'1', 2000)):
+        os.utime(os.path.join(dataset_path(source_hash(name), prepared_dir=directory), 'meta.json'),
+                 (used, used))
+
+    # Espaço para dois conjuntos: '0' foi lido por último, então '1' é removido
+    assert prepare_dataset(b'0', read, prepared_dir=directory, max_bytes=cap)[1]
+    prepare_dataset(b'2', read, prepared_dir=directory, max_bytes=cap)
+    assert len(os.listdir(directory)) == 2
+    assert prepare_dataset(b'0', read, prepared_dir=directory)[1]
+    assert not prepare_dataset(b'1', read, prepared_dir=directory)[1]
+
+
+def test_dataset_larger_than_the_cap_is_not_kept(transactions, tmp_path):
+    directory = str(tmp_path / 'prepared')
+    data, cached = prepare_dataset(b'x', lambda source: transactions, prepared_dir=directory,
+                                   max_bytes=1)
+    assert not cached and len(data) == len(transactions)
+    assert os.listdir(directory) == []
+
+
+def test_mixed_objects_and_index_round_trip_without_pickle(tmp_path, monkeypatch):
+    from prepared_dataset import load_prepared, save_prepared
+
+    data = pd.DataFrame({
+        'Nome': ['A', None, 'B', 'A'],
+        'Misto': ['x', 1, 2.5, None],
+        'Valor': [1.0, 2.0, 3.0, 4.0]
+    }, index=pd.Index(['r1', 'r2', 'r3', 'r4'], name='linha'))
+    path = save_prepared(data, str(tmp_path / 'misto'))
+
+    loads = []
+    original_load = np.load
+    monkeypatch.setattr(np, 'load', lambda *args, **kwargs: loads.append(kwargs) or original_load(*args, **kwargs))
+    loaded = load_prepared(path)
+    assert loads and all(kwargs.get('allow_pickle') is False for kwargs in loads)
+
+    assert loaded.index.tolist() == ['r1', 'r2', 'r3', 'r4'] and loaded.index.name == 'linha'
+    assert loaded['Misto'].tolist()[:3] == ['x', 1, 2.5] and pd.isna(loaded['Misto'].iloc[3])
+    assert loaded['Nome'].tolist()[::2] == ['A', 'B'] and pd.isna(loaded['Nome'].iloc[1])
+    assert loaded['Valor'].tolist() == [1.0, 2.0, 3.0, 4.0]
+    for name in os.listdir(path):
+        if name.endswith('.npy'):
+            original_load(os.path.join(path, name), allow_pickle=False)
+
+
+def test_shifted_and_datetime_indexes_are_kept(tmp_path):
+    from prepared_dataset import load_prepared, save_prepared
+
+    data = pd.DataFrame({'Valor': [1.0, 2.0, 3.0]}, index=pd.RangeIndex(10, 13))
+    loaded = load_prepared(save_prepared(data, str(tmp_path / 'deslocado')))
+    assert loaded.index.tolist() == [10, 11, 12]
+
+    data.index = pd.date_range('2024-01-01', periods=3, freq='D', name='Data')
+    loaded = load_prepared(save_prepared(data, str(tmp_path / 'datas')))
+    pd.testing.assert_index_equal(loaded.index, data.index, check_exact=True, exact=False)
+
+
+def test_unsupported_values_are_refused(tmp_path):
+    from prepared_dataset import save_prepared
+
+    with pytest.raises(TypeError):
+        save_prepared(pd.DataFrame({'Objeto': [object(), 'a']}), str(tmp_path / 'objeto'))
+    with pytest.raises(TypeError):
+        save_prepared(pd.DataFrame({'Valor': [1, 2]}, index=pd.MultiIndex.from_tuples([(1, 2), (3, 4)])),
+                      str(tmp_path / 'multi'))
+    assert not (tmp_path / 'objeto').exists()
@@ -0,0 +1,33 @@
+"""Larguras das arestas comparadas com a fórmula original"""
+
+import numpy as np
+import pytest
+
+from rendering import width_buckets
+
+
+def baseline_widths(values):
+    """Largura original de cada aresta: max(1, valor / maior valor * 5); ausentes valem 1."""
+    top = max(1 if np.isnan(value) else value for value in values)
+    return np.array([1 if np.isnan(value) else max(1, value / top * 5) for value in values])
+
+
+@pytest.mark.parametrize('values', [
+    np.random.default_rng(0).lognormal(8, 1.5, size=200),
+    [10.0, 20.0, 30.0, 2000.0],
+    [5.0, 5.0, 5.0],
+    [0.2, 0.5, 0.8],
+    [np.nan, 60.0, 100.0],
+    [np.nan, 0.3, 0.6]
+])
+def test_buckets_round_the_baseline_width(values):
+    classes, widths = width_buckets(values)
+    step = widths[1] - widths[0]
+    assert np.all(np.abs(widths[classes] - baseline_widths(values)) <= step / 2 + 1e-9)
+
+
+def test_missing_values_count_as_one_in_the_largest_value():
+    classes, widths = width_buckets([np.nan, 0.5, 0.25])
+    assert widths[classes].tolist() == pytest.approx([1.0, 3.0, 1.0])
+    classes, widths = width_buckets([np.nan, np.nan])
+    assert widths[classes].tolist() == pytest.approx([1.0, 1.0])
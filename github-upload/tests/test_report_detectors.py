@@ -0,0 +1,48 @@
+"""Detectores do relatório sobre o contexto compartilhado, em paralelo e em sequência"""
+
+import threading
+import time
+
+import pytest
+
+import baseline
+from baseline import assert_records_equal
+
+
+def test_temporal_matches_baseline(analyzer, reference):
+    data, _ = reference
+    assert_records_equal(analyzer.analyze_temporal_patterns(), baseline.analyze_temporal_patterns(data))
+
+
+def test_shared_context_gives_the_original_results(analyzer, reference):
+    data, graph = reference
+    for parallel in (True, False):
+        results, timings = analyzer.run_detectors(parallel=parallel, cycle_workers=1)
+        assert set(results) == {'structuring', 'circular', 'hubs', 'unusual', 'temporal'}
+        assert 'context' in timings
+        assert_records_equal(results['structuring'], baseline.detect_structuring_patterns(data))
+        assert_records_equal(results['hubs'], baseline.identify_hub_entities(graph))
+        assert_records_equal(results['unusual'], baseline.detect_unusual_patterns(data))
+        assert_records_equal(results['temporal'], baseline.analyze_temporal_patterns(data))
+        expected = baseline.detect_circular_transactions(graph)
+        assert [c['total_value'] for c in results['circular']] == pytest.approx(
+            [c['total_value'] for c in expected if c['cycle_length'] <= 6][:100])
+
+
+def test_precomputed_results_are_not_recomputed(analyzer):
+    calls = []
+    results, timings = analyzer.run_detectors(
+        precomputed={'circular': ['cache']}, on_result=lambda name, *_: calls.append(name))
+    assert results['circular'] == ['cache'] and timings['circular'] == 0.0
+    assert sorted(calls) == ['hubs', 'structuring', 'temporal', 'unusual']
+
+
+def test_cancel_returns_partial_results_without_running_detectors(analyzer):
+    cancel = threading.Event()
+    cancel.set()
+    start = time.perf_counter()
+    results, _ = analyzer.run_detectors(parallel=False, cancel=cancel)
+    assert results == {}
+    assert time.perf_counter() - start < 5
+    # Depois do retorno nenhum detector continua rodando
+    assert not [t for t in threading.enumerate() if t.name.startswith('ThreadPoolExecutor')]
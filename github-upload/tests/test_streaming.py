@@ -0,0 +1,127 @@
+"""Ingestão em blocos comparada com a carga em memória"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from advanced_fraud_analyzer import AdvancedFraudAnalyzer
+from graph_analyzer import GraphAnalyzer
+from baseline import assert_records_equal
+
+
+@pytest.fixture
+def in_memory(transactions_csv):
+    analyzer = AdvancedFraudAnalyzer()
+    analyzer.load_data(transactions_csv)
+    analyzer.build_transaction_network(backend='csr')
+    return analyzer
+
+
+@pytest.fixture
+def streamed(transactions_csv):
+    analyzer = AdvancedFraudAnalyzer()
+    # Blocos pequenos: entidades e grupos (pessoa, dia) atravessam blocos
+    assert analyzer.load_data_streaming(transactions_csv, chunksize=37)
+    return analyzer
+
+
+def edge_table(store):
+    return {(store.nodes[u], store.nodes[v]): (value, count)
+            for u, v, value, count in zip(store.edge_source, store.edge_target,
+                                          store.edge_values, store.edge_counts)}
+
+
+def test_stream_network_matches_in_memory(in_memory, streamed):
+    assert streamed.data is None
+    assert streamed._row_count() == in_memory._row_count()
+    assert streamed._total_value() == pytest.approx(in_memory._total_value())
+    assert list(streamed.store.nodes) == list(in_memory.store.nodes)
+
+    expected = edge_table(in_memory.store)
+    found = edge_table(streamed.store)
+    assert found.keys() == expected.keys()
+    for edge, (value, count) in expected.items():
+        assert found[edge] == (pytest.approx(value), count)
+
+    pd.testing.assert_frame_equal(streamed._node_metrics_frame(), in_memory._node_metrics_frame(),
+                                  check_dtype=False)
+
+
+def test_stream_detectors_match_in_memory(in_memory, streamed):
+    assert_records_equal(streamed.detect_structuring_patterns(), in_memory.detect_structuring_patterns())
+    assert_records_equal(streamed.analyze_temporal_patterns(), in_memory.analyze_temporal_patterns())
+    assert_records_equal(streamed.identify_hub_entities(), in_memory.identify_hub_entities())
+    # Somas por bloco: os valores podem diferir no último dígito
+    found = streamed.detect_circular_transactions(max_cycle_length=None, top_k=None)
+    expected = in_memory.detect_circular_transactions(max_cycle_length=None, top_k=None)
+    assert [c['cycle'] for c in found] == [c['cycle'] for c in expected]
+    assert [c['total_value'] for c in found] == pytest.approx([c['total_value'] for c in expected])
+
+
+def test_stream_unusual_patterns_follow_in_memory(in_memory, streamed):
+    found = streamed.detect_unusual_patterns()
+    expected = in_memory.detect_unusual_patterns()
+
+    # Frequência por pessoa é exata
+    assert_records_equal([p for p in found if p['type'] == 'high_frequency'],
+                         [p for p in expected if p['type'] == 'high_frequency'])
+
+    # Quartis vêm de um esboço com erro relativo de 1%: o limiar de outlier
+    # é aproximado, então só transações próximas dele podem divergir
+    values = np.sort(in_memory.data['valor'].to_numpy(dtype=float))
+    q1, q3 = np.percentile(values, [25, 75])
+    threshold = q3 + 1.5 * (q3 - q1)
+    outliers = {p['value'] for p in found if p['type'] == 'high_value_outlier'}
+    reference = {p['value'] for p in expected if p['type'] == 'high_value_outlier'}
+    assert {v for v in outliers ^ reference if abs(v - threshold) > 0.05 * threshold} == set()
+    for pattern in found:
+        if pattern['type'] == 'high_value_outlier':
+            exact = np.searchsorted(values, pattern['value'], side='left') / len(values) * 100
+            assert pattern['percentile'] == pytest.approx(exact, abs=2.0)
+
+
+def test_graph_analyzer_stream_matches_in_memory(transactions_csv):
+    in_memory = GraphAnalyzer(backend='csr')
+    in_memory.load_csv_data(transactions_csv)
+    in_memory.create_graph_from_data('Nome', 'Empresa', 'Valor', directed=True)
+
+    streamed = GraphAnalyzer()
+    assert streamed.load_csv_streaming(transactions_csv, 'Nome', 'Empresa', 'Valor',
+                                       directed=True, chunksize=50)
+    assert streamed.data is None
+    assert list(streamed.store.nodes) == list(in_memory.store.nodes)
+
+    expected = edge_table(in_memory.store)
+    found = edge_table(streamed.store)
+    assert found.keys() == expected.keys()
+    for edge, (value, count) in expected.items():
+        assert found[edge] == (pytest.approx(value), count)
+
+    assert streamed.analyze_graph()['basic_metrics'] == in_memory.analyze_graph()['basic_metrics']
+
+
+def test_stream_structuring_groups_by_the_raw_name(tmp_path):
+    # ' Ana' e 'Ana' são a mesma entidade na rede, mas pessoas diferentes na
+    # detecção em memória (groupby pela coluna 'nome' sem strip)
+    frame = pd.DataFrame({
+        'Nome': ['Ana', ' Ana', 'Ana', ' Ana', 'Ana', ' Ana', 'Bia', 'Bia', 'Bia'],
+        'Empresa': ['X'] * 9,
+        'Valor': [4000.0, 4010.0, 4020.0, 4030.0, 4040.0, 4050.0, 1000.0, 1010.0, 1020.0],
+        'Data': ['2024-03-01 10:00:00'] * 9
+    })
+    path = tmp_path / 'espacos.csv'
+    frame.to_csv(path, index=False)
+
+    in_memory = AdvancedFraudAnalyzer()
+    in_memory.load_data(str(path))
+    streamed = AdvancedFraudAnalyzer()
+    assert streamed.load_data_streaming(str(path), chunksize=2)
+
+    expected = in_memory.detect_structuring_patterns(threshold=5000)
+    assert [alert['person'] for alert in expected] == ['Ana', ' Ana']
+    assert_records_equal(streamed.detect_structuring_patterns(threshold=5000), expected)
+
+
+def test_windowed_structuring_is_unavailable_when_streaming(streamed):
+    assert streamed.detect_windowed_structuring() == []
+    assert streamed.suspicious_patterns['structuring_windows'] == []
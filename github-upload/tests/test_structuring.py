@@ -0,0 +1,48 @@
+"""Detecção de estruturação comparada com a versão original (laços por pessoa e por dia)"""
+
+import pandas as pd
+
+import baseline
+from baseline import assert_records_equal
+
+
+def test_structuring_matches_baseline(analyzer, reference):
+    data, _ = reference
+    expected = baseline.detect_structuring_patterns(data)
+    assert expected, "o conjunto sintético deve gerar alertas de estruturação"
+    assert_records_equal(analyzer.detect_structuring_patterns(), expected)
+
+
+def test_thresholds_match_baseline(analyzer, reference):
+    data, _ = reference
+    for threshold, tolerance in ((5000, 0.3), (20000, 0.05), (1000, 1.0)):
+        assert_records_equal(analyzer.detect_structuring_patterns(threshold, tolerance),
+                             baseline.detect_structuring_patterns(data, threshold, tolerance))
+
+
+def windowed(rows, window, tolerance=0.1, threshold=10000):
+    from advanced_fraud_analyzer import AdvancedFraudAnalyzer
+
+    analyzer = AdvancedFraudAnalyzer()
+    analyzer.load_data(pd.DataFrame(rows, columns=['Nome', 'Empresa', 'Valor', 'Data']))
+    return analyzer.detect_windowed_structuring(window=window, threshold=threshold,
+                                                tolerance=tolerance)
+
+
+def test_windows_spread_over_several_days():
+    rows = [('Ana', 'Loja', 3500.0, f'2024-03-0{day} 10:00') for day in (1, 2, 3)]
+    assert windowed(rows, '24h', tolerance=None) == []
+    alerts = windowed(rows, '72h', tolerance=None)
+    assert len(alerts) == 1
+    assert alerts[0]['individual_values'] == [3500.0] * 3
+    assert alerts[0]['first_transaction'] == pd.Timestamp('2024-03-01 10:00')
+
+
+def test_tolerance_is_checked_before_merging_overlapping_windows():
+    # A janela de 72h com o maior total inclui os 9000 e falha no CV; a janela
+    # só com os três valores de 4000 passa e deve gerar o alerta
+    rows = [('Ana', 'Loja', 4000.0, f'2024-03-01 {hour:02d}:00') for hour in (8, 9, 10)]
+    rows.append(('Ana', 'Loja', 9000.0, '2024-03-03 09:00'))
+    for window in ('24h', '72h'):
+        alerts = windowed(rows, window)
+        assert [a['individual_values'] for a in alerts] == [[4000.0] * 3], window
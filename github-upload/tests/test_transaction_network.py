@@ -0,0 +1,33 @@
+"""Rede de transações comparada com a construção original linha a linha"""
+
+import pandas as pd
+import pytest
+
+
+def test_network_matches_baseline(analyzer, reference):
+    _, graph = reference
+    assert analyzer._graph_size() == (graph.number_of_nodes(), graph.number_of_edges())
+    for u, v, data in graph.edges(data=True):
+        assert analyzer._edge_totals(u, v) == (pytest.approx(data['total_value']),
+                                                data['transaction_count'])
+
+
+def test_node_metrics_match_baseline(analyzer, reference):
+    _, graph = reference
+    metrics = analyzer._node_metrics_frame()
+    assert list(metrics.index) == list(graph.nodes())
+    expected = pd.DataFrame([graph.nodes[node] for node in graph.nodes()], index=list(graph.nodes()))
+    pd.testing.assert_frame_equal(metrics, expected[metrics.columns], check_dtype=False)
+
+
+def test_edge_transactions_list_the_original_rows(reference, transactions_csv):
+    from advanced_fraud_analyzer import AdvancedFraudAnalyzer
+
+    data, graph = reference
+    analyzer = AdvancedFraudAnalyzer()
+    analyzer.load_data(transactions_csv)
+    analyzer.build_transaction_network()
+    for u, v, edge in analyzer.graph.edges(data=True):
+        rows = data[(data['nome'] == u) & (data['empresa'] == v)]
+        assert [t['row_index'] for t in edge['transactions']] == rows.index.tolist()
+        assert [t['value'] for t in edge['transactions']] == pytest.approx(rows['valor'].tolist())
@@ -0,0 +1,25 @@
+"""Outliers e frequência por pessoa comparados com a versão original"""
+
+import baseline
+from baseline import assert_records_equal
+
+
+def test_unusual_matches_baseline(analyzer, reference):
+    data, _ = reference
+    expected = baseline.detect_unusual_patterns(data)
+    assert any(p['type'] == 'high_value_outlier' for p in expected)
+    assert any(p['type'] == 'high_frequency' for p in expected)
+    assert_records_equal(analyzer.detect_unusual_patterns(), expected)
+
+
+def test_robust_outliers_are_added_after_the_original_patterns(analyzer, reference):
+    data, _ = reference
+    expected = baseline.detect_unusual_patterns(data)
+    found = analyzer.detect_unusual_patterns(robust_z_threshold=3.5)
+    assert_records_equal(found[:len(expected)], expected)
+    robust = found[len(expected):]
+    assert robust and all(p['type'] == 'entity_robust_outlier' for p in robust)
+    for pattern in robust:
+        person = data[data['nome'] == pattern['person']]['valor']
+        mad = (person - person.median()).abs().median()
+        assert abs(0.6745 * (pattern['value'] - person.median()) / mad) > 3.5
@@ -0,0 +1,81 @@
+"""Figura WebGL: nível de detalhe, corte de arestas e orçamento do payload"""
+
+import numpy as np
+import plotly.graph_objects as go
+
+from rendering import webgl_network_figure
+
+
+def clustered(n_comms=6, size=40, seed=3):
+    """Comunidades densas ligadas em anel, com posições aleatórias."""
+    rng = np.random.default_rng(seed)
+    n = n_comms * size
+    labels = np.repeat(np.arange(n_comms), size)
+    sources, targets = [], []
+    for c in range(n_comms):
+        members = np.arange(c * size, (c + 1) * size)
+        for _ in range(size * 3):
+            u, v = rng.choice(members, 2, replace=False)
+            sources.append(u)
+            targets.append(v)
+        sources.append(members[0])
+        targets.append(((c + 1) % n_comms) * size)
+    nodes = [f"N{i}" for i in range(n)]
+    return nodes, rng.random((n, 2)), np.array(sources), np.array(targets), labels
+
+
+def edge_count(fig):
+    """Arestas desenhadas (cada segmento ocupa três pontos, o último NaN)."""
+    return sum(len(trace.x) // 3 for trace in fig.data if trace.mode == 'lines')
+
+
+def test_detail_draws_every_node_with_webgl():
+    nodes, xy, sources, targets, labels = clustered()
+    fig, stats = webgl_network_figure(nodes, xy, sources, targets, labels=labels, level='detail',
+                                      max_edges=None)
+    assert all(isinstance(trace, go.Scattergl) for trace in fig.data)
+    assert stats['level'] == 'detail'
+    assert stats['nodes_rendered'] == len(nodes)
+    assert stats['edges_rendered'] == edge_count(fig) == len(sources)
+
+
+def test_auto_switches_to_overview_above_max_nodes():
+    nodes, xy, sources, targets, labels = clustered()
+    _, stats = webgl_network_figure(nodes, xy, sources, targets, labels=labels, max_nodes=100)
+    assert stats['level'] == 'overview'
+    assert stats['nodes_rendered'] == 6
+    # Sem labels não há como agregar
+    _, stats = webgl_network_figure(nodes, xy, sources, targets, max_nodes=100)
+    assert stats['level'] == 'detail'
+
+
+def test_overview_sums_members_and_edges_between_communities():
+    nodes, xy, sources, targets, labels = clustered()
+    fig, stats = webgl_network_figure(nodes, xy, sources, targets, labels=labels, level='overview',
+                                      custom={'Grau': np.ones(len(nodes))})
+    markers = fig.data[-1]
+    assert list(markers.text) == [f"Comunidade {c}" for c in range(6)]
+    assert markers.customdata[:, 0].tolist() == [40] * 6
+    assert markers.customdata[:, 1].tolist() == [40] * 6
+    assert stats['edges_rendered'] == 6
+
+
+def test_max_edges_keeps_the_largest_values():
+    nodes, xy, sources, targets, labels = clustered()
+    values = np.arange(len(sources), dtype=float)
+    fig, stats = webgl_network_figure(nodes, xy, sources, targets, edge_values=values, max_edges=10)
+    assert stats['edges_rendered'] == edge_count(fig) == 10
+    drawn = {(x0, y0) for trace in fig.data if trace.mode == 'lines'
+             for x0, y0 in zip(trace.x[::3], trace.y[::3])}
+    assert drawn == {tuple(xy[u]) for u in sources[-10:]}
+
+
+def test_payload_budget_is_respected():
+    nodes, xy, sources, targets, labels = clustered()
+    _, full = webgl_network_figure(nodes, xy, sources, targets, max_edges=None)
+    budget = full['payload_bytes'] // 2
+    _, stats = webgl_network_figure(nodes, xy, sources, targets, max_edges=None, payload_budget=budget)
+    assert stats['within_budget'] and stats['payload_bytes'] <= budget
+    assert stats['edges_rendered'] < len(sources)
+    _, stats = webgl_network_figure(nodes, xy, sources, targets, labels=labels, payload_budget=budget)
+    assert stats['level'] == 'overview' and stats['within_budget']